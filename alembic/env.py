@@ -16,7 +16,7 @@ fileConfig(config.config_file_name)
 # add your model's MetaData object here
 # for 'autogenerate' support
 from app.database import Base
-from app.models import inventory, transaction, user
+from app.models import inventory, transaction, user, report
 target_metadata = Base.metadata
 
 # other values from the config, defined by the needs of env.py,
@@ -0,0 +1,35 @@
+"""daily product sales rollup
+
+Revision ID: 0001_daily_product_sales
+Revises:
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001_daily_product_sales"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "daily_product_sales",
+        sa.Column("sales_date", sa.Date(), nullable=False),
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id"), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("revenue", sa.Float(), nullable=False),
+        sa.Column("transaction_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("sales_date", "product_id"),
+    )
+    op.create_index("ix_daily_product_sales_product_id", "daily_product_sales", ["product_id"])
+    # Populate from existing history with: python scripts/rebuild_sales_rollup.py
+
+
+def downgrade():
+    op.drop_index("ix_daily_product_sales_product_id", table_name="daily_product_sales")
+    op.drop_table("daily_product_sales")
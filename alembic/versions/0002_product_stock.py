@@ -0,0 +1,49 @@
+"""product stock totals
+
+Revision ID: 0002_product_stock
+Revises: 0001_daily_product_sales
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002_product_stock"
+down_revision = "0001_daily_product_sales"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "product_stock",
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id"), nullable=False),
+        sa.Column("on_hand", sa.Integer(), nullable=False),
+        sa.Column("reserved", sa.Integer(), nullable=False),
+        sa.Column("damaged", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("product_id"),
+    )
+    op.create_index("ix_product_stock_on_hand", "product_stock", ["on_hand"])
+    
+    # Backfill from the current inventory rows; products that never had any get a zero row
+    op.execute(
+        """
+        INSERT INTO product_stock (product_id, on_hand, reserved, damaged, updated_at)
+        SELECT p.id,
+               COALESCE(SUM(CASE WHEN i.status IN ('reserved', 'damaged') THEN 0 ELSE i.quantity END), 0),
+               COALESCE(SUM(CASE WHEN i.status = 'reserved' THEN i.quantity ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN i.status = 'damaged' THEN i.quantity ELSE 0 END), 0),
+               CURRENT_TIMESTAMP
+        FROM products p
+        LEFT JOIN inventory_items i ON i.product_id = p.id
+        GROUP BY p.id
+        """
+    )
+
+
+def downgrade():
+    op.drop_index("ix_product_stock_on_hand", table_name="product_stock")
+    op.drop_table("product_stock")
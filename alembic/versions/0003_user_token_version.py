@@ -0,0 +1,24 @@
+"""user token version
+
+Revision ID: 0003_user_token_version
+Revises: 0002_product_stock
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003_user_token_version"
+down_revision = "0002_product_stock"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("users", sa.Column("token_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade():
+    op.drop_column("users", "token_version")
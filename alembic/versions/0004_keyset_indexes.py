@@ -0,0 +1,30 @@
+"""keyset pagination indexes
+
+Revision ID: 0004_keyset_indexes
+Revises: 0003_user_token_version
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0004_keyset_indexes"
+down_revision = "0003_user_token_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Each index matches a listing's sort key so the next page is an index range scan from the cursor
+    op.create_index("ix_transactions_date_id", "transactions", ["transaction_date", "id"])
+    op.create_index("ix_transaction_items_transaction_id", "transaction_items", ["transaction_id"])
+    op.drop_index("ix_product_stock_on_hand", table_name="product_stock")
+    op.create_index("ix_product_stock_on_hand_product_id", "product_stock", ["on_hand", "product_id"])
+
+
+def downgrade():
+    op.drop_index("ix_product_stock_on_hand_product_id", table_name="product_stock")
+    op.create_index("ix_product_stock_on_hand", "product_stock", ["on_hand"])
+    op.drop_index("ix_transaction_items_transaction_id", table_name="transaction_items")
+    op.drop_index("ix_transactions_date_id", table_name="transactions")
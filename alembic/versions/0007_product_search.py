@@ -0,0 +1,59 @@
+"""product text search indexes
+
+Revision ID: 0007_product_search
+Revises: 0006_jobs
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0007_product_search"
+down_revision = "0006_jobs"
+branch_labels = None
+depends_on = None
+
+# Matches PRODUCT_SEARCH_DDL in app/models/inventory.py as of this revision
+SEARCH_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+        "sku, name, description, content='products', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN "
+        "INSERT INTO products_fts(rowid, sku, name, description) VALUES (new.id, new.sku, new.name, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN "
+        "INSERT INTO products_fts(products_fts, rowid, sku, name, description) "
+        "VALUES ('delete', old.id, old.sku, old.name, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF sku, name, description ON products BEGIN "
+        "INSERT INTO products_fts(products_fts, rowid, sku, name, description) "
+        "VALUES ('delete', old.id, old.sku, old.name, old.description); "
+        "INSERT INTO products_fts(rowid, sku, name, description) VALUES (new.id, new.sku, new.name, new.description); END",
+    ],
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_products_sku_trgm ON products USING gin (sku gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_products_description_trgm ON products USING gin (description gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_products_sku_pattern ON products (sku text_pattern_ops)",
+    ],
+}
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    for statement in SEARCH_DDL.get(dialect, []):
+        op.execute(statement)
+    if dialect == "sqlite":
+        # The triggers only see new writes; index the existing catalog once
+        op.execute("INSERT INTO products_fts(products_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for trigger in ("products_fts_insert", "products_fts_delete", "products_fts_update"):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS products_fts")
+    elif dialect == "postgresql":
+        for index in ("ix_products_sku_pattern", "ix_products_description_trgm", "ix_products_name_trgm", "ix_products_sku_trgm"):
+            op.execute(f"DROP INDEX IF EXISTS {index}")
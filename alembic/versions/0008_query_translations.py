@@ -0,0 +1,38 @@
+"""natural-language query translation cache
+
+Revision ID: 0008_query_translations
+Revises: 0007_product_search
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0008_query_translations"
+down_revision = "0007_product_search"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "query_translations",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("question_hash", sa.String(length=64), nullable=False),
+        sa.Column("question", sa.Text(), nullable=False),
+        sa.Column("dialect", sa.String(), nullable=False),
+        sa.Column("sql", sa.Text(), nullable=False),
+        sa.Column("translator", sa.String(), nullable=False),
+        sa.Column("hit_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("last_used_at", sa.DateTime(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("question_hash"),
+    )
+
+
+def downgrade():
+    op.drop_table("query_translations")
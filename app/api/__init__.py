@@ -2,4 +2,7 @@
 from app.api.authentication import router as authentication_router
 from app.api.inventory import router as inventory_router
 from app.api.transaction import router as transaction_router
-from app.api.report import router as report_router
\ No newline at end of file
+from app.api.report import router as report_router
+from app.api.metrics import router as metrics_router
+from app.api.imports import router as imports_router
+from app.api.jobs import router as jobs_router
\ No newline at end of file
@@ -1,45 +1,73 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import timedelta
+import math
 
-from app.database import get_db
-from app.models.user import User
-from app.schemas.user import User as UserSchema, UserCreate, UserUpdate, Token
+from app.database import get_async_db, get_db
+from app.schemas.user import User as UserSchema, UserCreate, UserUpdate, Token, Principal
 from app.services.authentication import AuthService, ACCESS_TOKEN_EXPIRE_MINUTES
-from app.api.dependencies import get_current_active_user, get_admin_user
+from app.utils.security import login_throttle
+from app.api.dependencies import get_current_active_user, get_current_user, get_admin_user, oauth2_scheme
 
 router = APIRouter(tags=["authentication"])
 auth_service = AuthService()
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
+    request: Request,
+    background_tasks: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = auth_service.authenticate_user(db, form_data.username, form_data.password)
+    # Floods against one username or from one address are turned away before any hash is computed
+    retry_after = login_throttle.acquire(form_data.username, request.client.host if request.client else None)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
+    
+    # The lookup is async and bcrypt runs on the password pool, so a login burst leaves the event loop free
+    user = await auth_service.authenticate_user_async(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    login_throttle.reset(form_data.username)
+    
+    # Hashes from an older scheme or cost are upgraded after the response is sent
+    # (FastAPI 0.103 closes yield dependencies such as db only after background tasks have run)
+    if auth_service.needs_rehash(user.hashed_password):
+        background_tasks.add_task(
+            auth_service.rehash_password_async, db, user.id, form_data.password, user.hashed_password
+        )
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = auth_service.create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
-    )
+    access_token = auth_service.create_user_token(user, expires_delta=access_token_expires)
     
     # Update last login time
-    auth_service.update_last_login(db, user.id)
+    await auth_service.update_last_login_async(db, user)
     
     return {"access_token": access_token, "token_type": "bearer"}
 
+@router.post("/token/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_access_token(
+    token: str = Depends(oauth2_scheme),
+    current_user: Principal = Depends(get_current_user)
+):
+    # Logout: the bearer used for this request stops working on every worker sharing the revocation list
+    auth_service.revoke_token(auth_service.decode_token(token))
+
 @router.post("/users/", response_model=UserSchema)
-async def create_user(
+def create_user(
     user: UserCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_admin_user)
+    current_user: Principal = Depends(get_admin_user)
 ):
     db_user = auth_service.create_user(db, user)
     if db_user is None:
@@ -51,16 +79,22 @@ async def create_user(
 
 @router.get("/users/me/", response_model=UserSchema)
 async def read_users_me(
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
-    return current_user
+    # The principal is only a snapshot; the profile itself is read fresh
+    return await auth_service.get_user_by_username_async(db, current_user.username)
 
 @router.put("/users/me/", response_model=UserSchema)
-async def update_user_me(
+def update_user_me(
     user: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
+    # Roles and the active flag are not self-service
+    if (user.roles is not None or user.is_active is not None) and not current_user.has_role("admin"):
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    
     # Update user information
     updated_user = auth_service.update_user(db, current_user.id, user)
     return updated_user
\ No newline at end of file
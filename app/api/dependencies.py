@@ -1,27 +1,27 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from jose import JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models.user import User
-from app.schemas.user import TokenData
-from app.services.authentication import SECRET_KEY, ALGORITHM, AuthService
+from app.schemas.user import Principal, TokenData
+from app.services.authentication import AuthService
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 auth_service = AuthService()
 
 async def get_current_user(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token: str = Depends(oauth2_scheme)
-) -> User:
+) -> Principal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = auth_service.decode_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -29,22 +29,21 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == token_data.username).first()
+    user = await auth_service.authorize_async(db, payload)
     if user is None:
         raise credentials_exception
     return user
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: Principal = Depends(get_current_user),
+) -> Principal:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 def get_admin_user(
-    current_user: User = Depends(get_current_active_user),
-) -> User:
-    for role in current_user.roles:
-        if role.name == "admin":
-            return current_user
+    current_user: Principal = Depends(get_current_active_user),
+) -> Principal:
+    if current_user.has_role("admin"):
+        return current_user
     raise HTTPException(status_code=403, detail="Not enough permissions")
\ No newline at end of file
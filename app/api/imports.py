@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends, File, HTTPException, Response, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Literal
+
+from app.database import get_async_db, get_db
+from app.schemas.import_job import ImportJob
+from app.schemas.user import Principal
+from app.services.imports import ImportService
+from app.services.jobs import JobQueueFull, JobService
+from app.api.dependencies import get_current_active_user
+
+router = APIRouter(prefix="/imports", tags=["imports"])
+import_service = ImportService()
+job_service = JobService()
+
+def _visible(db_job, current_user: Principal):
+    # Other users' imports are reported as missing rather than forbidden
+    if db_job is None or (db_job.created_by != current_user.id and not current_user.has_role("admin")):
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return db_job
+
+def _enqueue(db: Session, job, current_user: Principal, response: Response) -> None:
+    # Imports run on the job queue; the Location header names the queue job, which can be cancelled.
+    # Progress is on GET /imports/{job_id}.
+    queued = job_service.submit(db, "import", {"import_job_id": job.id}, current_user.id)
+    response.headers["Location"] = f"/jobs/{queued.id}"
+
+@router.post("/{kind}", response_model=ImportJob, status_code=status.HTTP_202_ACCEPTED)
+def create_import(
+    kind: Literal["products", "inventory_counts"],
+    response: Response,
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    try:
+        job = import_service.create_job(db, kind, file.file, file.filename, current_user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    try:
+        _enqueue(db, job, current_user, response)
+    except JobQueueFull:
+        # Nothing would ever run it
+        import_service.discard_job(db, job)
+        raise
+    return job
+
+@router.get("/{job_id}", response_model=ImportJob)
+async def read_import(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    return _visible(await import_service.get_job_async(db, job_id), current_user)
+
+@router.post("/{job_id}/resume", response_model=ImportJob, status_code=status.HTTP_202_ACCEPTED)
+def resume_import(
+    job_id: int,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    job = _visible(import_service.get_job(db, job_id), current_user)
+    if job_service.has_unfinished(db, "import", {"import_job_id": job.id}):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Import job is already queued")
+    if not import_service.is_resumable(job):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Import job is {job.status}")
+    # Picks up after the last committed chunk
+    _enqueue(db, job, current_user, response)
+    return job
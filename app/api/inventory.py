@@ -1,28 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Literal, Optional
 
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models.user import User
-from app.schemas.inventory import Product, ProductCreate, ProductUpdate, InventoryItem, InventoryItemCreate
+from app.schemas.inventory import Product, ProductCreate, ProductUpdate, InventoryItem, InventoryItemCreate, ProductStock
 from app.services.inventory import InventoryService
+from app.utils.csv import EXPORT_FORMATS, CSVUtil
+from app.utils.pagination import NEXT_CURSOR_HEADER, InvalidCursor
 from app.api.dependencies import get_current_active_user
 
 router = APIRouter(prefix="/inventory", tags=["inventory"])
 inventory_service = InventoryService()
+csv_util = CSVUtil()
 
 @router.get("/products/", response_model=List[Product])
 async def read_products(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    products = inventory_service.get_products(db, skip=skip, limit=limit)
+    # skip is kept for existing clients; it costs O(skip), so follow the X-Next-Cursor header instead
+    if skip:
+        return await inventory_service.get_products_async(db, skip=skip, limit=limit)
+    try:
+        products, next_cursor = await inventory_service.get_products_page_async(db, cursor=cursor, limit=limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return products
 
+# Declared before /products/{product_id} so "search" is not taken for an id
+@router.get("/products/search", response_model=List[Product])
+async def search_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    category: Optional[List[str]] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    # Ranked: exact SKU, SKU prefix, then text relevance; fragments under three characters match SKU prefixes only
+    if not q.strip():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Search query is empty")
+    return await inventory_service.search_products_async(db, q, category, limit)
+
+# Writes use the synchronous session; as plain defs they run in the threadpool, not on the event loop
 @router.post("/products/", response_model=Product)
-async def create_product(
+def create_product(
     product: ProductCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -32,16 +62,16 @@ async def create_product(
 @router.get("/products/{product_id}", response_model=Product)
 async def read_product(
     product_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    product = inventory_service.get_product(db, product_id)
+    product = await inventory_service.get_product_async(db, product_id)
     if product is None:
         raise HTTPException(status_code=404, detail="Product not found")
     return product
 
 @router.put("/products/{product_id}", response_model=Product)
-async def update_product(
+def update_product(
     product_id: int,
     product: ProductUpdate,
     db: Session = Depends(get_db),
@@ -53,7 +83,7 @@ async def update_product(
     return updated_product
 
 @router.delete("/products/{product_id}", response_model=bool)
-async def delete_product(
+def delete_product(
     product_id: int,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -64,7 +94,7 @@ async def delete_product(
     return True
 
 @router.post("/items/", response_model=InventoryItem)
-async def add_inventory(
+def add_inventory(
     inventory_item: InventoryItemCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
@@ -74,10 +104,66 @@ async def add_inventory(
         raise HTTPException(status_code=404, detail="Product not found")
     return result
 
+# Declared before /stock/{product_id} so "low" is not parsed as an id
+@router.get("/stock/low", response_model=List[ProductStock])
+async def read_low_stock(
+    response: Response,
+    threshold: int = 10,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    try:
+        stock, next_cursor = await inventory_service.get_low_stock_products_async(
+            db, threshold=threshold, limit=limit, cursor=cursor
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return stock
+
+@router.get("/stock/{product_id}", response_model=ProductStock)
+async def read_product_stock(
+    product_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    stock = await inventory_service.get_stock_async(db, product_id)
+    if stock is None:
+        raise HTTPException(status_code=404, detail="No stock recorded for product")
+    return stock
+
 @router.get("/count/", response_model=List[InventoryItem])
-async def get_inventory_count_list(
+def get_inventory_count_list(
     days: int = 30,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    return inventory_service.generate_daily_count_list(db, days)
\ No newline at end of file
+    return inventory_service.generate_daily_count_list(db, days)
+
+# Exports stream straight from a server-side cursor; memory stays flat however large the table.
+# FastAPI closes the db dependency only after the response body has been sent.
+def _export_response(chunks, name: str, format: str) -> StreamingResponse:
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{format}"'},
+    )
+
+@router.get("/export/products")
+def export_products(
+    format: Literal["csv", "ndjson"] = "csv",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return _export_response(csv_util.stream_products(db, format), "products", format)
+
+@router.get("/export/inventory")
+def export_inventory(
+    format: Literal["csv", "ndjson"] = "csv",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return _export_response(csv_util.stream_inventory(db, format), "inventory", format)
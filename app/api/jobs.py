@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Any
+
+from app.database import get_async_db, get_db
+from app.schemas.job import Job
+from app.schemas.user import Principal
+from app.services.jobs import JobService
+from app.api.dependencies import get_current_active_user
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+job_service = JobService()
+
+def _visible(db_job, current_user: Principal):
+    # Other users' jobs are reported as missing rather than forbidden
+    if db_job is None or (db_job.created_by != current_user.id and not current_user.has_role("admin")):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return db_job
+
+@router.get("/{job_id}", response_model=Job)
+async def read_job(
+    job_id: int,
+    wait: float = Query(0, ge=0, le=60, description="Seconds to wait for the job to finish (long-poll)"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    if wait:
+        _visible(await job_service.get_job_async(db, job_id), current_user)
+        return await job_service.wait_for_job_async(db, job_id, wait)
+    return _visible(await job_service.get_job_async(db, job_id), current_user)
+
+@router.get("/{job_id}/result")
+async def read_job_result(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_active_user)
+) -> Any:
+    db_job = _visible(await job_service.get_job_async(db, job_id), current_user)
+    if db_job.status != "succeeded":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job is {db_job.status}")
+    return db_job.result
+
+@router.post("/{job_id}/cancel", response_model=Job)
+def cancel_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    _visible(job_service.get_job(db, job_id), current_user)
+    return job_service.cancel(db, job_id)
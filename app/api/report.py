@@ -1,37 +1,125 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any
+from typing import Literal, Optional, Dict, Any
 from datetime import datetime
 
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models.user import User
+from app.schemas.job import Job
 from app.schemas.report import NaturalLanguageQuery, QueryResult
+from app.schemas.user import Principal
+from app.services.jobs import JobService
 from app.services.report import ReportGenerator
+from app.services.report_cache import cached_report, etag_matches, normalize_sales_window, report_etag, reports_not_modified
+from app.services.translation import TranslationError, TranslationTimeout, UntranslatableQuery
 from app.api.dependencies import get_current_active_user
+from app.utils.pagination import NEXT_CURSOR_HEADER, InvalidCursor
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 report_service = ReportGenerator()
+job_service = JobService()
 
+def _not_modified(request: Request, kind: str, params: Dict[str, Any]) -> Optional[Response]:
+    """304 when the client already holds the current report; decided without touching the database"""
+    etag = report_etag(kind, params)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        reports_not_modified.inc(labels={"report": kind})
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
+
+def _cached_report(response: Response, kind: str, params: Dict[str, Any], compute) -> Dict[str, Any]:
+    report, etag = cached_report(kind, params, compute)
+    response.headers["ETag"] = etag
+    # Clients may keep the report but must revalidate it; a matching If-None-Match costs no queries
+    response.headers["Cache-Control"] = "private, no-cache"
+    return report
+
+# Sync handlers: FastAPI runs them in its threadpool instead of on the event loop
 @router.get("/inventory")
-async def generate_inventory_report(
+def generate_inventory_report(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    return report_service.generate_inventory_report(db)
+    params = {"low_stock_threshold": 10}
+    return _not_modified(request, "inventory_report", params) or _cached_report(
+        response, "inventory_report", params, lambda: report_service.generate_inventory_report(db)
+    )
 
 @router.get("/sales")
-async def generate_sales_report(
+def generate_sales_report(
+    request: Request,
+    response: Response,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    include_details: bool = True,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    return report_service.generate_sales_report(db, start_date, end_date)
+    # Defaults end on a day boundary, so dashboards polling "the last 30 days" share one cache entry per day;
+    # explicit bounds are reported exactly, edge days partly from raw rows
+    start_date, end_date = normalize_sales_window(start_date, end_date)
+    params = {"start_date": start_date, "end_date": end_date, "include_details": include_details}
+    return _not_modified(request, "sales_report", params) or _cached_report(
+        response, "sales_report", params,
+        lambda: report_service.generate_sales_report(db, start_date, end_date, include_details)
+    )
+
+# Queued variants for large datasets: 202 with the job, polled at the Location header, result at {Location}/result
+@router.post("/inventory", response_model=Job, status_code=status.HTTP_202_ACCEPTED)
+def submit_inventory_report(
+    response: Response,
+    low_stock_threshold: int = 10,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    job = job_service.submit(db, "inventory_report", {"low_stock_threshold": low_stock_threshold}, current_user.id)
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job
 
+@router.post("/sales", response_model=Job, status_code=status.HTTP_202_ACCEPTED)
+def submit_sales_report(
+    response: Response,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    include_details: bool = True,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    params = {"start_date": start_date, "end_date": end_date, "include_details": include_details}
+    job = job_service.submit(db, "sales_report", params, current_user.id)
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job
+
+# Async: the translator call is awaited, so a slow LLM round trip does not hold a threadpool worker.
+# Results are capped at NL_QUERY_ROW_LIMIT rows; pass next_cursor back as "cursor" for the next page.
+# format=ndjson streams the rows instead, ending with a {"next_cursor": ...} line when more remain.
 @router.post("/query", response_model=QueryResult)
 async def process_report_query(
     query: NaturalLanguageQuery,
-    db: Session = Depends(get_db),
+    response: Response,
+    format: Literal["json", "ndjson"] = "json",
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    return report_service.process_natural_language_query(db, query.query)
\ No newline at end of file
+    try:
+        if format == "ndjson":
+            plan = await report_service.plan_natural_language_query(db, query.query, query.cursor)
+            if "error" in plan:
+                return plan
+            return StreamingResponse(report_service.stream_natural_language_query(db, plan), media_type="application/x-ndjson")
+        result = await report_service.process_natural_language_query(db, query.query, query.cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except TranslationTimeout as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+    except UntranslatableQuery as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except TranslationError as e:
+        raise HTTPException(status_code=status.HTTP_502_BAD_GATEWAY, detail=str(e))
+    if result.get("next_cursor"):
+        response.headers[NEXT_CURSOR_HEADER] = result["next_cursor"]
+    return result
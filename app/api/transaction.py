@@ -1,47 +1,107 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+import json
 
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models.user import User
-from app.schemas.transaction import Transaction, TransactionCreate
+from app.schemas.transaction import Transaction, TransactionCreate, TransactionBulkResponse
 from app.services.transaction import TransactionService
+from app.utils.pagination import NEXT_CURSOR_HEADER, InvalidCursor
 from app.api.dependencies import get_current_active_user
 
 router = APIRouter(prefix="/transactions", tags=["transactions"])
 transaction_service = TransactionService()
 
+# Upper bound on transactions accepted by a single bulk upload
+MAX_BULK_TRANSACTIONS = 10000
+
+# Writes use the synchronous session; as plain defs they run in the threadpool, not on the event loop
 @router.post("/", response_model=Transaction)
-async def create_transaction(
+def create_transaction(
     transaction: TransactionCreate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     return transaction_service.create_transaction(db, transaction)
 
+@router.post("/bulk", response_model=TransactionBulkResponse)
+async def create_transactions_bulk(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    # Accept either a JSON array or newline-delimited JSON (one transaction per line)
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            payloads = [json.loads(line) for line in body.splitlines() if line.strip()]
+        else:
+            payloads = json.loads(body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Malformed request body: {str(e)}")
+    if not isinstance(payloads, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON stream of transactions")
+    if len(payloads) > MAX_BULK_TRANSACTIONS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_TRANSACTIONS} transactions per request")
+    
+    results = []
+    parsed = []
+    for index, payload in enumerate(payloads):
+        try:
+            parsed.append((index, TransactionCreate(**payload)))
+        except (ValidationError, TypeError) as e:
+            results.append({"index": index, "error": str(e)})
+    
+    # Database errors are reported on the entries that caused them, in the results
+    shortfalls = {}
+    created = await run_in_threadpool(
+        transaction_service.create_transactions_bulk, db, [transaction for _, transaction in parsed], shortfalls
+    )
+    for (index, _), result in zip(parsed, created):
+        result["index"] = index
+    results.extend(created)
+    results.sort(key=lambda result: result["index"])
+    
+    failed = sum(1 for result in results if result.get("error"))
+    return {"created": len(results) - failed, "failed": failed, "results": results, "stock_shortfalls": shortfalls}
+
 @router.get("/", response_model=List[Transaction])
 async def read_transactions(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    transactions = transaction_service.get_transactions(db, skip=skip, limit=limit)
+    # Newest first; skip is kept for existing clients, new ones follow the X-Next-Cursor header
+    if skip:
+        return await transaction_service.get_transactions_async(db, skip=skip, limit=limit)
+    try:
+        transactions, next_cursor = await transaction_service.get_transactions_page_async(db, cursor=cursor, limit=limit)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return transactions
 
 @router.get("/{transaction_id}", response_model=Transaction)
 async def read_transaction(
     transaction_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    transaction = transaction_service.get_transaction(db, transaction_id)
+    transaction = await transaction_service.get_transaction_async(db, transaction_id)
     if transaction is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
     return transaction
 
 @router.put("/{transaction_id}/status", response_model=Transaction)
-async def update_transaction_status(
+def update_transaction_status(
     transaction_id: int,
     status: str,
     db: Session = Depends(get_db),
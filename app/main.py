@@ -1,7 +1,10 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from app.api import authentication, inventory, transaction, report
+from app.api import authentication, inventory, transaction, report, metrics, imports, jobs
+from app.services.jobs import JOB_WORKERS, job_worker
+from app.utils.executors import ExecutorSaturated, shutdown_executors
 
 app = FastAPI(title="PolyBooks API", description="API for PolyBooks accounting system", version="1.0.0")
 
@@ -19,6 +22,25 @@ app.include_router(authentication.router)
 app.include_router(inventory.router)
 app.include_router(transaction.router)
 app.include_router(report.router)
+app.include_router(metrics.router)
+app.include_router(imports.router)
+app.include_router(jobs.router)
+
+# A full password pool, report pool or job queue sheds load instead of queueing without bound
+@app.exception_handler(ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: ExecutorSaturated):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+# Reports and imports queued through /jobs run on worker threads here unless JOB_WORKERS=0
+@app.on_event("startup")
+def startup():
+    if JOB_WORKERS:
+        job_worker.start()
+
+@app.on_event("shutdown")
+def shutdown():
+    job_worker.stop()
+    shutdown_executors()
 
 @app.get("/")
 async def root():
@@ -1,3 +1,6 @@
 from app.models.user import User, Role
-from app.models.inventory import Product, InventoryItem
-from app.models.transaction import Transaction, TransactionItem, Customer, Vendor
\ No newline at end of file
+from app.models.inventory import Product, InventoryItem, ProductStock
+from app.models.transaction import Transaction, TransactionItem, Customer, Vendor
+from app.models.report import DailyProductSales, QueryTranslation
+from app.models.import_job import ImportJob
+from app.models.job import Job
@@ -0,0 +1,25 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, JSON
+from datetime import datetime
+
+from app.database import Base
+
+class ImportJob(Base):
+    __tablename__ = "import_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # (products, inventory_counts)
+    status = Column(String, nullable=False, default="pending", index=True)  # (pending, running, completed, failed)
+    filename = Column(String, nullable=True)
+    file_path = Column(String, nullable=False)  # the stored upload, removed once the job completes
+    # Data rows consumed so far; committed with each chunk, so it doubles as the resume checkpoint
+    rows_processed = Column(Integer, nullable=False, default=0)
+    rows_imported = Column(Integer, nullable=False, default=0)
+    rows_failed = Column(Integer, nullable=False, default=0)
+    rows_per_second = Column(Float, nullable=False, default=0.0)
+    errors = Column(JSON, nullable=False, default=list)  # the first IMPORT_MAX_ERRORS row errors
+    message = Column(String, nullable=True)  # why the last run stopped, if it failed
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
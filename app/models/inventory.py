@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import DDL, Column, Integer, String, Float, DateTime, ForeignKey, Index, event
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -19,6 +19,39 @@ class Product(Base):
     
     inventory_items = relationship("InventoryItem", back_populates="product")
     transaction_items = relationship("TransactionItem", back_populates="product")
+    stock = relationship("ProductStock", back_populates="product", uselist=False)
+
+# Text search indexes over sku, name and description, created with the table (alembic 0007 adds them to
+# existing databases). SQLite gets an FTS5 trigram index kept in step by triggers; PostgreSQL gets pg_trgm
+# GIN indexes, which serve ILIKE '%fragment%', plus a pattern index for short SKU prefixes.
+PRODUCT_SEARCH_DDL = {
+    "sqlite": [
+        "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+        "sku, name, description, content='products', content_rowid='id', tokenize='trigram')",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN "
+        "INSERT INTO products_fts(rowid, sku, name, description) VALUES (new.id, new.sku, new.name, new.description); END",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN "
+        "INSERT INTO products_fts(products_fts, rowid, sku, name, description) "
+        "VALUES ('delete', old.id, old.sku, old.name, old.description); END",
+        "CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF sku, name, description ON products BEGIN "
+        "INSERT INTO products_fts(products_fts, rowid, sku, name, description) "
+        "VALUES ('delete', old.id, old.sku, old.name, old.description); "
+        "INSERT INTO products_fts(rowid, sku, name, description) VALUES (new.id, new.sku, new.name, new.description); END",
+    ],
+    "postgresql": [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS ix_products_sku_trgm ON products USING gin (sku gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_products_description_trgm ON products USING gin (description gin_trgm_ops)",
+        "CREATE INDEX IF NOT EXISTS ix_products_sku_pattern ON products (sku text_pattern_ops)",
+    ],
+}
+
+for dialect, statements in PRODUCT_SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Product.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
+# The FTS5 table is not dropped with products and would otherwise outlive it
+event.listen(Product.__table__, "before_drop", DDL("DROP TABLE IF EXISTS products_fts").execute_if(dialect="sqlite"))
 
 class InventoryItem(Base):
     __tablename__ = "inventory_items"
@@ -30,4 +63,19 @@ class InventoryItem(Base):
     last_count_date = Column(DateTime)
     status = Column(String)  # (available, reserved, damaged)
     
-    product = relationship("Product", back_populates="inventory_items")
\ No newline at end of file
+    product = relationship("Product", back_populates="inventory_items")
+
+class ProductStock(Base):
+    __tablename__ = "product_stock"
+    
+    # Per-product totals of inventory_items.quantity, maintained by InventoryRepository
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    on_hand = Column(Integer, default=0, nullable=False)
+    reserved = Column(Integer, default=0, nullable=False)
+    damaged = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    product = relationship("Product", back_populates="stock")
+    
+    # Low-stock listing and its keyset pagination
+    __table_args__ = (Index("ix_product_stock_on_hand_product_id", "on_hand", "product_id"),)
\ No newline at end of file
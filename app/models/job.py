@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, JSON, Boolean, Index
+from datetime import datetime
+
+from app.database import Base
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # a key of app.services.jobs.JOB_HANDLERS
+    status = Column(String, nullable=False, default="queued")  # (queued, running, succeeded, failed, cancelled)
+    params = Column(JSON, nullable=False, default=dict)
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    worker = Column(String, nullable=True)  # host:pid of the process running it
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    # Refreshed while running; a running job whose heartbeat stops is reclaimed by another worker
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)  # finished jobs and their results are purged after this
+    
+    # Workers pick the oldest queued job
+    __table_args__ = (Index("ix_jobs_status_id", "status", "id"),)
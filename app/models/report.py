@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime, ForeignKey, String, Text
+from sqlalchemy.orm import relationship
+from datetime import datetime
+
+from app.database import Base
+
+class DailyProductSales(Base):
+    __tablename__ = "daily_product_sales"
+    
+    # One row per product per calendar day (UTC) of non-cancelled sales
+    sales_date = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True, index=True)
+    quantity = Column(Integer, default=0, nullable=False)
+    revenue = Column(Float, default=0.0, nullable=False)
+    transaction_count = Column(Integer, default=0, nullable=False)
+    
+    product = relationship("Product")
+
+class QueryTranslation(Base):
+    __tablename__ = "query_translations"
+    
+    # Natural-language report questions already translated to SQL, keyed by a hash of the dialect, the
+    # translator and the normalized question
+    id = Column(Integer, primary_key=True)
+    question_hash = Column(String(64), unique=True, nullable=False)
+    question = Column(Text, nullable=False)
+    dialect = Column(String, nullable=False)
+    sql = Column(Text, nullable=False)
+    translator = Column(String, nullable=False)
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime)
+    expires_at = Column(DateTime, nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -27,12 +27,15 @@ class Transaction(Base):
     items = relationship("TransactionItem", back_populates="transaction")
     customer = relationship("Customer", back_populates="transactions")
     vendor = relationship("Vendor", back_populates="transactions")
+    
+    # Keyset pagination of the newest-first listing
+    __table_args__ = (Index("ix_transactions_date_id", "transaction_date", "id"),)
 
 class TransactionItem(Base):
     __tablename__ = "transaction_items"
     
     id = Column(Integer, primary_key=True, index=True)
-    transaction_id = Column(Integer, ForeignKey("transactions.id"))
+    transaction_id = Column(Integer, ForeignKey("transactions.id"), index=True)
     product_id = Column(Integer, ForeignKey("products.id"))
     quantity = Column(Integer)
     unit_price = Column(Float)
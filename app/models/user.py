@@ -23,6 +23,8 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     last_login = Column(DateTime, nullable=True)
+    # Bumped whenever roles, active state or password change; older tokens are then revoked
+    token_version = Column(Integer, default=0, nullable=False)
     
     roles = relationship("Role", secondary=user_roles, back_populates="users")
 
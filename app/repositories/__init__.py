@@ -1,5 +1,6 @@
 # Import repositories for easy access
-from app.repositories.base import BaseRepository
-from app.repositories.inventory import ProductRepository, InventoryRepository
-from app.repositories.transaction import TransactionRepository, CustomerRepository, VendorRepository
-from app.repositories.user import UserRepository, RoleRepository
\ No newline at end of file
+from app.repositories.base import BaseRepository, AsyncBaseRepository
+from app.repositories.inventory import ProductRepository, InventoryRepository, AsyncProductRepository, AsyncInventoryRepository
+from app.repositories.transaction import TransactionRepository, CustomerRepository, VendorRepository, AsyncTransactionRepository
+from app.repositories.user import UserRepository, RoleRepository, AsyncUserRepository
+from app.repositories.report import SalesRollupRepository
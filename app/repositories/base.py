@@ -1,6 +1,9 @@
 from typing import Generic, TypeVar, Type, Optional, List, Dict, Any
 from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
 from fastapi.encoders import jsonable_encoder
 
 from app.database import Base
@@ -10,6 +13,17 @@ ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+# Dialects whose INSERT supports ON CONFLICT ... DO UPDATE
+UPSERT_DIALECTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+def dialect_insert(db: Session, table):
+    """Return an INSERT construct supporting on_conflict_do_update, or None if the dialect has none"""
+    insert = UPSERT_DIALECTS.get(db.get_bind().dialect.name)
+    return insert(table) if insert else None
+
 class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
     def __init__(self, model: Type[ModelType]):
         self.model = model
@@ -49,4 +63,26 @@ class BaseRepository(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         obj = db.query(self.model).get(id)
         db.delete(obj)
         db.commit()
-        return obj
\ No newline at end of file
+        return obj
+
+class AsyncBaseRepository(Generic[ModelType]):
+    """Read-side repository for AsyncSession; writes stay on the synchronous repositories"""
+    def __init__(self, model: Type[ModelType]):
+        self.model = model
+
+    async def get(self, db: AsyncSession, id: int) -> Optional[ModelType]:
+        return await db.get(self.model, id)
+
+    async def get_multi(
+        self, db: AsyncSession, *, skip: int = 0, limit: int = 100
+    ) -> List[ModelType]:
+        result = await db.scalars(select(self.model).order_by(self.model.id).offset(skip).limit(limit))
+        return result.all()
+
+    async def get_page(self, db: AsyncSession, *, after: Optional[int] = None, limit: int = 100) -> List[ModelType]:
+        """Keyset page ordered by id: rows after the given id, so deep pages cost the same as the first"""
+        stmt = select(self.model).order_by(self.model.id).limit(limit)
+        if after is not None:
+            stmt = stmt.where(self.model.id > after)
+        result = await db.scalars(stmt)
+        return result.all()
@@ -0,0 +1,66 @@
+from sqlalchemy import and_, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional
+
+from app.models.import_job import ImportJob
+
+class ImportJobRepository:
+    def get(self, db: Session, job_id: int) -> Optional[ImportJob]:
+        return db.query(ImportJob).filter(ImportJob.id == job_id).first()
+
+    def create(self, db: Session, kind: str, file_path: str, filename: Optional[str], created_by: Optional[int]) -> ImportJob:
+        db_job = ImportJob(kind=kind, file_path=file_path, filename=filename, created_by=created_by, errors=[])
+        db.add(db_job)
+        db.commit()
+        db.refresh(db_job)
+        return db_job
+
+    def remove(self, db: Session, db_job: ImportJob) -> None:
+        db.delete(db_job)
+        db.commit()
+
+    def claim(self, db: Session, job_id: int, stale_before: datetime) -> Optional[ImportJob]:
+        """Mark a pending, failed or abandoned running job as running; None if another run holds it.
+        The conditional UPDATE makes the claim atomic across workers."""
+        now = datetime.utcnow()
+        result = db.execute(
+            update(ImportJob)
+            .where(
+                ImportJob.id == job_id,
+                or_(
+                    ImportJob.status.in_(["pending", "failed"]),
+                    and_(ImportJob.status == "running", ImportJob.updated_at < stale_before),
+                ),
+            )
+            .values(status="running", message=None, started_at=now, updated_at=now)
+        )
+        db.commit()
+        if result.rowcount != 1:
+            return None
+        return self.get(db, job_id)
+
+    def record_chunk(self, db: Session, db_job: ImportJob, rows: int, imported: int, errors: List[str],
+                     rows_per_second: float, max_errors: int) -> None:
+        """Advance the checkpoint; committed by the caller together with the chunk it describes"""
+        db_job.rows_processed += rows
+        db_job.rows_imported += imported
+        db_job.rows_failed += rows - imported
+        db_job.rows_per_second = rows_per_second
+        if errors and len(db_job.errors) < max_errors:
+            # Reassigned rather than appended so the JSON column is flagged as changed
+            db_job.errors = db_job.errors + errors[:max_errors - len(db_job.errors)]
+        db_job.updated_at = datetime.utcnow()
+
+    def finish(self, db: Session, db_job: ImportJob, status: str, message: Optional[str] = None) -> None:
+        db_job.status = status
+        db_job.message = message
+        db_job.updated_at = datetime.utcnow()
+        if status == "completed":
+            db_job.finished_at = db_job.updated_at
+        db.commit()
+
+class AsyncImportJobRepository:
+    async def get(self, db: AsyncSession, job_id: int) -> Optional[ImportJob]:
+        return await db.get(ImportJob, job_id)
@@ -1,17 +1,266 @@
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import bindparam, case, column, func, insert, literal, literal_column, or_, select, table, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
-from app.models.inventory import Product, InventoryItem
+from app.models.inventory import Product, InventoryItem, ProductStock
 from app.schemas.inventory import ProductCreate, ProductUpdate, InventoryItemCreate
-from app.repositories.base import BaseRepository
+from app.repositories.base import AsyncBaseRepository, BaseRepository, dialect_insert
+
+STOCK_BUCKETS = ("on_hand", "reserved", "damaged")
+
+# Inventory statuses that count against a bucket other than on_hand
+STATUS_BUCKETS = {
+    "reserved": "reserved",
+    "damaged": "damaged",
+}
+
+StockDeltas = Dict[int, Dict[str, int]]
+
+# Trigram indexes cannot serve shorter fragments; queries made only of these are matched as SKU prefixes
+SEARCH_MIN_TERM_LENGTH = 3
+# bm25 column weights for sku, name and description on SQLite
+SEARCH_FTS_WEIGHTS = (10.0, 5.0, 1.0)
+products_fts = table("products_fts", column("rowid"))
+
+def _like_fragment(term: str) -> str:
+    # "/" as the escape character, as autoescape uses, so it reads the same on every dialect
+    return "%" + term.replace("/", "//").replace("%", "/%").replace("_", "/_") + "%"
+
+def product_search_statement(dialect: str, query: str, categories: Optional[List[str]] = None, limit: int = 20):
+    """Ranked product search: exact SKU first, then SKU prefixes, then text relevance.
+
+    Every whitespace-separated term must occur in the sku, name or description. Served by the indexes in
+    PRODUCT_SEARCH_DDL: FTS5 on SQLite, pg_trgm elsewhere (other dialects fall back to LIKE scans).
+    """
+    query = query.strip()
+    terms = query.split()
+    long_terms = [term for term in terms if len(term) >= SEARCH_MIN_TERM_LENGTH]
+    stmt = select(Product)
+    if not long_terms:
+        # Barcode-style typing: the first characters of a SKU, through the sku btree index
+        if dialect == "sqlite":
+            # A range rather than LIKE, which SQLite only serves from an index when case-sensitive
+            stmt = stmt.where(Product.sku >= query, Product.sku < query + "\uffff")
+        else:
+            stmt = stmt.where(Product.sku.startswith(query, autoescape=True))
+        text_order = [Product.sku]
+    elif dialect == "sqlite":
+        match = " ".join('"' + term.replace('"', '""') + '"' for term in long_terms)
+        stmt = stmt.join(products_fts, products_fts.c.rowid == Product.id).where(
+            literal_column("products_fts").op("MATCH")(match)
+        )
+        text_order = [func.bm25(literal_column("products_fts"), *SEARCH_FTS_WEIGHTS)]
+    else:
+        text_order = [func.word_similarity(query, Product.name).desc()] if dialect == "postgresql" else []
+    
+    if long_terms:
+        # Terms the index did not filter on (every term, without FTS5) are checked against the candidate rows
+        unindexed = [term for term in terms if term not in long_terms] if dialect == "sqlite" else terms
+        for term in unindexed:
+            fragment = _like_fragment(term)
+            stmt = stmt.where(or_(*(
+                field.ilike(fragment, escape="/") for field in (Product.sku, Product.name, Product.description)
+            )))
+    if categories:
+        stmt = stmt.where(Product.category.in_(categories))
+    
+    sku_rank = case((Product.sku == query, 0), (Product.sku.startswith(query, autoescape=True), 1), else_=2)
+    return stmt.order_by(sku_rank, *text_order, Product.id).limit(limit)
+
+def stock_bucket(status: Optional[str]) -> str:
+    return STATUS_BUCKETS.get(status, "on_hand")
+
+class StockAllocationConflict(Exception):
+    """Raised when stock changed between the allocation read and the guarded decrement"""
 
 class ProductRepository(BaseRepository[Product, ProductCreate, ProductUpdate]):
+    def create(self, db: Session, *, obj_in: ProductCreate) -> Product:
+        db_obj = Product(**jsonable_encoder(obj_in))
+        # Every product has a stock row from the start, so never-stocked products list as out of stock
+        db_obj.stock = ProductStock(on_hand=0, reserved=0, damaged=0)
+        db.add(db_obj)
+        db.commit()
+        db.refresh(db_obj)
+        return db_obj
+
+    def remove(self, db: Session, *, id: int) -> Product:
+        # The stock row's key is the product id; it goes with the product
+        db.query(ProductStock).filter(ProductStock.product_id == id).delete()
+        return super().remove(db, id=id)
+
     def get_by_sku(self, db: Session, sku: str) -> Optional[Product]:
         return db.query(Product).filter(Product.sku == sku).first()
 
+    def get_existing_ids(self, db: Session, product_ids: Iterable[int]) -> Set[int]:
+        product_ids = list(set(product_ids))
+        existing = set()
+        for start in range(0, len(product_ids), 1000):
+            chunk = product_ids[start:start + 1000]
+            existing.update(id_ for (id_,) in db.query(Product.id).filter(Product.id.in_(chunk)))
+        return existing
+
+    def get_by_ids(self, db: Session, product_ids: Iterable[int]) -> List[Product]:
+        product_ids = list(set(product_ids))
+        products = []
+        for start in range(0, len(product_ids), 1000):
+            products.extend(db.scalars(select(Product).where(Product.id.in_(product_ids[start:start + 1000]))))
+        return products
+
+    def get_existing_skus(self, db: Session, skus: Iterable[str]) -> Set[str]:
+        skus = list(set(skus))
+        existing = set()
+        for start in range(0, len(skus), 1000):
+            chunk = skus[start:start + 1000]
+            existing.update(db.scalars(select(Product.sku).where(Product.sku.in_(chunk))))
+        return existing
+
+    def upsert_by_sku(self, db: Session, rows: List[Dict[str, Any]]) -> None:
+        """Insert or update products keyed on sku, as one executemany of INSERT ... ON CONFLICT (sku) DO UPDATE"""
+        if not rows:
+            return
+        now = datetime.utcnow()
+        rows = [dict(row, created_at=now, updated_at=now) for row in rows]
+        columns = [column for column in rows[0] if column not in ("sku", "created_at")]
+        
+        table = Product.__table__
+        stmt = dialect_insert(db, table)
+        if stmt is not None:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.sku],
+                set_={column: stmt.excluded[column] for column in columns}
+            )
+            db.execute(stmt, rows)
+            self._add_missing_stock(db, [row["sku"] for row in rows])
+            return
+        
+        # Portable fallback: one executemany UPDATE for known SKUs, one executemany INSERT for the rest
+        existing = self.get_existing_skus(db, [row["sku"] for row in rows])
+        updates = [row for row in rows if row["sku"] in existing]
+        if updates:
+            # The SET clause comes from the parameter keys; match_sku only feeds the WHERE
+            db.execute(
+                update(table).where(table.c.sku == bindparam("match_sku")),
+                [dict({column: row[column] for column in columns}, match_sku=row["sku"]) for row in updates]
+            )
+        inserts = [row for row in rows if row["sku"] not in existing]
+        if inserts:
+            db.execute(insert(table), inserts)
+        self._add_missing_stock(db, [row["sku"] for row in rows])
+
+    def _add_missing_stock(self, db: Session, skus: List[str]) -> None:
+        for start in range(0, len(skus), 1000):
+            ProductStockRepository().add_missing(db, Product.sku.in_(skus[start:start + 1000]))
+
+    def search(self, db: Session, query: str, categories: Optional[List[str]] = None, limit: int = 20) -> List[Product]:
+        stmt = product_search_statement(db.get_bind().dialect.name, query, categories, limit)
+        return db.scalars(stmt).all()
+
+class ProductStockRepository:
+    def get(self, db: Session, product_id: int) -> Optional[ProductStock]:
+        return db.query(ProductStock).filter(ProductStock.product_id == product_id).first()
+
+    def get_low_stock(self, db: Session, threshold: int = 10, limit: int = 100) -> List[ProductStock]:
+        return db.query(ProductStock).filter(
+            ProductStock.on_hand < threshold
+        ).order_by(ProductStock.on_hand, ProductStock.product_id).limit(limit).all()
+
+    def add_missing(self, db: Session, *criteria) -> None:
+        """Zero rows for the products matching criteria (all products if none) that have no row yet"""
+        db.execute(insert(ProductStock).from_select(
+            ["product_id", "on_hand", "reserved", "damaged", "updated_at"],
+            select(Product.id, literal(0), literal(0), literal(0), literal(datetime.utcnow(), ProductStock.updated_at.type))
+            .where(*criteria, ~select(ProductStock.product_id).where(ProductStock.product_id == Product.id).exists())
+        ))
+
+    def apply_deltas(self, db: Session, deltas: StockDeltas) -> None:
+        """Add per-bucket quantity changes to product_stock with one upsert"""
+        now = datetime.utcnow()
+        rows = [
+            dict({bucket: changes.get(bucket, 0) for bucket in STOCK_BUCKETS}, product_id=product_id, updated_at=now)
+            for product_id, changes in deltas.items()
+            if any(changes.values())
+        ]
+        if not rows:
+            return
+        
+        table = ProductStock.__table__
+        stmt = dialect_insert(db, table)
+        if stmt is not None:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.product_id],
+                set_=dict(
+                    {bucket: table.c[bucket] + stmt.excluded[bucket] for bucket in STOCK_BUCKETS},
+                    updated_at=stmt.excluded.updated_at
+                )
+            )
+            db.execute(stmt, rows)
+            return
+        
+        # Portable fallback: increment in place, insert the rows that did not exist yet
+        for row in rows:
+            result = db.execute(
+                update(table)
+                .where(table.c.product_id == row["product_id"])
+                .values({bucket: table.c[bucket] + row[bucket] for bucket in STOCK_BUCKETS}, updated_at=now)
+            )
+            if result.rowcount == 0:
+                db.execute(insert(table).values(**row))
+
+    def reconcile(self, db: Session, repair: bool = False) -> List[Dict[str, Any]]:
+        """Compare product_stock with inventory_items; optionally overwrite drifted rows"""
+        totals = {
+            bucket: func.coalesce(func.sum(case(
+                (InventoryItem.status.in_([s for s, b in STATUS_BUCKETS.items() if b == bucket]), InventoryItem.quantity),
+                else_=0
+            )), 0)
+            for bucket in ("reserved", "damaged")
+        }
+        totals["on_hand"] = func.coalesce(func.sum(case(
+            (InventoryItem.status.in_(list(STATUS_BUCKETS)), 0),
+            else_=InventoryItem.quantity
+        )), 0)
+        actual = {
+            row.product_id: {bucket: int(row[i + 1]) for i, bucket in enumerate(STOCK_BUCKETS)}
+            for row in db.execute(
+                select(InventoryItem.product_id, *(totals[bucket] for bucket in STOCK_BUCKETS))
+                .group_by(InventoryItem.product_id)
+            )
+        }
+        recorded = {
+            stock.product_id: {bucket: getattr(stock, bucket) for bucket in STOCK_BUCKETS}
+            for stock in db.query(ProductStock).all()
+        }
+        
+        drift = []
+        zero = {bucket: 0 for bucket in STOCK_BUCKETS}
+        for product_id in sorted(set(actual) | set(recorded)):
+            expected = actual.get(product_id, zero)
+            found = recorded.get(product_id)
+            if found != expected and not (found is None and expected == zero):
+                drift.append({"product_id": product_id, "expected": expected, "recorded": found})
+        
+        if repair:
+            self.apply_deltas(db, {
+                entry["product_id"]: {
+                    bucket: entry["expected"][bucket] - (entry["recorded"] or zero)[bucket]
+                    for bucket in STOCK_BUCKETS
+                }
+                for entry in drift
+            })
+            # Products that never had inventory get their zero row too; it is not counted as drift
+            self.add_missing(db)
+            db.commit()
+        return drift
+
 class InventoryRepository:
-    def create_inventory_item(self, db: Session, item_in: InventoryItemCreate) -> InventoryItem:
+    def __init__(self):
+        self.stock_repository = ProductStockRepository()
+
+    def create_inventory_item(self, db: Session, item_in: InventoryItemCreate, commit: bool = True) -> InventoryItem:
         db_item = InventoryItem(
             product_id=item_in.product_id,
             quantity=item_in.quantity,
@@ -20,18 +269,97 @@ class InventoryRepository:
             status=item_in.status
         )
         db.add(db_item)
-        db.commit()
-        db.refresh(db_item)
+        self.stock_repository.apply_deltas(db, {item_in.product_id: {stock_bucket(item_in.status): item_in.quantity}})
+        if commit:
+            db.commit()
+            db.refresh(db_item)
+        else:
+            db.flush()
         return db_item
 
     def get_by_product(self, db: Session, product_id: int) -> List[InventoryItem]:
         return db.query(InventoryItem).filter(InventoryItem.product_id == product_id).all()
 
+    def get_by_ids(self, db: Session, item_ids: Iterable[int]) -> Dict[int, InventoryItem]:
+        item_ids = list(set(item_ids))
+        items = {}
+        for start in range(0, len(item_ids), 1000):
+            for item in db.query(InventoryItem).filter(InventoryItem.id.in_(item_ids[start:start + 1000])):
+                items[item.id] = item
+        return items
+
+    def get_by_products(self, db: Session, product_ids: Iterable[int]) -> Dict[int, List[InventoryItem]]:
+        """Group the inventory rows of several products, oldest first, with one query"""
+        grouped = {product_id: [] for product_id in product_ids}
+        if not grouped:
+            return grouped
+        product_ids = list(grouped)
+        for start in range(0, len(product_ids), 1000):
+            items = db.query(InventoryItem).filter(
+                InventoryItem.product_id.in_(product_ids[start:start + 1000])
+            ).order_by(InventoryItem.id).all()
+            for item in items:
+                grouped[item.product_id].append(item)
+        return grouped
+
+    def allocate(self, db: Session, quantities: Dict[int, int]) -> Dict[int, int]:
+        """Decrement stock FIFO across locations for several products at once.
+
+        Reads every candidate row with one SELECT ... FOR UPDATE (ordered by product
+        then id, so concurrent allocations lock in the same order) and writes all
+        decrements with one executemany. Returns the unfilled quantity per product.
+        """
+        requested = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+        if not requested:
+            return {}
+        
+        table = InventoryItem.__table__
+        rows = db.execute(
+            select(table.c.id, table.c.product_id, table.c.quantity, table.c.status)
+            .where(table.c.product_id.in_(sorted(requested)), table.c.quantity > 0)
+            .order_by(table.c.product_id, table.c.id)
+            .with_for_update()
+        ).all()
+        
+        remaining = dict(requested)
+        takes = []
+        deltas: StockDeltas = defaultdict(lambda: defaultdict(int))
+        for item_id, product_id, available, status in rows:
+            take = min(available, remaining[product_id])
+            if take:
+                takes.append({"item_id": item_id, "take": take})
+                remaining[product_id] -= take
+                deltas[product_id][stock_bucket(status)] -= take
+        
+        if takes:
+            # Relative, guarded decrement: never lose a concurrent update or go negative
+            result = db.execute(
+                update(table)
+                .where(table.c.id == bindparam("item_id"), table.c.quantity >= bindparam("take"))
+                .values(quantity=table.c.quantity - bindparam("take"))
+                .execution_options(synchronize_session=False),
+                takes
+            )
+            if db.get_bind().dialect.supports_sane_multi_rowcount and result.rowcount != len(takes):
+                raise StockAllocationConflict("Inventory changed during allocation")
+            self.stock_repository.apply_deltas(db, deltas)
+        
+        return {product_id: quantity for product_id, quantity in remaining.items() if quantity}
+
+    def set_quantities(self, db: Session, changes: List[Tuple[InventoryItem, int]], counted: bool = False) -> None:
+        """Set new quantities on loaded rows and record the stock deltas with one upsert (no commit)"""
+        deltas: StockDeltas = defaultdict(lambda: defaultdict(int))
+        for db_item, quantity in changes:
+            deltas[db_item.product_id][stock_bucket(db_item.status)] += quantity - (db_item.quantity or 0)
+            db_item.quantity = quantity
+            if counted:
+                db_item.last_count_date = datetime.utcnow()
+        self.stock_repository.apply_deltas(db, deltas)
+
     def update_quantity(self, db: Session, item_id: int, quantity: int) -> InventoryItem:
         db_item = db.query(InventoryItem).filter(InventoryItem.id == item_id).first()
         if db_item:
-            db_item.quantity = quantity
-            db_item.last_count_date = datetime.utcnow()
+            self.set_quantities(db, [(db_item, quantity)], counted=True)
             db.commit()
             db.refresh(db_item)
         return db_item
@@ -40,4 +368,36 @@ class InventoryRepository:
         count_date = datetime.utcnow() - timedelta(days=days)
         return db.query(InventoryItem).filter(
             InventoryItem.last_count_date < count_date
-        ).all()
\ No newline at end of file
+        ).all()
+
+class AsyncProductRepository(AsyncBaseRepository[Product]):
+    async def get_by_sku(self, db: AsyncSession, sku: str) -> Optional[Product]:
+        return await db.scalar(select(Product).where(Product.sku == sku))
+
+    async def search(self, db: AsyncSession, query: str, categories: Optional[List[str]] = None,
+                     limit: int = 20) -> List[Product]:
+        stmt = product_search_statement(db.get_bind().dialect.name, query, categories, limit)
+        result = await db.scalars(stmt)
+        return result.all()
+
+class AsyncInventoryRepository:
+    async def get_by_product(self, db: AsyncSession, product_id: int) -> List[InventoryItem]:
+        result = await db.scalars(select(InventoryItem).where(InventoryItem.product_id == product_id))
+        return result.all()
+
+    async def get_stock(self, db: AsyncSession, product_id: int) -> Optional[ProductStock]:
+        return await db.get(ProductStock, product_id)
+
+    async def get_low_stock(self, db: AsyncSession, threshold: int = 10, limit: int = 100,
+                            after: Optional[Tuple[int, int]] = None) -> List[ProductStock]:
+        """Products below threshold, lowest first; `after` is the (on_hand, product_id) of the previous page's last row"""
+        stmt = (
+            select(ProductStock)
+            .where(ProductStock.on_hand < threshold)
+            .order_by(ProductStock.on_hand, ProductStock.product_id)
+            .limit(limit)
+        )
+        if after is not None:
+            stmt = stmt.where(tuple_(ProductStock.on_hand, ProductStock.product_id) > tuple_(*after))
+        result = await db.scalars(stmt)
+        return result.all()
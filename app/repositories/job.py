@@ -0,0 +1,101 @@
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.models.job import Job
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+class JobRepository:
+    def get(self, db: Session, job_id: int) -> Optional[Job]:
+        return db.query(Job).filter(Job.id == job_id).first()
+
+    def create(self, db: Session, kind: str, params: Dict[str, Any], created_by: Optional[int]) -> Job:
+        db_job = Job(kind=kind, params=params, created_by=created_by)
+        db.add(db_job)
+        db.commit()
+        db.refresh(db_job)
+        return db_job
+
+    def count_queued(self, db: Session) -> int:
+        return db.execute(select(func.count(Job.id)).where(Job.status == "queued")).scalar_one()
+
+    def get_unfinished_params(self, db: Session, kind: str) -> List[Dict[str, Any]]:
+        return list(db.scalars(select(Job.params).where(Job.kind == kind, Job.status.in_(["queued", "running"]))))
+
+    def claim_next(self, db: Session, worker: str, stale_before: datetime, max_attempts: int) -> Optional[Job]:
+        """Take the oldest queued job, or a running one whose worker stopped heartbeating.
+        The conditional UPDATE is the lock: of several workers racing for a row, exactly one sees rowcount 1."""
+        claimable = or_(
+            Job.status == "queued",
+            and_(Job.status == "running", Job.heartbeat_at < stale_before, Job.attempts < max_attempts),
+        )
+        while True:
+            job_id = db.scalar(select(Job.id).where(claimable).order_by(Job.id).limit(1))
+            if job_id is None:
+                db.commit()
+                return None
+            now = datetime.utcnow()
+            result = db.execute(
+                update(Job)
+                .where(Job.id == job_id, claimable)
+                .values(status="running", worker=worker, started_at=now, heartbeat_at=now, attempts=Job.attempts + 1)
+            )
+            db.commit()
+            if result.rowcount == 1:
+                return self.get(db, job_id)
+
+    def heartbeat(self, db: Session, job_ids: Iterable[int]) -> None:
+        job_ids = list(job_ids)
+        if job_ids:
+            db.execute(
+                update(Job).where(Job.id.in_(job_ids), Job.status == "running").values(heartbeat_at=datetime.utcnow())
+            )
+            db.commit()
+
+    def is_cancel_requested(self, db: Session, job_id: int) -> bool:
+        return bool(db.scalar(select(Job.cancel_requested).where(Job.id == job_id)))
+
+    def finish(self, db: Session, job_id: int, status: str, retention: timedelta,
+               result: Any = None, error: Optional[str] = None) -> None:
+        now = datetime.utcnow()
+        db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "running")
+            .values(status=status, result=result, error=error, finished_at=now, expires_at=now + retention)
+        )
+        db.commit()
+
+    def cancel(self, db: Session, job_id: int, retention: timedelta) -> Optional[Job]:
+        """Queued jobs are cancelled outright; running ones are flagged and stop at their next check"""
+        now = datetime.utcnow()
+        db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == "queued")
+            .values(status="cancelled", cancel_requested=True, finished_at=now, expires_at=now + retention)
+        )
+        db.execute(update(Job).where(Job.id == job_id, Job.status == "running").values(cancel_requested=True))
+        db.commit()
+        return self.get(db, job_id)
+
+    def fail_abandoned(self, db: Session, stale_before: datetime, max_attempts: int, retention: timedelta) -> None:
+        """Running jobs whose workers died once too often are failed instead of being retried again"""
+        now = datetime.utcnow()
+        db.execute(
+            update(Job)
+            .where(Job.status == "running", Job.heartbeat_at < stale_before, Job.attempts >= max_attempts)
+            .values(status="failed", error="Worker stopped responding", finished_at=now, expires_at=now + retention)
+        )
+        db.commit()
+
+    def purge_expired(self, db: Session) -> int:
+        result = db.execute(delete(Job).where(Job.status.in_(FINISHED_STATUSES), Job.expires_at < datetime.utcnow()))
+        db.commit()
+        return result.rowcount
+
+class AsyncJobRepository:
+    async def get(self, db: AsyncSession, job_id: int) -> Optional[Job]:
+        # populate_existing so a long-poll sees what workers committed since the previous look
+        return await db.get(Job, job_id, populate_existing=True)
@@ -0,0 +1,275 @@
+from sqlalchemy import Date, Select, and_, cast, delete, func, insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
+from datetime import date, datetime, time
+from typing import Any, AsyncIterator, Collection, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import json
+import re
+from time import monotonic
+
+from app.models.inventory import Product
+from app.models.report import DailyProductSales, QueryTranslation
+from app.models.transaction import Transaction, TransactionItem
+from app.repositories.base import dialect_insert
+
+# Statuses excluded from sales figures
+EXCLUDED_SALE_STATUSES = ("cancelled",)
+
+RollupKey = Tuple[date, int]
+# (sales_date, transaction_key, product_id, quantity, revenue)
+SaleLine = Tuple[date, object, int, int, float]
+
+def counts_as_sale(transaction: Transaction) -> bool:
+    return transaction.transaction_type == "sale" and transaction.status not in EXCLUDED_SALE_STATUSES
+
+class SalesRollupRepository:
+    def collect(self, lines: Iterable[SaleLine]) -> Dict[RollupKey, List[float]]:
+        """Aggregate sale lines into {(day, product_id): [quantity, revenue, transaction_count]}"""
+        rollup: Dict[RollupKey, List[float]] = {}
+        seen = set()
+        for sales_date, transaction_key, product_id, quantity, revenue in lines:
+            key = (sales_date, product_id)
+            entry = rollup.setdefault(key, [0, 0.0, 0])
+            entry[0] += quantity or 0
+            entry[1] += revenue or 0.0
+            if (key, transaction_key) not in seen:
+                entry[2] += 1
+                seen.add((key, transaction_key))
+        return rollup
+    
+    @staticmethod
+    def transaction_lines(transactions: Iterable[Transaction]) -> Iterator[SaleLine]:
+        for transaction in transactions:
+            sales_date = (transaction.transaction_date or datetime.utcnow()).date()
+            for item in transaction.items:
+                yield sales_date, id(transaction), item.product_id, item.quantity, item.total_price
+    
+    def apply(self, db: Session, transactions: Iterable[Transaction], sign: int = 1) -> None:
+        """Add (sign=1) or remove (sign=-1) sales from the rollup without committing"""
+        self.apply_lines(db, self.transaction_lines(transactions), sign)
+    
+    def apply_lines(self, db: Session, lines: Iterable[SaleLine], sign: int = 1) -> None:
+        """Apply raw (day, transaction_key, product_id, quantity, revenue) sale lines to the rollup"""
+        rows = [
+            {
+                "sales_date": sales_date,
+                "product_id": product_id,
+                "quantity": sign * quantity,
+                "revenue": sign * revenue,
+                "transaction_count": sign * count,
+            }
+            for (sales_date, product_id), (quantity, revenue, count) in self.collect(lines).items()
+        ]
+        if not rows:
+            return
+        
+        table = DailyProductSales.__table__
+        stmt = dialect_insert(db, table)
+        if stmt is not None:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.sales_date, table.c.product_id],
+                set_={
+                    "quantity": table.c.quantity + stmt.excluded.quantity,
+                    "revenue": table.c.revenue + stmt.excluded.revenue,
+                    "transaction_count": table.c.transaction_count + stmt.excluded.transaction_count,
+                }
+            )
+            db.execute(stmt, rows)
+            return
+        
+        # Portable fallback: increment in place, insert the rows that did not exist yet
+        for row in rows:
+            result = db.execute(
+                update(table)
+                .where(table.c.sales_date == row["sales_date"], table.c.product_id == row["product_id"])
+                .values(
+                    quantity=table.c.quantity + row["quantity"],
+                    revenue=table.c.revenue + row["revenue"],
+                    transaction_count=table.c.transaction_count + row["transaction_count"],
+                )
+            )
+            if result.rowcount == 0:
+                db.execute(insert(table).values(**row))
+    
+    def get_product_totals(self, db: Session, first_day: date, last_day: date) -> List[Tuple[str, int, float]]:
+        """Return (product_name, quantity, revenue) per product for the inclusive day range"""
+        stmt = (
+            select(
+                Product.name,
+                func.sum(DailyProductSales.quantity),
+                func.sum(DailyProductSales.revenue),
+            )
+            .join(Product, Product.id == DailyProductSales.product_id)
+            .where(DailyProductSales.sales_date >= first_day, DailyProductSales.sales_date <= last_day)
+            .group_by(DailyProductSales.product_id, Product.name)
+        )
+        return db.execute(stmt).all()
+    
+    def rebuild(self, db: Session, first_day: Optional[date] = None, last_day: Optional[date] = None) -> int:
+        """Recompute the rollup from raw transactions for the given days (all days if omitted)"""
+        if db.get_bind().dialect.name == "sqlite":
+            sales_date = func.date(Transaction.transaction_date)
+        else:
+            sales_date = cast(Transaction.transaction_date, Date)
+        
+        clear = delete(DailyProductSales)
+        conditions = [
+            Transaction.transaction_type == "sale",
+            Transaction.status.notin_(EXCLUDED_SALE_STATUSES),
+        ]
+        if first_day:
+            clear = clear.where(DailyProductSales.sales_date >= first_day)
+            conditions.append(Transaction.transaction_date >= datetime.combine(first_day, time.min))
+        if last_day:
+            clear = clear.where(DailyProductSales.sales_date <= last_day)
+            conditions.append(Transaction.transaction_date <= datetime.combine(last_day, time.max))
+        db.execute(clear)
+        
+        totals = (
+            select(
+                sales_date.label("sales_date"),
+                TransactionItem.product_id,
+                func.sum(TransactionItem.quantity),
+                func.sum(TransactionItem.total_price),
+                func.count(func.distinct(TransactionItem.transaction_id)),
+            )
+            .join(TransactionItem, TransactionItem.transaction_id == Transaction.id)
+            .where(and_(*conditions))
+            .group_by(sales_date, TransactionItem.product_id)
+        )
+        result = db.execute(
+            insert(DailyProductSales).from_select(
+                ["sales_date", "product_id", "quantity", "revenue", "transaction_count"], totals
+            )
+        )
+        db.commit()
+        return result.rowcount
+
+class AsyncQueryTranslationRepository:
+    async def get_current(self, db: AsyncSession, question_hash: str, now: datetime) -> Optional[QueryTranslation]:
+        return await db.scalar(select(QueryTranslation).where(
+            QueryTranslation.question_hash == question_hash, QueryTranslation.expires_at > now
+        ))
+
+    async def record_hit(self, db: AsyncSession, translation_id: int, now: datetime) -> None:
+        # Incremented in SQL so concurrent hits are all counted
+        await db.execute(
+            update(QueryTranslation)
+            .where(QueryTranslation.id == translation_id)
+            .values(hit_count=QueryTranslation.hit_count + 1, last_used_at=now)
+        )
+        await db.commit()
+
+    async def save(self, db: AsyncSession, values: Dict[str, Any]) -> None:
+        """Store a translation, replacing an expired one for the same question"""
+        values = dict(values, hit_count=0, last_used_at=None)
+        stmt = dialect_insert(db, QueryTranslation.__table__)
+        if stmt is not None:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[QueryTranslation.question_hash],
+                set_={column: stmt.excluded[column] for column in values if column != "question_hash"}
+            )
+            await db.execute(stmt, values)
+            await db.commit()
+            return
+        
+        await db.execute(delete(QueryTranslation).where(QueryTranslation.question_hash == values["question_hash"]))
+        try:
+            await db.execute(insert(QueryTranslation), values)
+            await db.commit()
+        except IntegrityError:
+            # A concurrent request stored the same question first
+            await db.rollback()
+
+# SQLite has no statement timeout; its progress handler checks the deadline every this many VM steps
+SQLITE_PROGRESS_STEPS = 10000
+_SQLITE_PLAN_STEP = re.compile(r"(SCAN|SEARCH)(?: TABLE)? (\S+)(?: AS (\S+))?(.*)")
+
+class AsyncReportQueryRepository:
+    """Runs already-validated report SQL read-only and bounded in time, estimated cost and rows"""
+
+    @asynccontextmanager
+    async def read_only(self, db: AsyncSession, timeout_ms: int) -> AsyncIterator[None]:
+        """A read-only transaction whose statements are cancelled after timeout_ms; always rolled back"""
+        await db.commit()
+        connection = await db.connection()
+        dialect = connection.dialect.name
+        driver_connection = None
+        if dialect == "postgresql":
+            await connection.execute(text("SET TRANSACTION READ ONLY"))
+            await connection.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+        elif dialect == "sqlite":
+            await connection.execute(text("PRAGMA query_only = ON"))
+            driver_connection = (await connection.get_raw_connection()).driver_connection
+            deadline = monotonic() + timeout_ms / 1000.0
+            # A true return interrupts the running statement
+            await driver_connection.set_progress_handler(lambda: monotonic() > deadline, SQLITE_PROGRESS_STEPS)
+        try:
+            yield
+        finally:
+            if driver_connection is not None:
+                # The pooled connection outlives this request
+                await driver_connection.set_progress_handler(None, 0)
+                await connection.execute(text("PRAGMA query_only = OFF"))
+            await db.rollback()
+
+    async def estimate_cost(self, db: AsyncSession, sql: str, tables: Dict[str, str], known_tables: Collection[str]) -> float:
+        """Planner cost on PostgreSQL; on SQLite, which reports no costs, the rows its plan visits.
+
+        `tables` maps the aliases in sql to table names; only known_tables are sized."""
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            plan = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))).scalar()
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return float(plan[0]["Plan"]["Total Cost"])
+        if dialect != "sqlite":
+            return 0.0
+        
+        sizes: Dict[str, int] = {}
+        
+        async def size(alias: str) -> int:
+            table = tables.get(alias.lower())
+            if table not in known_tables:
+                return 1  # a CTE or subquery, sized through its own plan steps
+            if table not in sizes:
+                sizes[table] = (await db.execute(text(f'SELECT COALESCE(MAX(rowid), 0) FROM "{table}"'))).scalar()
+            return sizes[table]
+        
+        # Full scans under the same parent are nested loops and multiply; automatic indexes are built once
+        nested: Dict[int, float] = {}
+        built = 0.0
+        for _, parent, _, detail in (await db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all():
+            match = _SQLITE_PLAN_STEP.match(detail)
+            if match is None:
+                continue
+            operation, name, alias, rest = match.groups()
+            rows = await size(alias or name)
+            if operation == "SCAN":
+                nested[parent] = nested.get(parent, 1.0) * max(rows, 1)
+            elif "AUTOMATIC" in rest:
+                built += rows
+        return sum(nested.values()) + built
+
+    def _page(self, query: Union[str, Select], offset: int, limit: int):
+        # Wrapped rather than edited, so a LIMIT already in the query still applies
+        if isinstance(query, str):
+            return text(f"SELECT * FROM ({query}) AS report_query LIMIT :limit OFFSET :offset"), {"limit": limit, "offset": offset}
+        return select(query.subquery("report_query")).limit(limit).offset(offset), {}
+
+    async def fetch_page(self, db: AsyncSession, query: Union[str, Select], offset: int, limit: int) -> List[Dict[str, Any]]:
+        """Up to limit + 1 rows from offset of validated SQL or a pre-written statement; the extra row tells
+        the caller another page exists"""
+        result = await db.execute(*self._page(query, offset, limit + 1))
+        return [dict(row._mapping) for row in result]
+
+    async def stream_page(self, db: AsyncSession, query: Union[str, Select], offset: int, limit: int) -> AsyncIterator[Dict[str, Any]]:
+        """fetch_page from a server-side cursor, one row at a time"""
+        result = await db.stream(*self._page(query, offset, limit + 1))
+        try:
+            async for row in result:
+                yield dict(row._mapping)
+        finally:
+            await result.close()
@@ -1,12 +1,17 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from datetime import datetime
-from typing import List, Optional
+from typing import Iterable, List, Optional, Set, Tuple
 import uuid
 
 from app.models.transaction import Transaction, TransactionItem, Customer, Vendor
 from app.schemas.transaction import TransactionCreate, TransactionItemCreate
 from app.repositories.base import BaseRepository
 
+def generate_reference_number() -> str:
+    return f"TX-{uuid.uuid4().hex[:8].upper()}"
+
 class CustomerRepository(BaseRepository):
     def __init__(self):
         super().__init__(Customer)
@@ -19,9 +24,8 @@ class TransactionRepository:
     def create_transaction(self, db: Session, transaction: TransactionCreate) -> Transaction:
         # Generate a unique reference number if not provided
         if not transaction.reference_number:
-            transaction.reference_number = f"TX-{uuid.uuid4().hex[:8].upper()}"
+            transaction.reference_number = generate_reference_number()
         
-        # Create transaction
         db_transaction = Transaction(
             transaction_type=transaction.transaction_type,
             reference_number=transaction.reference_number,
@@ -32,24 +36,77 @@ class TransactionRepository:
             notes=transaction.notes
         )
         db.add(db_transaction)
-        db.commit()
-        db.refresh(db_transaction)
+        db.flush()
         
-        # Create transaction items
-        for item in transaction.items:
-            db_item = TransactionItem(
-                transaction_id=db_transaction.id,
-                product_id=item.product_id,
-                quantity=item.quantity,
-                unit_price=item.unit_price,
-                total_price=item.quantity * item.unit_price
-            )
-            db.add(db_item)
+        # All line items go in as one executemany; an ORM flush would insert them one at a time
+        # on dialects that cannot batch INSERT ... RETURNING in a guaranteed order
+        if transaction.items:
+            db.execute(insert(TransactionItem.__table__), [
+                {
+                    "transaction_id": db_transaction.id,
+                    "product_id": item.product_id,
+                    "quantity": item.quantity,
+                    "unit_price": item.unit_price,
+                    "total_price": item.quantity * item.unit_price,
+                }
+                for item in transaction.items
+            ])
         
-        db.commit()
-        db.refresh(db_transaction)
+        # The caller owns the commit so inventory changes land in the same database transaction
         return db_transaction
 
+    def bulk_create_transactions(self, db: Session, transactions: List[TransactionCreate], transaction_date: datetime) -> List[int]:
+        """Insert headers and line items with one executemany each; returns header ids in input order"""
+        header_rows = [
+            {
+                "transaction_date": transaction_date,
+                "transaction_type": transaction.transaction_type,
+                "reference_number": transaction.reference_number,
+                "customer_id": transaction.customer_id,
+                "vendor_id": transaction.vendor_id,
+                "total_amount": transaction.total_amount,
+                "status": transaction.status,
+                "notes": transaction.notes,
+            }
+            for transaction in transactions
+        ]
+        # Match returned ids back by reference number (unique within the batch) so the driver
+        # is free to batch the RETURNING insert without preserving parameter order
+        transactions_table = Transaction.__table__
+        returned = db.execute(
+            insert(transactions_table).returning(transactions_table.c.reference_number, transactions_table.c.id),
+            header_rows
+        ).all()
+        id_by_reference = dict(returned)
+        ids = [id_by_reference[transaction.reference_number] for transaction in transactions]
+        
+        item_rows = [
+            {
+                "transaction_id": transaction_id,
+                "product_id": item.product_id,
+                "quantity": item.quantity,
+                "unit_price": item.unit_price,
+                "total_price": item.quantity * item.unit_price,
+            }
+            for transaction, transaction_id in zip(transactions, ids)
+            for item in transaction.items
+        ]
+        if item_rows:
+            # Core table inserts skip the ORM bulk-persistence bookkeeping
+            db.execute(insert(TransactionItem.__table__), item_rows)
+        return ids
+
+    def get_existing_references(self, db: Session, references: Iterable[str]) -> Set[str]:
+        references = list(set(references))
+        existing = set()
+        # Chunk the IN list to stay under driver bind-parameter limits
+        for start in range(0, len(references), 1000):
+            chunk = references[start:start + 1000]
+            existing.update(db.scalars(
+                select(Transaction.reference_number).where(Transaction.reference_number.in_(chunk))
+            ))
+        return existing
+
     def get_transaction(self, db: Session, transaction_id: int) -> Optional[Transaction]:
         return db.query(Transaction).filter(Transaction.id == transaction_id).first()
 
@@ -57,7 +114,15 @@ class TransactionRepository:
         return db.query(Transaction).filter(Transaction.reference_number == reference).first()
 
     def get_transactions(self, db: Session, skip: int = 0, limit: int = 100) -> List[Transaction]:
-        return db.query(Transaction).order_by(Transaction.transaction_date.desc()).offset(skip).limit(limit).all()
+        # Items are serialized with every transaction; load the page's items in one IN query rather than one each
+        return (
+            db.query(Transaction)
+            .options(selectinload(Transaction.items))
+            .order_by(Transaction.transaction_date.desc())
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
 
     def update_transaction_status(self, db: Session, transaction_id: int, status: str) -> Optional[Transaction]:
         db_transaction = self.get_transaction(db, transaction_id)
@@ -65,4 +130,36 @@ class TransactionRepository:
             db_transaction.status = status
             db.commit()
             db.refresh(db_transaction)
-        return db_transaction
\ No newline at end of file
+        return db_transaction
+
+class AsyncTransactionRepository:
+    # Items are eager-loaded because an AsyncSession cannot lazy-load them during serialization
+    async def get_transaction(self, db: AsyncSession, transaction_id: int) -> Optional[Transaction]:
+        return await db.scalar(
+            select(Transaction).options(selectinload(Transaction.items)).where(Transaction.id == transaction_id)
+        )
+
+    async def get_transactions(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Transaction]:
+        result = await db.scalars(
+            select(Transaction)
+            .options(selectinload(Transaction.items))
+            .order_by(Transaction.transaction_date.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+        return result.all()
+
+    async def get_transactions_page(self, db: AsyncSession, after: Optional[Tuple[datetime, int]] = None,
+                                    limit: int = 100) -> List[Transaction]:
+        """Newest first; `after` is the (transaction_date, id) of the previous page's last row.
+        Served by ix_transactions_date_id, so every page is an index range scan"""
+        stmt = (
+            select(Transaction)
+            .options(selectinload(Transaction.items))
+            .order_by(Transaction.transaction_date.desc(), Transaction.id.desc())
+            .limit(limit)
+        )
+        if after is not None:
+            stmt = stmt.where(tuple_(Transaction.transaction_date, Transaction.id) < tuple_(*after))
+        result = await db.scalars(stmt)
+        return result.all()
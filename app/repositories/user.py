@@ -1,4 +1,6 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
 from typing import Optional, List
 
 from app.models.user import User, Role
@@ -6,8 +8,15 @@ from app.schemas.user import UserCreate, UserUpdate
 from app.repositories.base import BaseRepository
 
 class UserRepository(BaseRepository[User, UserCreate, UserUpdate]):
+    # Roles are part of every user response, so they are loaded with the user
+    def get(self, db: Session, id: int) -> Optional[User]:
+        return db.query(User).options(selectinload(User.roles)).filter(User.id == id).first()
+    
+    def get_multi(self, db: Session, *, skip: int = 0, limit: int = 100) -> List[User]:
+        return db.query(User).options(selectinload(User.roles)).order_by(User.id).offset(skip).limit(limit).all()
+    
     def get_by_username(self, db: Session, username: str) -> Optional[User]:
-        return db.query(User).filter(User.username == username).first()
+        return db.query(User).options(selectinload(User.roles)).filter(User.username == username).first()
     
     def get_by_email(self, db: Session, email: str) -> Optional[User]:
         return db.query(User).filter(User.email == email).first()
@@ -24,4 +33,9 @@ class RoleRepository:
         return db_role
     
     def get_roles(self, db: Session) -> List[Role]:
-        return db.query(Role).all()
\ No newline at end of file
+        return db.query(Role).all()
+
+class AsyncUserRepository:
+    async def get_by_username(self, db: AsyncSession, username: str) -> Optional[User]:
+        # Roles are eager-loaded for the permission checks in app.api.dependencies
+        return await db.scalar(select(User).options(selectinload(User.roles)).where(User.username == username))
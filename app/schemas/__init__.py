@@ -1,5 +1,7 @@
 # Import schemas for easy access
-from app.schemas.user import User, UserCreate, UserUpdate, Token, TokenData
-from app.schemas.inventory import Product, ProductCreate, ProductUpdate, InventoryItem, InventoryItemCreate
-from app.schemas.transaction import Transaction, TransactionCreate, TransactionItem, TransactionItemCreate
-from app.schemas.report import NaturalLanguageQuery, QueryResult
\ No newline at end of file
+from app.schemas.user import User, UserCreate, UserUpdate, Token, TokenData, Principal
+from app.schemas.inventory import Product, ProductCreate, ProductUpdate, InventoryItem, InventoryItemCreate, ProductStock
+from app.schemas.transaction import Transaction, TransactionCreate, TransactionItem, TransactionItemCreate, TransactionBulkResponse
+from app.schemas.report import NaturalLanguageQuery, QueryResult
+from app.schemas.import_job import ImportJob
+from app.schemas.job import Job
\ No newline at end of file
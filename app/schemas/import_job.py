@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import List, Optional
+
+class ImportJob(BaseModel):
+    id: int
+    kind: str
+    status: str
+    filename: Optional[str] = None
+    rows_processed: int
+    rows_imported: int
+    rows_failed: int
+    rows_per_second: float
+    errors: List[str] = []
+    message: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
@@ -42,5 +42,15 @@ class InventoryItem(InventoryItemBase):
     id: int
     last_count_date: datetime
 
+    class Config:
+        orm_mode = True
+
+class ProductStock(BaseModel):
+    product_id: int
+    on_hand: int
+    reserved: int
+    damaged: int
+    updated_at: Optional[datetime] = None
+
     class Config:
         orm_mode = True
\ No newline at end of file
@@ -3,9 +3,16 @@ from typing import List, Dict, Any, Optional
 
 class NaturalLanguageQuery(BaseModel):
     query: str
+    # next_cursor of the previous page of the same question
+    cursor: Optional[str] = None
 
 class QueryResult(BaseModel):
     query: str
     sql: str
+    # True when the SQL came from the translation cache rather than the translator
+    cached: bool = False
+    # The pre-written query that answered a recognized question; None when the SQL was translated
+    intent: Optional[str] = None
     results: Optional[List[Dict[str, Any]]] = None
-    error: Optional[str] = None
\ No newline at end of file
+    error: Optional[str] = None
+    next_cursor: Optional[str] = None
\ No newline at end of file
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 
 class TransactionItemBase(BaseModel):
@@ -33,10 +33,24 @@ class Transaction(TransactionBase):
     id: int
     transaction_date: datetime
     items: List[TransactionItem]
+    # Units per product that could not be taken from stock (only set when the sale is created)
+    stock_shortfalls: Optional[Dict[int, int]] = None
 
     class Config:
         orm_mode = True
 
+class TransactionBulkResult(BaseModel):
+    index: int
+    reference_number: Optional[str] = None
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class TransactionBulkResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[TransactionBulkResult]
+    stock_shortfalls: Dict[int, int] = {}
+
 class CustomerBase(BaseModel):
     name: str
     email: Optional[str] = None
@@ -46,4 +46,16 @@ class User(UserBase):
     roles: List[Role] = []
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class Principal(BaseModel):
+    """Snapshot of the authenticated user kept in the principal cache"""
+    id: int
+    username: str
+    is_active: bool
+    roles: List[str] = []
+    # Tokens with a lower "ver" claim were issued before a change that revoked them
+    token_version: int = 0
+
+    def has_role(self, name: str) -> bool:
+        return name in self.roles
@@ -2,4 +2,6 @@
 from app.services.inventory import InventoryService
 from app.services.transaction import TransactionService
 from app.services.authentication import AuthService
-from app.services.report import ReportGenerator
\ No newline at end of file
+from app.services.report import ReportGenerator
+from app.services.imports import ImportService
+from app.services.jobs import JobService
\ No newline at end of file
@@ -1,31 +1,73 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Dict, Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import os
+import time
+import uuid
 
 from app.models.user import User, Role
-from app.schemas.user import UserCreate, UserUpdate, TokenData
-from app.repositories.user import UserRepository, RoleRepository
+from app.schemas.user import UserCreate, UserUpdate, TokenData, Principal
+from app.repositories.user import AsyncUserRepository, UserRepository, RoleRepository
+from app.utils.cache import TTLCache, create_cache
+from app.utils.executors import password_executor
+from app.utils.security import get_password_hash, needs_rehash, verify_password
 
 # JWT configuration
 SECRET_KEY = os.getenv("JWT_SECRET", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Principals keyed by token subject; set PRINCIPAL_CACHE_URL=redis://... to share entries across workers
+PRINCIPAL_CACHE_URL = os.getenv("PRINCIPAL_CACHE_URL")
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+principal_cache = create_cache(
+    "principal", PRINCIPAL_CACHE_URL, maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL
+)
+
+# Decoded payloads of tokens whose signature was already checked, so a repeated bearer skips jwt.decode
+VERIFIED_TOKEN_CACHE_TTL = float(os.getenv("VERIFIED_TOKEN_CACHE_TTL", "300"))
+VERIFIED_TOKEN_CACHE_SIZE = int(os.getenv("VERIFIED_TOKEN_CACHE_SIZE", "10000"))
+verified_token_cache = TTLCache("verified_token", maxsize=VERIFIED_TOKEN_CACHE_SIZE, ttl=VERIFIED_TOKEN_CACHE_TTL)
+
+# Revoked token ids and per-user minimum token versions; entries live as long as any token they can affect.
+# Unbounded on purpose: an evicted revocation would silently reinstate a token
+token_revocations = create_cache(
+    "token_revocation", PRINCIPAL_CACHE_URL, maxsize=None, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+
+# Authorize from token claims alone, without the principal lookup. Only safe when every worker sees the
+# same revocations, so it also needs PRINCIPAL_CACHE_URL; otherwise the token version is checked against
+# the user (through the principal cache) on each request
+TRUST_TOKEN_CLAIMS = (
+    os.getenv("TRUST_TOKEN_CLAIMS", "false").lower() in ("1", "true", "yes") and bool(PRINCIPAL_CACHE_URL)
+)
 
 class AuthService:
     def __init__(self):
         self.user_repository = UserRepository(User)
         self.role_repository = RoleRepository()
+        self.async_user_repository = AsyncUserRepository()
     
+    # Hashing uses the shared context in app.utils.security and runs on the bounded password pool;
+    # callers block (or await) without occupying the event loop
     def verify_password(self, plain_password, hashed_password):
-        return pwd_context.verify(plain_password, hashed_password)
+        return password_executor.call(verify_password, plain_password, hashed_password)
     
     def get_password_hash(self, password):
-        return pwd_context.hash(password)
+        return password_executor.call(get_password_hash, password)
+    
+    async def verify_password_async(self, plain_password, hashed_password):
+        return await password_executor.run(verify_password, plain_password, hashed_password)
+    
+    async def get_password_hash_async(self, password):
+        return await password_executor.run(get_password_hash, password)
+    
+    def needs_rehash(self, hashed_password: str) -> bool:
+        return needs_rehash(hashed_password)
     
     def authenticate_user(self, db: Session, username: str, password: str) -> Optional[User]:
         user = self.user_repository.get_by_username(db, username)
@@ -45,6 +87,55 @@ class AuthService:
         encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
         return encoded_jwt
     
+    def create_user_token(self, user: User, expires_delta: Optional[timedelta] = None) -> str:
+        """Token carrying the claims needed to authorize without a database lookup"""
+        return self.create_access_token(
+            data={
+                "sub": user.username,
+                "uid": user.id,
+                "roles": [role.name for role in user.roles],
+                "active": bool(user.is_active),
+                "ver": user.token_version or 0,
+                "jti": uuid.uuid4().hex,
+            },
+            expires_delta=expires_delta
+        )
+    
+    def decode_token(self, token: str) -> Dict[str, Any]:
+        """Verify and decode a token, reusing the result for tokens already verified (raises JWTError)"""
+        payload = verified_token_cache.get(token)
+        if payload is None:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            # Never keep a payload past its own expiry
+            remaining = payload.get("exp", 0) - time.time()
+            if remaining > 0:
+                verified_token_cache.set(token, payload, ttl=min(remaining, VERIFIED_TOKEN_CACHE_TTL))
+        return payload
+    
+    def is_token_revoked(self, payload: Dict[str, Any]) -> bool:
+        min_version = token_revocations.get(f"user:{payload.get('sub')}")
+        if min_version is not None and payload.get("ver", 0) < min_version:
+            return True
+        jti = payload.get("jti")
+        return jti is not None and token_revocations.get(f"jti:{jti}") is not None
+    
+    def revoke_token(self, payload: Dict[str, Any]) -> None:
+        """Revoke a single token (logout) until it would have expired anyway"""
+        if payload.get("jti"):
+            remaining = payload.get("exp", 0) - time.time()
+            token_revocations.set(f"jti:{payload['jti']}", 1, ttl=max(remaining, 1))
+    
+    def principal_from_claims(self, payload: Dict[str, Any]) -> Optional[Principal]:
+        # Tokens issued before role claims existed carry only "sub"
+        if "ver" not in payload or "uid" not in payload:
+            return None
+        return Principal(
+            id=payload["uid"],
+            username=payload["sub"],
+            is_active=payload.get("active", False),
+            roles=payload.get("roles", [])
+        )
+    
     def create_user(self, db: Session, user_in: UserCreate) -> Optional[User]:
         # Check if user already exists
         db_user = self.user_repository.get_by_username(db, user_in.username)
@@ -78,9 +169,114 @@ class AuthService:
         
         return db_user
     
+    def update_user(self, db: Session, user_id: int, user_in: UserUpdate) -> Optional[User]:
+        db_user = self.user_repository.get(db, user_id)
+        if not db_user:
+            return None
+        
+        update_data = user_in.dict(exclude_unset=True, exclude={"password", "roles"})
+        # Changes that alter what existing tokens claim revoke them
+        revoke = (
+            user_in.roles is not None
+            or bool(user_in.password)
+            or ("is_active" in update_data and update_data["is_active"] != db_user.is_active)
+        )
+        for field, value in update_data.items():
+            setattr(db_user, field, value)
+        if user_in.password:
+            db_user.hashed_password = self.get_password_hash(user_in.password)
+        
+        # Replace roles if provided
+        if user_in.roles is not None:
+            roles = []
+            for role_name in user_in.roles:
+                role = self.role_repository.get_by_name(db, role_name)
+                if not role:
+                    role = self.role_repository.create_role(db, role_name)
+                roles.append(role)
+            db_user.roles = roles
+        
+        if revoke:
+            db_user.token_version = (db_user.token_version or 0) + 1
+        
+        db.commit()
+        db.refresh(db_user)
+        if revoke:
+            token_revocations.set(f"user:{db_user.username}", db_user.token_version)
+        self.invalidate_principal(db_user.username)
+        return db_user
+    
+    def invalidate_principal(self, username: str) -> None:
+        """Drop the cached principal so the next request reloads active flag and roles"""
+        principal_cache.delete(username)
+    
     def update_last_login(self, db: Session, user_id: int) -> None:
         user = self.user_repository.get(db, user_id)
         if user:
             user.last_login = datetime.utcnow()
             db.add(user)
-            db.commit()
\ No newline at end of file
+            db.commit()
+    
+    async def get_user_by_username_async(self, db: AsyncSession, username: str) -> Optional[User]:
+        return await self.async_user_repository.get_by_username(db, username)
+    
+    async def authorize_async(self, db: AsyncSession, payload: Dict[str, Any]) -> Optional[Principal]:
+        """The principal a verified token acts as, or None when it was revoked or its user is gone"""
+        if self.is_token_revoked(payload):
+            return None
+        if TRUST_TOKEN_CLAIMS:
+            principal = self.principal_from_claims(payload)
+            if principal is not None:
+                return principal
+        
+        # Active flag and roles come from the user; tokens issued before the user's last role, password or
+        # status change carry an older version. Tokens without "ver" predate versioning and count as 0
+        principal = await self.get_principal_async(db, payload["sub"])
+        if principal is None or payload.get("ver", 0) < principal.token_version:
+            return None
+        return principal
+    
+    async def get_principal_async(self, db: AsyncSession, username: str) -> Optional[Principal]:
+        """Resolve a token subject, from the principal cache when possible"""
+        cached = principal_cache.get(username)
+        if cached is not None:
+            return Principal(**cached)
+        
+        user = await self.get_user_by_username_async(db, username)
+        if user is None:
+            return None
+        principal = Principal(
+            id=user.id,
+            username=user.username,
+            is_active=bool(user.is_active),
+            roles=[role.name for role in user.roles],
+            token_version=user.token_version or 0
+        )
+        principal_cache.set(username, principal.model_dump())
+        return principal
+    
+    async def authenticate_user_async(self, db: AsyncSession, username: str, password: str) -> Optional[User]:
+        user = await self.get_user_by_username_async(db, username)
+        if not user:
+            return None
+        # End the read transaction so no pooled connection (or SQLite read lock) is held while bcrypt runs;
+        # async sessions are created with expire_on_commit=False, so the loaded user stays usable
+        await db.commit()
+        if not await self.verify_password_async(password, user.hashed_password):
+            return None
+        return user
+    
+    async def update_last_login_async(self, db: AsyncSession, user: User) -> None:
+        user.last_login = datetime.utcnow()
+        await db.commit()
+    
+    async def rehash_password_async(self, db: AsyncSession, user_id: int, plain_password: str, old_hash: str) -> None:
+        """Upgrade a hash to the current scheme and cost; run after the login response has been sent"""
+        new_hash = await self.get_password_hash_async(plain_password)
+        # Guard on the old hash so a password changed in the meantime is never overwritten
+        await db.execute(
+            update(User)
+            .where(User.id == user_id, User.hashed_password == old_hash)
+            .values(hashed_password=new_hash)
+        )
+        await db.commit()
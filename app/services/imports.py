@@ -0,0 +1,128 @@
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Any, BinaryIO, Callable, Dict, Optional
+
+from app.models.import_job import ImportJob
+from app.repositories.import_job import AsyncImportJobRepository, ImportJobRepository
+from app.services.inventory import invalidate_catalog
+from app.services.jobs import job_handler
+from app.services.report_cache import invalidate_reports
+from app.utils.csv import IMPORT_COLUMNS, CSVUtil, check_import_columns, chunk_failure, read_import_chunks
+from app.utils import logger
+
+# Uploads are kept on disk until their job completes, so an interrupted job can be resumed from its checkpoint
+IMPORT_UPLOAD_DIR = os.getenv("IMPORT_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "polybooks-imports"))
+# Row errors kept on a job; rows_failed still counts every one
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+# Report data each import kind writes
+IMPORT_REPORT_DOMAINS = {"products": "products", "inventory_counts": "inventory"}
+# A running job that has not checkpointed for this long is taken to have died with its worker
+IMPORT_STALE_SECONDS = int(os.getenv("IMPORT_STALE_SECONDS", "300"))
+
+class ImportService:
+    def __init__(self):
+        self.repository = ImportJobRepository()
+        self.async_repository = AsyncImportJobRepository()
+        self.csv_util = CSVUtil()
+    
+    def create_job(self, db: Session, kind: str, upload: BinaryIO, filename: Optional[str] = None,
+                   created_by: Optional[int] = None) -> ImportJob:
+        """Spool the upload to disk in fixed-size blocks and register a pending job.
+        Raises ValueError for an unknown kind or ImportColumnsError for a missing column."""
+        if kind not in IMPORT_COLUMNS:
+            raise ValueError(f"Unknown import kind: {kind}")
+        os.makedirs(IMPORT_UPLOAD_DIR, exist_ok=True)
+        path = os.path.join(IMPORT_UPLOAD_DIR, f"{uuid.uuid4().hex}.csv")
+        with open(path, "wb") as out:
+            shutil.copyfileobj(upload, out, 1024 * 1024)
+        try:
+            check_import_columns(path, kind)
+        except Exception:
+            os.remove(path)
+            raise
+        return self.repository.create(db, kind, path, filename, created_by)
+    
+    def get_job(self, db: Session, job_id: int) -> Optional[ImportJob]:
+        return self.repository.get(db, job_id)
+    
+    async def get_job_async(self, db: AsyncSession, job_id: int) -> Optional[ImportJob]:
+        return await self.async_repository.get(db, job_id)
+    
+    def discard_job(self, db: Session, db_job: ImportJob) -> None:
+        """Delete a job that was never queued, with its stored upload"""
+        if os.path.exists(db_job.file_path):
+            os.remove(db_job.file_path)
+        self.repository.remove(db, db_job)
+    
+    def is_resumable(self, db_job: ImportJob) -> bool:
+        """Whether a run can pick the job up; the caller checks that none is already queued for it.
+        A pending job had its queued run cancelled before it started."""
+        if db_job.status in ("pending", "failed"):
+            return True
+        return db_job.status == "running" and db_job.updated_at < self._stale_before()
+    
+    def run_job(self, db: Session, job_id: int, should_stop: Optional[Callable[[], bool]] = None) -> bool:
+        """Process a job chunk by chunk from its checkpoint; each chunk commits with the checkpoint that covers it.
+        should_stop is checked between chunks. Returns False if another run holds the job."""
+        db_job = self.repository.claim(db, job_id, self._stale_before())
+        if db_job is None:
+            return False
+        
+        started = time.perf_counter()
+        rows_this_run = 0
+        try:
+            for chunk in read_import_chunks(db_job.file_path, db_job.kind, skip_rows=db_job.rows_processed):
+                if should_stop is not None and should_stop():
+                    raise RuntimeError("Import stopped on request")
+                try:
+                    counts, errors = self.csv_util.import_chunk(db, db_job.kind, chunk)
+                    imported = sum(counts.values())
+                except SQLAlchemyError as e:
+                    # The chunk is rolled back and counted as failed; the job moves on past it
+                    db.rollback()
+                    imported, errors = 0, [chunk_failure(chunk, e)]
+                rows_this_run += len(chunk)
+                self.repository.record_chunk(
+                    db, db_job, len(chunk), imported, errors,
+                    rows_this_run / max(time.perf_counter() - started, 1e-6), IMPORT_MAX_ERRORS
+                )
+                db.commit()
+                if imported:
+                    invalidate_reports(IMPORT_REPORT_DOMAINS[db_job.kind])
+                    if db_job.kind == "products":
+                        invalidate_catalog()
+        except Exception as e:
+            # Anything else (unreadable file, lost connection, shutdown) leaves the job resumable at its checkpoint
+            db.rollback()
+            logger.error(f"Import job {job_id} stopped: {e}")
+            self.repository.finish(db, db_job, "failed", str(e))
+            return True
+        
+        self.repository.finish(db, db_job, "completed")
+        if os.path.exists(db_job.file_path):
+            os.remove(db_job.file_path)
+        return True
+    
+    @staticmethod
+    def _stale_before() -> datetime:
+        return datetime.utcnow() - timedelta(seconds=IMPORT_STALE_SECONDS)
+
+# Imports run on the job queue; an interrupted one keeps its checkpoint and can be resumed
+@job_handler("import")
+def run_import_job(db: Session, params: Dict[str, Any], context) -> Dict[str, Any]:
+    service = ImportService()
+    job_id = params["import_job_id"]
+    if not service.run_job(db, job_id, should_stop=context.cancelled):
+        raise RuntimeError(f"Import job {job_id} is already running")
+    db_job = service.get_job(db, job_id)
+    if db_job.status != "completed":
+        context.check_cancelled()
+        raise RuntimeError(db_job.message or f"Import job {job_id} {db_job.status}")
+    return {"import_job_id": job_id, "rows_imported": db_job.rows_imported, "rows_failed": db_job.rows_failed}
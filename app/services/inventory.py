@@ -1,48 +1,177 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
-from typing import List, Optional
+from itertools import count
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import os
 
-from app.models.inventory import Product, InventoryItem
-from app.schemas.inventory import ProductCreate, ProductUpdate, InventoryItemCreate
-from app.repositories.inventory import ProductRepository, InventoryRepository
+from app.metrics import registry
+from app.models.inventory import Product, InventoryItem, ProductStock
+from app.schemas.inventory import Product as ProductSchema, ProductCreate, ProductUpdate, InventoryItemCreate
+from app.services.report_cache import invalidate_reports
+from app.utils.cache import TTLCache
+from app.utils.pagination import decode_cursor, split_page
+from app.repositories.inventory import (
+    AsyncInventoryRepository, AsyncProductRepository, InventoryRepository, ProductRepository, ProductStockRepository
+)
+
+# Hot products by id and SKU, shared by every InventoryService in the process. Writes through this process
+# invalidate it at once; writes made by other workers are seen within CATALOG_CACHE_TTL seconds
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "30"))
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "10000"))
+catalog_cache = TTLCache("catalog", maxsize=CATALOG_CACHE_SIZE, ttl=CATALOG_CACHE_TTL)
+registry.gauge("catalog_cache_entries", "Products and SKUs held in the catalog cache", callback=lambda: len(catalog_cache))
+registry.gauge("catalog_cache_hit_ratio", "Share of catalog cache lookups answered from the cache",
+               callback=lambda: catalog_cache.hits / max(catalog_cache.hits + catalog_cache.misses, 1))
+
+# Entries are keyed by catalog version. A reader takes the version before its query, so a row it read
+# before a concurrent write is stored under the superseded version and never served
+_catalog_versions = count()
+_catalog_version = next(_catalog_versions)
+
+def invalidate_catalog() -> None:
+    """Drop every cached product; old entries age out of the LRU"""
+    global _catalog_version
+    _catalog_version = next(_catalog_versions)
+
+def _remember(product: Optional[Product], version: int) -> Optional[ProductSchema]:
+    if product is None:
+        return None
+    snapshot = ProductSchema.model_validate(product, from_attributes=True)
+    catalog_cache.set(("id", version, product.id), snapshot.model_dump())
+    catalog_cache.set(("sku", version, product.sku), product.id)
+    return snapshot
+
+def _cached_product(version: int, product_id: Optional[int]) -> Optional[ProductSchema]:
+    cached = catalog_cache.get(("id", version, product_id)) if product_id is not None else None
+    return ProductSchema(**cached) if cached is not None else None
 
 class InventoryService:
     def __init__(self):
         self.product_repository = ProductRepository(Product)
         self.inventory_repository = InventoryRepository()
+        self.stock_repository = ProductStockRepository()
+        self.async_product_repository = AsyncProductRepository(Product)
+        self.async_inventory_repository = AsyncInventoryRepository()
     
-    def get_product(self, db: Session, product_id: int) -> Optional[Product]:
-        return self.product_repository.get(db, product_id)
+    # Single-product reads come from the catalog cache as detached snapshots; load the model to modify it
+    def get_product(self, db: Session, product_id: int) -> Optional[ProductSchema]:
+        version = _catalog_version
+        return _cached_product(version, product_id) or _remember(self.product_repository.get(db, product_id), version)
     
-    def get_product_by_sku(self, db: Session, sku: str) -> Optional[Product]:
-        return self.product_repository.get_by_sku(db, sku)
+    def get_product_by_sku(self, db: Session, sku: str) -> Optional[ProductSchema]:
+        version = _catalog_version
+        return (_cached_product(version, catalog_cache.get(("sku", version, sku)))
+                or _remember(self.product_repository.get_by_sku(db, sku), version))
+    
+    def get_existing_product_ids(self, db: Session, product_ids: Iterable[int]) -> Set[int]:
+        version = _catalog_version
+        product_ids = set(product_ids)
+        existing = {product_id for product_id in product_ids if catalog_cache.get(("id", version, product_id)) is not None}
+        for product in self.product_repository.get_by_ids(db, product_ids - existing):
+            _remember(product, version)
+            existing.add(product.id)
+        return existing
     
     def get_products(self, db: Session, skip: int = 0, limit: int = 100) -> List[Product]:
         return self.product_repository.get_multi(db, skip=skip, limit=limit)
     
+    def search_products(self, db: Session, query: str, categories: Optional[List[str]] = None,
+                        limit: int = 20) -> List[Product]:
+        return self.product_repository.search(db, query, categories, limit)
+    
+    # Writes that commit invalidate the catalog and the cached reports over the data they changed
     def create_product(self, db: Session, product: ProductCreate) -> Product:
-        return self.product_repository.create(db, obj_in=product)
+        db_product = self.product_repository.create(db, obj_in=product)
+        invalidate_catalog()
+        invalidate_reports("products")
+        return db_product
     
     def update_product(self, db: Session, product_id: int, product: ProductUpdate) -> Optional[Product]:
         db_product = self.product_repository.get(db, id=product_id)
         if db_product:
-            return self.product_repository.update(db, db_obj=db_product, obj_in=product)
+            db_product = self.product_repository.update(db, db_obj=db_product, obj_in=product)
+            invalidate_catalog()
+            invalidate_reports("products")
+            return db_product
         return None
     
     def delete_product(self, db: Session, product_id: int) -> bool:
         db_product = self.product_repository.get(db, id=product_id)
         if db_product:
             self.product_repository.remove(db, id=product_id)
+            invalidate_catalog()
+            invalidate_reports("products")
             return True
         return False
     
-    def add_inventory(self, db: Session, inventory_item: InventoryItemCreate) -> Optional[InventoryItem]:
+    def add_inventory(self, db: Session, inventory_item: InventoryItemCreate, commit: bool = True) -> Optional[InventoryItem]:
         # Check if product exists
-        product = self.product_repository.get(db, id=inventory_item.product_id)
+        product = self.get_product(db, inventory_item.product_id)
         if not product:
             return None
         
-        return self.inventory_repository.create_inventory_item(db, inventory_item)
+        db_item = self.inventory_repository.create_inventory_item(db, inventory_item, commit=commit)
+        if commit:
+            invalidate_reports("inventory")
+        return db_item
+    
+    def get_inventory_items_by_product(self, db: Session, product_id: int) -> List[InventoryItem]:
+        return self.inventory_repository.get_by_product(db, product_id)
+    
+    def get_inventory_items_by_products(self, db: Session, product_ids: Iterable[int]) -> Dict[int, List[InventoryItem]]:
+        return self.inventory_repository.get_by_products(db, product_ids)
+    
+    def allocate_stock(self, db: Session, quantities: Dict[int, int]) -> Dict[int, int]:
+        return self.inventory_repository.allocate(db, quantities)
+    
+    def set_inventory_quantities(self, db: Session, changes: List[Tuple[InventoryItem, int]], counted: bool = False) -> None:
+        self.inventory_repository.set_quantities(db, changes, counted=counted)
     
     def update_inventory(self, db: Session, item_id: int, quantity: int) -> Optional[InventoryItem]:
-        return self.inventory_repository.update_quantity(db, item_id, quantity)
\ No newline at end of file
+        db_item = self.inventory_repository.update_quantity(db, item_id, quantity)
+        if db_item:
+            invalidate_reports("inventory")
+        return db_item
+    
+    def get_stock(self, db: Session, product_id: int) -> Optional[ProductStock]:
+        return self.stock_repository.get(db, product_id)
+    
+    def get_low_stock_products(self, db: Session, threshold: int = 10, limit: int = 100) -> List[ProductStock]:
+        return self.stock_repository.get_low_stock(db, threshold=threshold, limit=limit)
+    
+    def reconcile_stock(self, db: Session, repair: bool = False) -> List[Dict[str, Any]]:
+        drift = self.stock_repository.reconcile(db, repair=repair)
+        if repair and drift:
+            invalidate_reports("inventory")
+        return drift
+    
+    # Non-blocking read paths for the async routes
+    async def get_product_async(self, db: AsyncSession, product_id: int) -> Optional[ProductSchema]:
+        version = _catalog_version
+        return _cached_product(version, product_id) or _remember(
+            await self.async_product_repository.get(db, product_id), version
+        )
+    
+    async def get_products_async(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Product]:
+        return await self.async_product_repository.get_multi(db, skip=skip, limit=limit)
+    
+    async def search_products_async(self, db: AsyncSession, query: str, categories: Optional[List[str]] = None,
+                                    limit: int = 20) -> List[Product]:
+        return await self.async_product_repository.search(db, query, categories, limit)
+    
+    async def get_products_page_async(self, db: AsyncSession, cursor: Optional[str] = None,
+                                      limit: int = 100) -> Tuple[List[Product], Optional[str]]:
+        """One keyset page of products by id and the cursor of the next page (raises InvalidCursor)"""
+        after = decode_cursor(cursor, 1)[0] if cursor else None
+        rows = await self.async_product_repository.get_page(db, after=after, limit=limit + 1)
+        return split_page(rows, limit, lambda product: (product.id,))
+    
+    async def get_stock_async(self, db: AsyncSession, product_id: int) -> Optional[ProductStock]:
+        return await self.async_inventory_repository.get_stock(db, product_id)
+    
+    async def get_low_stock_products_async(self, db: AsyncSession, threshold: int = 10, limit: int = 100,
+                                           cursor: Optional[str] = None) -> Tuple[List[ProductStock], Optional[str]]:
+        after = decode_cursor(cursor, 2) if cursor else None
+        rows = await self.async_inventory_repository.get_low_stock(db, threshold=threshold, limit=limit + 1, after=after)
+        return split_page(rows, limit, lambda stock: (stock.on_hand, stock.product_id))
@@ -0,0 +1,207 @@
+import asyncio
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from typing import Any, Callable, Dict, Optional
+
+from app.database import SessionLocal
+from app.models.job import Job
+from app.repositories.job import FINISHED_STATUSES, AsyncJobRepository, JobRepository
+from app.utils import logger
+from app.utils.executors import ExecutorSaturated
+
+# Threads running jobs in each API process; set 0 to leave the queue to scripts/run_job_worker.py processes
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Submissions beyond this many waiting jobs are refused with 503
+JOB_MAX_QUEUED = int(os.getenv("JOB_MAX_QUEUED", "100"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+# A running job whose heartbeat is older than the lease is reclaimed, up to JOB_MAX_ATTEMPTS runs in all
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Finished jobs and their results are kept this long
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "86400"))
+
+class JobQueueFull(ExecutorSaturated):
+    """Raised when JOB_MAX_QUEUED jobs are already waiting"""
+
+class JobCancelled(Exception):
+    """Raised inside a handler by JobContext.check_cancelled"""
+
+# kind -> handler(db, params, context) returning a JSON-encodable result
+JOB_HANDLERS: Dict[str, Callable[[Session, Dict[str, Any], "JobContext"], Any]] = {}
+
+def job_handler(kind: str):
+    """Register the function that runs jobs of this kind"""
+    def register(handler):
+        JOB_HANDLERS[kind] = handler
+        return handler
+    return register
+
+class JobContext:
+    """Handed to a running handler so long work can stop early when the job is cancelled"""
+    
+    def __init__(self, db: Session, job_id: int, repository: JobRepository):
+        self.db = db
+        self.job_id = job_id
+        self.repository = repository
+    
+    def cancelled(self) -> bool:
+        return self.repository.is_cancel_requested(self.db, self.job_id)
+    
+    def check_cancelled(self) -> None:
+        if self.cancelled():
+            raise JobCancelled()
+
+class JobService:
+    def __init__(self):
+        self.repository = JobRepository()
+        self.async_repository = AsyncJobRepository()
+        self.retention = timedelta(seconds=JOB_RESULT_TTL_SECONDS)
+    
+    def submit(self, db: Session, kind: str, params: Dict[str, Any], created_by: Optional[int] = None) -> Job:
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self.repository.count_queued(db) >= JOB_MAX_QUEUED:
+            raise JobQueueFull("The job queue is full")
+        return self.repository.create(db, kind, jsonable_encoder(params), created_by)
+    
+    def get_job(self, db: Session, job_id: int) -> Optional[Job]:
+        return self.repository.get(db, job_id)
+    
+    def has_unfinished(self, db: Session, kind: str, params: Dict[str, Any]) -> bool:
+        """Whether a job of this kind with these params is queued or running"""
+        return jsonable_encoder(params) in self.repository.get_unfinished_params(db, kind)
+    
+    async def get_job_async(self, db: AsyncSession, job_id: int) -> Optional[Job]:
+        return await self.async_repository.get(db, job_id)
+    
+    async def wait_for_job_async(self, db: AsyncSession, job_id: int, timeout: float) -> Optional[Job]:
+        """Long-poll: return once the job finishes or timeout seconds pass, whichever is first"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            db_job = await self.async_repository.get(db, job_id)
+            remaining = deadline - loop.time()
+            if db_job is None or db_job.status in FINISHED_STATUSES or remaining <= 0:
+                return db_job
+            # End the transaction so the connection goes back to the pool while we wait
+            await db.rollback()
+            await asyncio.sleep(min(JOB_POLL_SECONDS, remaining))
+    
+    def cancel(self, db: Session, job_id: int) -> Optional[Job]:
+        return self.repository.cancel(db, job_id, self.retention)
+    
+    def run(self, db: Session, db_job: Job) -> None:
+        """Run a claimed job to completion and record its outcome"""
+        job_id, kind, params = db_job.id, db_job.kind, db_job.params
+        context = JobContext(db, job_id, self.repository)
+        try:
+            handler = JOB_HANDLERS.get(kind)
+            if handler is None:
+                raise ValueError(f"Unknown job kind: {kind}")
+            result = handler(db, params, context)
+        except JobCancelled:
+            db.rollback()
+            self.repository.finish(db, job_id, "cancelled", self.retention)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Job {job_id} ({kind}) failed: {e}")
+            self.repository.finish(db, job_id, "failed", self.retention, error=str(e))
+        else:
+            # A cancellation that arrived while the handler ran discards its result
+            status = "cancelled" if context.cancelled() else "succeeded"
+            result = jsonable_encoder(result) if status == "succeeded" else None
+            self.repository.finish(db, job_id, status, self.retention, result=result)
+
+class JobWorker:
+    """Runs queued jobs on a fixed number of threads, with the database as the only coordination.
+    Any number of processes may run a worker against the same database."""
+    
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal, workers: int = JOB_WORKERS):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.service = JobService()
+        self._running = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+    
+    def run_next(self) -> bool:
+        """Claim and run one job; False when nothing was waiting"""
+        db = self.session_factory()
+        try:
+            stale_before = self._stale_before()
+            db_job = self.service.repository.claim_next(db, self.name, stale_before, JOB_MAX_ATTEMPTS)
+            if db_job is None:
+                return False
+            with self._lock:
+                self._running.add(db_job.id)
+            try:
+                self.service.run(db, db_job)
+            finally:
+                with self._lock:
+                    self._running.discard(db_job.id)
+            return True
+        finally:
+            db.close()
+    
+    def run_pending(self) -> None:
+        """Drain the queue on the calling thread"""
+        while self.run_next():
+            pass
+    
+    def maintain(self) -> None:
+        """Heartbeat this worker's jobs, fail jobs abandoned too often, purge expired results"""
+        db = self.session_factory()
+        try:
+            with self._lock:
+                running = list(self._running)
+            repository = self.service.repository
+            repository.heartbeat(db, running)
+            repository.fail_abandoned(db, self._stale_before(), JOB_MAX_ATTEMPTS, self.service.retention)
+            repository.purge_expired(db)
+        finally:
+            db.close()
+    
+    def start(self) -> None:
+        self._stop.clear()
+        self._threads = [threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True) for i in range(self.workers)]
+        self._threads.append(threading.Thread(target=self._maintain, name="job-maintenance", daemon=True))
+        for thread in self._threads:
+            thread.start()
+    
+    def stop(self, timeout: float = 5.0) -> None:
+        # Jobs still running after the timeout are abandoned and reclaimed once their lease runs out
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+    
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                worked = self.run_next()
+            except Exception as e:
+                logger.error(f"Job worker {self.name}: {e}")
+                worked = False
+            if not worked:
+                self._stop.wait(JOB_POLL_SECONDS)
+    
+    def _maintain(self) -> None:
+        while not self._stop.wait(JOB_HEARTBEAT_SECONDS):
+            try:
+                self.maintain()
+            except Exception as e:
+                logger.error(f"Job maintenance {self.name}: {e}")
+    
+    @staticmethod
+    def _stale_before() -> datetime:
+        return datetime.utcnow() - timedelta(seconds=JOB_LEASE_SECONDS)
+
+job_worker = JobWorker()
@@ -1,48 +1,95 @@
-import openai
+from sqlalchemy import func, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Dict, Any, List
+from typing import Dict, Any, AsyncIterator, Iterator, List
+import hashlib
+import json
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import datetime, time, timedelta
 import os
 
-from app.models.inventory import Product, InventoryItem
+from app.models.inventory import Product, ProductStock
 from app.models.transaction import Transaction, TransactionItem
 from app.schemas.report import NaturalLanguageQuery, QueryResult
+from app.repositories.report import AsyncReportQueryRepository, SalesRollupRepository, EXCLUDED_SALE_STATUSES
+from app.services.jobs import job_handler
+from app.services.report_intents import match_intent
+from app.services.translation import NL_QUERY_TABLES, TranslationService, UnsafeTranslation
+from app.utils.executors import report_executor
+from app.utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.utils.sql_guard import UnsafeQuery, check_read_only_select
+
+# Rows fetched per round trip when streaming report details
+INVENTORY_REPORT_BATCH_SIZE = 1000
+SALES_REPORT_BATCH_SIZE = 10000
+
+# Column layout of the sales report detail rows, and the subset needed for the summary alone
+SALES_COLUMNS = ("date", "reference", "product_id", "product_name", "quantity", "unit_price", "total_price")
+SALES_SUMMARY_COLUMNS = ("product_name", "quantity", "total_price")
+
+# Below this many sale lines the aggregation is cheaper than shipping the arrays to the report pool
+REPORT_OFFLOAD_MIN_ROWS = int(os.getenv("REPORT_OFFLOAD_MIN_ROWS", "50000"))
+
+# Limits on SQL generated from natural-language questions. The cost ceiling is in planner units on
+# PostgreSQL and in estimated rows visited on SQLite
+NL_QUERY_ROW_LIMIT = int(os.getenv("NL_QUERY_ROW_LIMIT", "500"))
+NL_QUERY_TIMEOUT_MS = int(os.getenv("NL_QUERY_TIMEOUT_MS", "5000"))
+NL_QUERY_MAX_COST = float(os.getenv("NL_QUERY_MAX_COST", "1000000"))
+
+def top_products(product_names: np.ndarray, quantities: np.ndarray, line_totals: np.ndarray, limit: int = 5) -> List[Dict[str, Any]]:
+    if not len(product_names):
+        return []
+    
+    # Factorize names once and aggregate with bincount instead of a Python group-by
+    codes, names = pd.factorize(product_names, use_na_sentinel=False)
+    quantity_by_product = np.bincount(codes, weights=np.nan_to_num(quantities), minlength=len(names))
+    sales_by_product = np.bincount(codes, weights=np.nan_to_num(line_totals), minlength=len(names))
+    
+    top = np.argsort(-sales_by_product, kind="stable")[:limit]
+    return [
+        {
+            "product_name": names[i],
+            "quantity": int(quantity_by_product[i]),
+            "total_price": float(sales_by_product[i])
+        }
+        for i in top
+    ]
+
+def summarize_sales(product_names: np.ndarray, quantities: np.ndarray, line_totals: np.ndarray) -> Dict[str, Any]:
+    """Pure aggregation over the sale line arrays; module-level so the report process pool can run it"""
+    return {
+        "total_sales": float(np.nansum(line_totals)),
+        "total_items_sold": int(np.nansum(quantities)),
+        "top_products": top_products(product_names, quantities, line_totals)
+    }
 
 class ReportGenerator:
     def __init__(self):
-        self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        openai.api_key = self.openai_api_key
+        self.sales_rollup_repository = SalesRollupRepository()
+        self.translation_service = TranslationService()
+        self.report_query_repository = AsyncReportQueryRepository()
     
-    def generate_inventory_report(self, db: Session) -> Dict[str, Any]:
+    def generate_inventory_report(self, db: Session, low_stock_threshold: int = 10) -> Dict[str, Any]:
         """Generate a comprehensive inventory report"""
-        # Fetch all products with their inventory levels
-        products = db.query(Product).all()
-        
         inventory_data = []
-        for product in products:
-            total_quantity = sum(item.quantity for item in product.inventory_items)
-            inventory_value = total_quantity * product.cost_price
-            
-            inventory_data.append({
-                "sku": product.sku,
-                "name": product.name,
-                "category": product.category,
-                "quantity": total_quantity,
-                "unit_cost": product.cost_price,
-                "total_value": inventory_value
-            })
-        
-        df = pd.DataFrame(inventory_data)
-        
-        # Calculate summary statistics
-        total_value = df["total_value"].sum() if not df.empty else 0
-        low_stock_items = df[df["quantity"] < 10].shape[0] if not df.empty else 0
-        zero_stock_items = df[df["quantity"] == 0].shape[0] if not df.empty else 0
+        total_value = 0.0
+        low_stock_items = 0
+        zero_stock_items = 0
+        
+        # Stream the per-product aggregate and fold the summary as rows arrive
+        for row in self.iter_inventory_levels(db):
+            inventory_data.append(row)
+            total_value += row["total_value"]
+            if row["quantity"] < low_stock_threshold:
+                low_stock_items += 1
+            if row["quantity"] == 0:
+                zero_stock_items += 1
         
         summary = {
             "report_date": datetime.utcnow().strftime("%Y-%m-%d"),
-            "total_products": len(products),
+            "total_products": len(inventory_data),
             "total_inventory_value": total_value,
             "low_stock_items": low_stock_items,
             "zero_stock_items": zero_stock_items
@@ -53,102 +100,244 @@ class ReportGenerator:
             "details": inventory_data
         }
     
-    def generate_sales_report(self, db: Session, start_date=None, end_date=None) -> Dict[str, Any]:
+    def iter_inventory_levels(self, db: Session, batch_size: int = INVENTORY_REPORT_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """Yield per-product on-hand quantity and valuation from product_stock in a single query.
+        Reserved and damaged units are not stock, as on /inventory/stock/low."""
+        stmt = (
+            select(
+                Product.sku,
+                Product.name,
+                Product.category,
+                Product.cost_price,
+                func.coalesce(ProductStock.on_hand, 0).label("quantity"),
+            )
+            .select_from(Product)
+            .outerjoin(ProductStock, ProductStock.product_id == Product.id)
+            .order_by(Product.id)
+            .execution_options(yield_per=batch_size)
+        )
+        
+        for sku, name, category, cost_price, quantity in db.execute(stmt):
+            quantity = int(quantity)
+            unit_cost = cost_price or 0.0
+            yield {
+                "sku": sku,
+                "name": name,
+                "category": category,
+                "quantity": quantity,
+                "unit_cost": cost_price,
+                "total_value": quantity * unit_cost
+            }
+    
+    def generate_sales_report(self, db: Session, start_date=None, end_date=None, include_details: bool = True) -> Dict[str, Any]:
         """Generate a sales report for a given period"""
         if not start_date:
             start_date = datetime.utcnow() - timedelta(days=30)
         if not end_date:
             end_date = datetime.utcnow()
         
-        # Get sales transactions for the period
-        sales = db.query(Transaction).filter(
-            Transaction.transaction_type == "sale",
-            Transaction.transaction_date >= start_date,
-            Transaction.transaction_date <= end_date
-        ).all()
-        
-        sales_data = []
-        for sale in sales:
-            for item in sale.items:
-                sales_data.append({
-                    "date": sale.transaction_date,
-                    "reference": sale.reference_number,
-                    "product_id": item.product_id,
-                    "product_name": item.product.name,
-                    "quantity": item.quantity,
-                    "unit_price": item.unit_price,
-                    "total_price": item.total_price
-                })
-        
-        df = pd.DataFrame(sales_data)
-        
-        # Calculate summary statistics
-        total_sales = df["total_price"].sum() if not df.empty else 0
-        total_items_sold = df["quantity"].sum() if not df.empty else 0
-        
-        # Group by product to find top selling items
-        if not df.empty:
-            product_sales = df.groupby("product_name").agg({
-                "quantity": "sum",
-                "total_price": "sum"
-            }).reset_index().sort_values("total_price", ascending=False)
-            
-            top_products = product_sales.head(5).to_dict("records")
+        # Count sale headers separately so sales without line items are still included
+        transaction_count = db.execute(
+            select(func.count(Transaction.id)).where(*self._sale_filters(start_date, end_date))
+        ).scalar_one()
+        
+        # The summary always comes from the daily rollup; raw sale lines are read only for the details
+        product_names, quantities, line_totals = self._summarize_sales_from_rollup(db, start_date, end_date)
+        if len(product_names) >= REPORT_OFFLOAD_MIN_ROWS:
+            totals = report_executor.call(summarize_sales, product_names, quantities, line_totals)
         else:
-            top_products = []
+            totals = summarize_sales(product_names, quantities, line_totals)
         
         summary = {
             "start_date": start_date.strftime("%Y-%m-%d"),
             "end_date": end_date.strftime("%Y-%m-%d"),
-            "total_sales": total_sales,
-            "total_items_sold": total_items_sold,
-            "transaction_count": len(sales),
-            "top_products": top_products
+            "total_sales": totals["total_sales"],
+            "total_items_sold": totals["total_items_sold"],
+            "transaction_count": transaction_count,
+            "top_products": totals["top_products"]
         }
         
+        # Rows are zipped straight from the column arrays; no ORM object is built per sale line
+        details = None
+        if include_details:
+            columns = self.fetch_sales_columns(db, start_date, end_date)
+            details = [
+                dict(zip(SALES_COLUMNS, values))
+                for values in zip(*(columns[name].tolist() for name in SALES_COLUMNS))
+            ]
+        
         return {
             "summary": summary,
-            "details": sales_data
+            "details": details
         }
     
-    def process_natural_language_query(self, db: Session, query: str) -> Dict[str, Any]:
-        """Process natural language queries using OpenAI API"""
-        # Create a system message that explains the context and available data
-        system_message = """
-        You are an AI assistant for PolyBooks, an accounting and inventory management system.
-        You can access data about products, inventory, sales, purchases, and other transactions.
-        Please interpret the user's query and return the appropriate SQL query to extract the requested information.
-        """
-        
-        # Send the query to OpenAI
-        completion = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": f"Generate a SQL query for: {query}"}
-            ]
+    def _summarize_sales_from_rollup(self, db: Session, start_date: datetime, end_date: datetime):
+        """Per-product sales for the window: whole days from the rollup, partial edge days from raw rows"""
+        # Whole days are those in [first_day, end_day) whose full 24h lie inside [start_date, end_date]
+        first_day = start_date.date()
+        if start_date != datetime.combine(first_day, time.min):
+            first_day += timedelta(days=1)
+        end_day = (end_date + timedelta(microseconds=1)).date()
+        
+        if first_day >= end_day:
+            columns = self.fetch_sales_columns(db, start_date, end_date, SALES_SUMMARY_COLUMNS)
+            return (
+                columns["product_name"],
+                pd.to_numeric(columns["quantity"]).astype(np.float64),
+                pd.to_numeric(columns["total_price"]).astype(np.float64)
+            )
+        
+        rollup_rows = self.sales_rollup_repository.get_product_totals(db, first_day, end_day - timedelta(days=1))
+        head = self.fetch_sales_columns(
+            db, start_date, datetime.combine(first_day, time.min), SALES_SUMMARY_COLUMNS, end_exclusive=True
         )
+        tail = self.fetch_sales_columns(db, datetime.combine(end_day, time.min), end_date, SALES_SUMMARY_COLUMNS)
         
-        # Extract the SQL query from the response
-        sql_query = completion.choices[0].message.content.strip()
-        
-        try:
-            # Execute the SQL query with safety precautions
-            if "drop" in sql_query.lower() or "delete" in sql_query.lower() or "update" in sql_query.lower():
-                return {"error": "Query contains potentially harmful operations"}
-            
-            # Execute the query
-            result = db.execute(sql_query)
-            data = [dict(row) for row in result.fetchall()]
-            
-            return {
-                "query": query,
-                "sql": sql_query,
-                "results": data
-            }
-        except Exception as e:
-            return {
-                "query": query,
-                "sql": sql_query,
-                "error": str(e)
-            }
\ No newline at end of file
+        rollup_names = np.empty(len(rollup_rows), dtype=object)
+        rollup_names[:] = [row[0] for row in rollup_rows]
+        product_names = np.concatenate([rollup_names, head["product_name"], tail["product_name"]])
+        quantities = np.concatenate([
+            np.array([row[1] for row in rollup_rows], dtype=np.float64),
+            pd.to_numeric(head["quantity"]).astype(np.float64),
+            pd.to_numeric(tail["quantity"]).astype(np.float64),
+        ])
+        line_totals = np.concatenate([
+            np.array([row[2] for row in rollup_rows], dtype=np.float64),
+            pd.to_numeric(head["total_price"]).astype(np.float64),
+            pd.to_numeric(tail["total_price"]).astype(np.float64),
+        ])
+        return product_names, quantities, line_totals
+    
+    @staticmethod
+    def _sale_filters(start_date, end_date, end_exclusive: bool = False) -> list:
+        return [
+            Transaction.transaction_type == "sale",
+            Transaction.status.notin_(EXCLUDED_SALE_STATUSES),
+            Transaction.transaction_date >= start_date,
+            Transaction.transaction_date < end_date if end_exclusive else Transaction.transaction_date <= end_date
+        ]
+    
+    def fetch_sales_columns(self, db: Session, start_date, end_date, fields=SALES_COLUMNS, end_exclusive: bool = False,
+                            batch_size: int = SALES_REPORT_BATCH_SIZE) -> Dict[str, np.ndarray]:
+        """Fetch sale line items as column arrays with one projected query, never building ORM objects"""
+        projection = {
+            "date": Transaction.transaction_date,
+            "reference": Transaction.reference_number,
+            "product_id": TransactionItem.product_id,
+            "product_name": Product.name,
+            "quantity": TransactionItem.quantity,
+            "unit_price": TransactionItem.unit_price,
+            "total_price": TransactionItem.total_price,
+        }
+        stmt = (
+            select(*(projection[name] for name in fields))
+            .select_from(Transaction)
+            .join(TransactionItem, TransactionItem.transaction_id == Transaction.id)
+            .join(Product, Product.id == TransactionItem.product_id)
+            .where(*self._sale_filters(start_date, end_date, end_exclusive))
+            .order_by(Transaction.transaction_date, TransactionItem.id)
+        )
+        
+        # Pull fixed-size batches off a server-side cursor and transpose each into column chunks
+        chunks = {name: [] for name in fields}
+        result = db.execute(stmt.execution_options(stream_results=True, max_row_buffer=batch_size))
+        for batch in result.partitions(batch_size):
+            for name, values in zip(fields, zip(*batch)):
+                chunk = np.empty(len(values), dtype=object)
+                chunk[:] = values
+                chunks[name].append(chunk)
+        
+        return {
+            name: np.concatenate(parts) if parts else np.empty(0, dtype=object)
+            for name, parts in chunks.items()
+        }
+    
+    async def plan_natural_language_query(self, db: AsyncSession, query: str, cursor: str = None) -> Dict[str, Any]:
+        """Answer a recognized question with its pre-written query, otherwise translate it and vet the SQL:
+        a single read-only SELECT over NL_QUERY_TABLES within NL_QUERY_MAX_COST. Problems with the SQL are
+        returned under "error".
+
+        Raises TranslationError when no SQL could be obtained and InvalidCursor for a foreign cursor."""
+        matched = match_intent(query)
+        if matched is not None:
+            # Parameterized and indexed: no translator round trip, guard or cost estimate. The literal
+            # rendering is only shown to the client and keys the cursor
+            intent, statement = matched
+            sql_query = str(statement.compile(dialect=db.get_bind().dialect, compile_kwargs={"literal_binds": True}))
+            plan = {"query": query, "sql": sql_query, "cached": False, "intent": intent, "statement": statement}
+        else:
+            try:
+                sql_query, cached = await self.translation_service.translate(db, query)
+            except UnsafeTranslation as e:
+                return {"query": query, "sql": e.sql, "cached": False, "intent": None, "error": str(e)}
+            plan = {"query": query, "sql": sql_query, "cached": cached, "intent": None}
+            # Cached SQL passed the same check when it was stored; checked again for the table aliases
+            try:
+                sql_query, tables = check_read_only_select(sql_query, NL_QUERY_TABLES)
+            except UnsafeQuery as e:
+                return dict(plan, error=str(e))
+            plan.update(sql=sql_query, statement=sql_query)
+        
+        # Pages continue from an offset; the digest ties a cursor to the SQL it was issued for
+        digest = hashlib.sha256(sql_query.encode()).hexdigest()[:16]
+        offset = 0
+        if cursor:
+            cursor_digest, offset = decode_cursor(cursor, 2)
+            if cursor_digest != digest or not isinstance(offset, int) or offset < 0:
+                raise InvalidCursor("Cursor does not belong to this question")
+        plan.update(digest=digest, offset=offset)
+        if matched is not None:
+            return plan
+        
+        async with self.report_query_repository.read_only(db, NL_QUERY_TIMEOUT_MS):
+            try:
+                cost = await self.report_query_repository.estimate_cost(db, sql_query, tables, NL_QUERY_TABLES)
+            except DBAPIError as e:
+                return dict(plan, error=str(e.orig))
+        if cost > NL_QUERY_MAX_COST:
+            return dict(plan, error=f"Estimated cost {cost:.0f} exceeds the limit of {NL_QUERY_MAX_COST:.0f}; ask a narrower question")
+        return plan
+    
+    async def process_natural_language_query(self, db: AsyncSession, query: str, cursor: str = None) -> Dict[str, Any]:
+        """Answer a question with at most NL_QUERY_ROW_LIMIT rows and the cursor of the next page"""
+        plan = await self.plan_natural_language_query(db, query, cursor)
+        if "error" in plan:
+            return plan
+        
+        async with self.report_query_repository.read_only(db, NL_QUERY_TIMEOUT_MS):
+            try:
+                rows = await self.report_query_repository.fetch_page(db, plan["statement"], plan["offset"], NL_QUERY_ROW_LIMIT)
+            except DBAPIError as e:
+                # Timeouts and SQL errors are reported with the statement that caused them
+                return dict(plan, error=str(e.orig))
+        next_cursor = None
+        if len(rows) > NL_QUERY_ROW_LIMIT:
+            rows = rows[:NL_QUERY_ROW_LIMIT]
+            next_cursor = encode_cursor([plan["digest"], plan["offset"] + NL_QUERY_ROW_LIMIT])
+        return dict(plan, results=rows, next_cursor=next_cursor)
+    
+    async def stream_natural_language_query(self, db: AsyncSession, plan: Dict[str, Any]) -> AsyncIterator[bytes]:
+        """The page of a vetted plan as NDJSON rows, with a final {"next_cursor": ...} line when more remain"""
+        async with self.report_query_repository.read_only(db, NL_QUERY_TIMEOUT_MS):
+            sent = 0
+            try:
+                async for row in self.report_query_repository.stream_page(db, plan["statement"], plan["offset"], NL_QUERY_ROW_LIMIT):
+                    if sent == NL_QUERY_ROW_LIMIT:
+                        next_cursor = encode_cursor([plan["digest"], plan["offset"] + NL_QUERY_ROW_LIMIT])
+                        yield (json.dumps({"next_cursor": next_cursor}) + "\n").encode()
+                        break
+                    yield (json.dumps(row, default=str) + "\n").encode()
+                    sent += 1
+            except DBAPIError as e:
+                # Headers are gone by now; the error is the last line of the stream
+                yield (json.dumps({"error": str(e.orig)}) + "\n").encode()
+
+# Queued report jobs (POST /reports/...); params arrive JSON-encoded, so dates are ISO strings
+@job_handler("inventory_report")
+def run_inventory_report_job(db: Session, params: Dict[str, Any], context) -> Dict[str, Any]:
+    return ReportGenerator().generate_inventory_report(db, **params)
+
+@job_handler("sales_report")
+def run_sales_report_job(db: Session, params: Dict[str, Any], context) -> Dict[str, Any]:
+    dates = {key: datetime.fromisoformat(params[key]) if params.get(key) else None for key in ("start_date", "end_date")}
+    return ReportGenerator().generate_sales_report(db, include_details=params.get("include_details", True), **dates)
@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime, time, timedelta
+from fastapi.encoders import jsonable_encoder
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.metrics import registry
+from app.utils.cache import create_cache
+
+# Set to a redis:// URL so every worker shares cached reports and sees every invalidation;
+# with the in-process default, another worker's writes are picked up within REPORT_CACHE_TTL
+REPORT_CACHE_URL = os.getenv("REPORT_CACHE_URL")
+REPORT_CACHE_TTL = float(os.getenv("REPORT_CACHE_TTL", "300"))
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "64"))
+
+report_cache = create_cache("report", REPORT_CACHE_URL, maxsize=REPORT_CACHE_SIZE, ttl=REPORT_CACHE_TTL)
+reports_not_modified = registry.counter("report_not_modified_total", "Report requests answered 304 from their ETag")
+
+# The data each report reads. A committed write bumps its domain's generation, which changes the
+# ETag of every report over that domain and orphans their cached results.
+REPORT_DOMAINS = {
+    "inventory_report": ("products", "inventory"),
+    "sales_report": ("products", "sales"),
+}
+
+def invalidate_reports(*domains: str) -> None:
+    """Call after the commit, so a report computed concurrently cannot be cached under the new generation"""
+    for domain in domains:
+        report_cache.set(("generation", domain), uuid.uuid4().hex)
+
+def _generation(domain: str) -> str:
+    # Generations expire with the reports, so writes this process never saw still surface within the TTL
+    token = report_cache.get(("generation", domain))
+    if token is None:
+        token = uuid.uuid4().hex
+        report_cache.set(("generation", domain), token)
+    return token
+
+def report_etag(kind: str, params: Dict[str, Any]) -> str:
+    """Strong ETag for a report over the current data generations; computed without touching the database"""
+    generations = [_generation(domain) for domain in REPORT_DOMAINS[kind]]
+    payload = json.dumps([kind, jsonable_encoder(params), generations], sort_keys=True)
+    return '"' + hashlib.sha1(payload.encode()).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses weak comparison, so W/ prefixes are ignored"""
+    if not if_none_match:
+        return False
+    for tag in (candidate.strip() for candidate in if_none_match.split(",")):
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
+def cached_report(kind: str, params: Dict[str, Any], compute: Callable[[], Any]) -> Tuple[Any, str]:
+    """The report for params from the cache, computing and storing it on a miss; returns (report, etag)"""
+    # The ETag is taken before computing: a write landing mid-computation bumps the generation,
+    # so this possibly stale result is stored under a key no later request will look up
+    etag = report_etag(kind, params)
+    report = report_cache.get(("report", etag))
+    if report is None:
+        report = jsonable_encoder(compute())
+        report_cache.set(("report", etag), report)
+    return report, etag
+
+def normalize_sales_window(start_date: Optional[datetime], end_date: Optional[datetime]) -> Tuple[datetime, datetime]:
+    """Fill in a missing bound with a whole UTC day (the last 30 by default) so polling clients share cache
+    entries; bounds the client gave are kept exactly as sent"""
+    today = datetime.utcnow().date()
+    if start_date is None:
+        start_date = datetime.combine(today - timedelta(days=30), time.min)
+    if end_date is None:
+        end_date = datetime.combine(today, time.max)
+    return start_date, end_date
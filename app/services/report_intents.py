@@ -0,0 +1,195 @@
+import re
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Select, func, select
+
+from app.metrics import registry
+from app.models.inventory import Product, ProductStock
+from app.models.report import DailyProductSales
+
+# Sales questions that name no period cover this many days up to today
+DEFAULT_PERIOD_DAYS = 30
+MAX_TOP_PRODUCTS = 100
+LOW_STOCK_THRESHOLD = 10
+
+intent_matches = registry.counter("report_intent_total", "Report questions by the intent that answered them (none: sent to the translator)")
+
+_PERIOD = re.compile(
+    r"\b(?:(?P<day>today|yesterday)"
+    r"|(?P<which>this|last|previous|past) (?P<unit>week|month|year)"
+    r"|(?:last|past|previous) (?P<count>\d+) (?P<units>days?|weeks?))\b",
+    re.IGNORECASE,
+)
+
+# The period phrases question_period understands, for anchoring intent patterns; anything else in a
+# question sends it to the translator
+_PERIOD_PHRASE = (
+    r"(?: (?:for |in |over |during )?(?:the )?"
+    r"(?:today|yesterday|(?:this|last|previous|past) (?:week|month|year)|(?:last|past|previous) \d+ (?:days?|weeks?)))?"
+)
+# Polite openings that do not change the question
+_LEAD = r"(?:(?:show|list|give|get|what (?:are|were|is)|which (?:are|were)) (?:me )?)?(?:the |our )?"
+
+def _intent_pattern(body: str, period: bool = False) -> re.Pattern:
+    return re.compile(_LEAD + body + (_PERIOD_PHRASE if period else ""), re.IGNORECASE)
+
+def question_period(question: str, today: date) -> Tuple[date, date]:
+    """[start, end) in UTC days of the period a question names: "this week" and "last month" are calendar
+    periods, "past month" and "last 7 days" roll back from today inclusive"""
+    tomorrow = today + timedelta(days=1)
+    match = _PERIOD.search(question)
+    if match is None:
+        return tomorrow - timedelta(days=DEFAULT_PERIOD_DAYS), tomorrow
+    if match.group("day"):
+        day = today if match.group("day").lower() == "today" else today - timedelta(days=1)
+        return day, day + timedelta(days=1)
+    if match.group("count"):
+        days = int(match.group("count")) * (7 if match.group("units").lower().startswith("week") else 1)
+        return tomorrow - timedelta(days=days), tomorrow
+
+    which, unit = match.group("which").lower(), match.group("unit").lower()
+    if which == "past":
+        return tomorrow - timedelta(days={"week": 7, "month": 30, "year": 365}[unit]), tomorrow
+    if unit == "week":
+        start = today - timedelta(days=today.weekday())
+        previous = start - timedelta(days=7)
+    elif unit == "month":
+        start = today.replace(day=1)
+        previous = (start - timedelta(days=1)).replace(day=1)
+    else:
+        start = today.replace(month=1, day=1)
+        previous = start.replace(year=start.year - 1)
+    return (start, tomorrow) if which == "this" else (previous, start)
+
+class ReportIntent(ABC):
+    """A common question shape answered by a pre-written query over indexed columns, no translator involved.
+
+    Patterns must match the whole question, so a word they do not know (another table, a filter, a year)
+    leaves the question to the translator instead of being ignored."""
+    name = "base"
+    patterns: Tuple[re.Pattern, ...] = ()
+
+    def match(self, question: str) -> Optional[re.Match]:
+        for pattern in self.patterns:
+            match = pattern.fullmatch(question)
+            if match is not None:
+                return match
+        return None
+
+    @abstractmethod
+    def statement(self, match: re.Match, question: str, today: date) -> Select:
+        """The parameterized query answering a question this intent matched"""
+
+class TopProductsIntent(ReportIntent):
+    """"top 10 products last month", "best sellers by units this week" """
+    name = "top_products"
+    patterns = (_intent_pattern(
+        r"(?:top|best[- ]selling|best sellers?)(?: (?P<limit>\d+))?(?: (?:products?|items?|sellers?|skus?|best[- ]sellers?))?"
+        r"(?: by (?P<measure>revenue|sales|units|quantity))?",
+        period=True,
+    ),)
+
+    def statement(self, match, question, today):
+        start, end = question_period(question, today)
+        limit = min(int(match.group("limit") or 10), MAX_TOP_PRODUCTS) or 10
+        units_sold = func.sum(DailyProductSales.quantity).label("units_sold")
+        revenue = func.sum(DailyProductSales.revenue).label("revenue")
+        ranking = units_sold if (match.group("measure") or "").lower() in ("units", "quantity") else revenue
+        # A range over the rollup's (sales_date, product_id) key
+        return (
+            select(Product.sku, Product.name, units_sold, revenue)
+            .select_from(DailyProductSales)
+            .join(Product, Product.id == DailyProductSales.product_id)
+            .where(DailyProductSales.sales_date >= start, DailyProductSales.sales_date < end)
+            .group_by(Product.id, Product.sku, Product.name)
+            .order_by(ranking.desc(), Product.id)
+            .limit(limit)
+        )
+
+class StockForSkuIntent(ReportIntent):
+    """"stock for SKU ABC-1", "how many on hand for sku ABC-1", "SKU ABC-1 inventory" """
+    name = "stock_for_sku"
+    _SKU = r"sku[ :#]*[\"']?(?P<sku>[\w\-./]+)[\"']?"
+    patterns = (
+        _intent_pattern(r"(?:current )?(?:stock|inventory|on hand|stock level|quantity on hand) (?:for|of) (?:the )?" + _SKU),
+        _intent_pattern(r"how many (?:units |items )?(?:are )?(?:in stock|on hand) (?:for|of) " + _SKU),
+        _intent_pattern(_SKU + r" (?:stock|inventory|on hand|stock level)"),
+    )
+
+    def statement(self, match, question, today):
+        # SKUs are matched as typed; only the keywords are case-insensitive
+        return (
+            select(
+                Product.sku, Product.name,
+                func.coalesce(ProductStock.on_hand, 0).label("on_hand"),
+                func.coalesce(ProductStock.reserved, 0).label("reserved"),
+                func.coalesce(ProductStock.damaged, 0).label("damaged"),
+            )
+            .outerjoin(ProductStock, ProductStock.product_id == Product.id)
+            .where(Product.sku == match.group("sku"))
+        )
+
+class SalesByCategoryIntent(ReportIntent):
+    """"sales by category this week", "revenue per category last month" """
+    name = "sales_by_category"
+    patterns = (
+        _intent_pattern(r"(?:sales|revenue) (?:by|per) category", period=True),
+        _intent_pattern(r"category (?:sales|revenue)", period=True),
+    )
+
+    def statement(self, match, question, today):
+        start, end = question_period(question, today)
+        revenue = func.sum(DailyProductSales.revenue)
+        return (
+            select(
+                func.coalesce(Product.category, "Uncategorized").label("category"),
+                func.sum(DailyProductSales.quantity).label("units_sold"),
+                revenue.label("revenue"),
+            )
+            .select_from(DailyProductSales)
+            .join(Product, Product.id == DailyProductSales.product_id)
+            .where(DailyProductSales.sales_date >= start, DailyProductSales.sales_date < end)
+            .group_by(Product.category)
+            .order_by(revenue.desc(), Product.category)
+        )
+
+class LowStockIntent(ReportIntent):
+    """"low stock", "which products are running low", "products below 5", "out of stock items" """
+    name = "low_stock"
+    patterns = (
+        _intent_pattern(
+            r"(?:(?:which|what) )?(?:(?:products|items) )?(?:are )?"
+            r"(?:(?P<out>out of stock)|low (?:on )?stock|running low)(?: products| items)?"
+        ),
+        _intent_pattern(r"(?:products|items|stock) (?:below|under|less than) (?P<threshold>\d+)(?: units)?"),
+    )
+
+    def statement(self, match, question, today):
+        groups = match.groupdict()
+        threshold = 1 if groups.get("out") else int(groups.get("threshold") or LOW_STOCK_THRESHOLD)
+        # Served by ix_product_stock_on_hand_product_id in this order
+        return (
+            select(Product.sku, Product.name, ProductStock.on_hand)
+            .select_from(ProductStock)
+            .join(Product, Product.id == ProductStock.product_id)
+            .where(ProductStock.on_hand < threshold)
+            .order_by(ProductStock.on_hand, ProductStock.product_id)
+        )
+
+# Tried in order; the first match answers the question
+INTENTS: List[ReportIntent] = [StockForSkuIntent(), SalesByCategoryIntent(), TopProductsIntent(), LowStockIntent()]
+
+def match_intent(question: str, today: Optional[date] = None) -> Optional[Tuple[str, Select]]:
+    """(intent name, parameterized statement) for a recognized question, None for the translator.
+
+    Sales periods are UTC days, like the daily rollup they are answered from."""
+    question = re.sub(r"\s+", " ", question).strip().rstrip("?.!").strip()
+    for intent in INTENTS:
+        match = intent.match(question)
+        if match is not None:
+            intent_matches.inc(labels={"intent": intent.name})
+            return intent.name, intent.statement(match, question, today or datetime.utcnow().date())
+    intent_matches.inc(labels={"intent": "none"})
+    return None
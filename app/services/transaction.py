@@ -1,15 +1,30 @@
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
-from typing import List, Optional
+from itertools import groupby
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from app.models.transaction import Transaction, TransactionItem
+from app.models.inventory import InventoryItem
+from app.models.transaction import Transaction, TransactionItem, TransactionType
+from app.schemas.inventory import InventoryItemCreate
 from app.schemas.transaction import TransactionCreate, TransactionItemCreate
-from app.repositories.transaction import TransactionRepository
+from app.repositories.transaction import AsyncTransactionRepository, TransactionRepository, generate_reference_number
+from app.repositories.inventory import StockAllocationConflict
+from app.repositories.report import SalesRollupRepository, counts_as_sale, EXCLUDED_SALE_STATUSES
 from app.services.inventory import InventoryService
+from app.services.report_cache import invalidate_reports
+from app.utils.pagination import decode_cursor, split_page
+
+VALID_TRANSACTION_TYPES = {transaction_type.value for transaction_type in TransactionType}
+# A bulk upload whose stock allocation races another writer is retried this many times in total
+BULK_ALLOCATION_ATTEMPTS = 3
 
 class TransactionService:
     def __init__(self):
         self.repository = TransactionRepository()
+        self.async_repository = AsyncTransactionRepository()
+        self.sales_rollup_repository = SalesRollupRepository()
         self.inventory_service = InventoryService()
     
     def get_transaction(self, db: Session, transaction_id: int) -> Optional[Transaction]:
@@ -18,96 +33,267 @@ class TransactionService:
     def get_transactions(self, db: Session, skip: int = 0, limit: int = 100) -> List[Transaction]:
         return self.repository.get_transactions(db, skip, limit)
     
+    async def get_transaction_async(self, db: AsyncSession, transaction_id: int) -> Optional[Transaction]:
+        return await self.async_repository.get_transaction(db, transaction_id)
+    
+    async def get_transactions_async(self, db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Transaction]:
+        return await self.async_repository.get_transactions(db, skip, limit)
+    
+    async def get_transactions_page_async(self, db: AsyncSession, cursor: Optional[str] = None,
+                                          limit: int = 100) -> Tuple[List[Transaction], Optional[str]]:
+        """One keyset page, newest first, and the cursor of the next page (raises InvalidCursor)"""
+        after = decode_cursor(cursor, 2) if cursor else None
+        rows = await self.async_repository.get_transactions_page(db, after=after, limit=limit + 1)
+        return split_page(rows, limit, lambda transaction: (transaction.transaction_date, transaction.id))
+    
     def create_transaction(self, db: Session, transaction: TransactionCreate) -> Transaction:
-        # Create the transaction
-        db_transaction = self.repository.create_transaction(db, transaction)
-        
-        # Update inventory based on transaction type
-        if transaction.transaction_type == "sale":
-            self._process_sale(db, db_transaction)
-        elif transaction.transaction_type == "purchase":
-            self._process_purchase(db, db_transaction)
-        elif transaction.transaction_type == "return":
-            self._process_return(db, db_transaction)
-        elif transaction.transaction_type == "adjustment":
-            self._process_adjustment(db, db_transaction)
+        # Header, line items, inventory and rollup changes form one unit of work with a single commit
+        try:
+            db_transaction = self.repository.create_transaction(db, transaction)
+            
+            quantities = self._aggregate_quantities(transaction.transaction_type, transaction.items)
+            db_transaction.stock_shortfalls = self._apply_inventory(db, transaction.transaction_type, quantities, {})
+            
+            if counts_as_sale(db_transaction):
+                sales_date = db_transaction.transaction_date.date()
+                self.sales_rollup_repository.apply_lines(db, (
+                    (sales_date, db_transaction.id, item.product_id, item.quantity, item.quantity * item.unit_price)
+                    for item in transaction.items
+                ))
+            
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
         
+        invalidate_reports("inventory", "sales")
         return db_transaction
     
+    def create_transactions_bulk(self, db: Session, transactions: List[TransactionCreate],
+                                 shortfalls: Optional[Dict[int, int]] = None) -> List[Dict[str, Any]]:
+        """Validate and insert a batch of transactions in one database transaction, returning a result per entry.
+
+        Stock that could not be allocated to the batch's sales is added to `shortfalls` per product.
+        """
+        shortfalls = {} if shortfalls is None else shortfalls
+        results = [
+            {"index": index, "reference_number": transaction.reference_number, "id": None, "error": None}
+            for index, transaction in enumerate(transactions)
+        ]
+        
+        # Validate the whole batch against the database with one query per lookup. Only references the
+        # client sent can be duplicates; generated ones are drawn until they are free
+        supplied = [t.reference_number for t in transactions if t.reference_number]
+        existing_references = self.repository.get_existing_references(db, supplied)
+        generated = iter(self._generate_references(db, len(transactions) - len(supplied), set(supplied)))
+        known_products = self.inventory_service.get_existing_product_ids(
+            db, {item.product_id for t in transactions for item in t.items}
+        )
+        seen_references = set()
+        accepted = []
+        for transaction, result in zip(transactions, results):
+            if not transaction.reference_number:
+                transaction.reference_number = result["reference_number"] = next(generated)
+            elif transaction.reference_number in existing_references or transaction.reference_number in seen_references:
+                result["error"] = f"Duplicate reference number: {transaction.reference_number}"
+            seen_references.add(transaction.reference_number)
+            if result["error"]:
+                continue
+            unknown = sorted({item.product_id for item in transaction.items} - known_products)
+            if transaction.transaction_type not in VALID_TRANSACTION_TYPES:
+                result["error"] = f"Invalid transaction type: {transaction.transaction_type}"
+            elif unknown:
+                result["error"] = f"Unknown product ids: {', '.join(map(str, unknown))}"
+            else:
+                accepted.append((transaction, result))
+        
+        if not accepted:
+            return results
+        
+        for attempt in range(BULK_ALLOCATION_ATTEMPTS):
+            accepted = [entry for entry in accepted if not entry[1]["error"]]
+            batch_shortfalls = {}
+            try:
+                try:
+                    self._insert_bulk(db, accepted, batch_shortfalls)
+                    db.commit()
+                except IntegrityError:
+                    # A constraint the checks above could not see, e.g. a reference inserted concurrently:
+                    # insert the entries one by one so only the offending ones fail
+                    db.rollback()
+                    batch_shortfalls = self._insert_individually(db, accepted)
+                    db.commit()
+            except StockAllocationConflict:
+                # Inventory changed under the allocation; the whole batch is retried
+                db.rollback()
+                for _, result in accepted:
+                    result["id"] = None
+                continue
+            except Exception:
+                db.rollback()
+                raise
+            break
+        else:
+            for _, result in accepted:
+                result["error"] = "Inventory changed concurrently; retry the transaction"
+            return results
+        
+        for product_id, shortfall in batch_shortfalls.items():
+            shortfalls[product_id] = shortfalls.get(product_id, 0) + shortfall
+        invalidate_reports("inventory", "sales")
+        return results
+    
+    def _generate_references(self, db: Session, count: int, taken: Set[str]) -> List[str]:
+        """count new reference numbers, none of them in taken or already stored"""
+        references: List[str] = []
+        while len(references) < count:
+            candidates = {generate_reference_number() for _ in range(count - len(references))} - taken - set(references)
+            candidates -= self.repository.get_existing_references(db, candidates)
+            references.extend(candidates)
+        return references
+    
+    def _insert_bulk(self, db: Session, accepted: List[Tuple[TransactionCreate, Dict[str, Any]]],
+                     shortfalls: Dict[int, int]) -> None:
+        """Headers, items, inventory and rollup for validated entries, without committing"""
+        transaction_date = datetime.utcnow()
+        ids = self.repository.bulk_create_transactions(db, [t for t, _ in accepted], transaction_date)
+        for (_, result), transaction_id in zip(accepted, ids):
+            result["id"] = transaction_id
+        
+        # Consecutive transactions of the same type collapse into one aggregated inventory change
+        inventory = {}
+        for transaction_type, run in groupby((t for t, _ in accepted), key=lambda t: t.transaction_type):
+            items = [item for t in run for item in t.items]
+            quantities = self._aggregate_quantities(transaction_type, items)
+            for product_id, shortfall in self._apply_inventory(db, transaction_type, quantities, inventory).items():
+                shortfalls[product_id] = shortfalls.get(product_id, 0) + shortfall
+        
+        self.sales_rollup_repository.apply_lines(db, (
+            (transaction_date.date(), t.reference_number, item.product_id, item.quantity, item.quantity * item.unit_price)
+            for t, _ in accepted
+            if t.transaction_type == "sale" and t.status not in EXCLUDED_SALE_STATUSES
+            for item in t.items
+        ))
+    
+    def _insert_individually(self, db: Session, accepted: List[Tuple[TransactionCreate, Dict[str, Any]]]) -> Dict[int, int]:
+        """_insert_bulk one entry per savepoint, recording database errors on the entries that raise them"""
+        shortfalls = {}
+        for entry in accepted:
+            entry_shortfalls = {}
+            try:
+                with db.begin_nested():
+                    self._insert_bulk(db, [entry], entry_shortfalls)
+            except IntegrityError as e:
+                entry[1]["id"] = None
+                entry[1]["error"] = f"Rejected by the database: {e.orig}"
+                continue
+            for product_id, shortfall in entry_shortfalls.items():
+                shortfalls[product_id] = shortfalls.get(product_id, 0) + shortfall
+        return shortfalls
+    
     def update_transaction_status(self, db: Session, transaction_id: int, status: str) -> Optional[Transaction]:
-        return self.repository.update_transaction_status(db, transaction_id, status)
+        db_transaction = self.repository.get_transaction(db, transaction_id)
+        if db_transaction is None:
+            return None
+        
+        # Keep the daily rollup in step when a sale enters or leaves the counted statuses
+        was_counted = counts_as_sale(db_transaction)
+        db_transaction.status = status
+        is_counted = counts_as_sale(db_transaction)
+        if was_counted != is_counted:
+            self.sales_rollup_repository.apply(db, [db_transaction], sign=1 if is_counted else -1)
+        
+        db_transaction = self.repository.update_transaction_status(db, transaction_id, status)
+        invalidate_reports("sales")
+        return db_transaction
+    
+    @staticmethod
+    def _aggregate_quantities(transaction_type: str, items) -> Dict[int, int]:
+        """Collapse line items into one quantity per product (adjustments keep the last count)"""
+        quantities: Dict[int, int] = {}
+        for item in items:
+            if transaction_type == "adjustment":
+                quantities[item.product_id] = item.quantity
+            else:
+                quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        return quantities
     
-    def _process_sale(self, db: Session, transaction: Transaction) -> None:
+    def _apply_inventory(self, db: Session, transaction_type: str, quantities: Dict[int, int],
+                         inventory: Dict[int, List[InventoryItem]]) -> Dict[int, int]:
+        """Update inventory based on transaction type; returns unfilled sale quantities per product"""
+        if transaction_type == "sale":
+            return self._process_sale(db, quantities, inventory)
+        
+        # The other handlers edit ORM rows; load the ones not already in the shared map
+        missing = [product_id for product_id in quantities if product_id not in inventory]
+        inventory.update(self.inventory_service.get_inventory_items_by_products(db, missing))
+        if transaction_type == "purchase":
+            self._process_purchase(db, quantities, inventory)
+        elif transaction_type == "return":
+            self._process_return(db, quantities, inventory)
+        elif transaction_type == "adjustment":
+            self._process_adjustment(db, quantities, inventory)
+        return {}
+    
+    def _process_sale(self, db: Session, quantities: Dict[int, int], inventory: Dict[int, List[InventoryItem]]) -> Dict[int, int]:
         """Reduce inventory quantities for sale transactions"""
-        for item in transaction.items:
-            inventory_items = self.inventory_service.get_inventory_items_by_product(db, item.product_id)
-            remaining_quantity = item.quantity
-            
-            for inv_item in inventory_items:
-                if inv_item.quantity >= remaining_quantity:
-                    inv_item.quantity -= remaining_quantity
-                    break
-                else:
-                    remaining_quantity -= inv_item.quantity
-                    inv_item.quantity = 0
-            
-            db.commit()
+        # Push pending ORM changes so the locking read sees them
+        db.flush()
+        shortfalls = self.inventory_service.allocate_stock(db, quantities)
+        
+        # The decrement bypassed the ORM, so any rows already loaded are stale
+        for product_id in quantities:
+            for inv_item in inventory.get(product_id, []):
+                db.expire(inv_item, ["quantity"])
+        return shortfalls
     
-    def _process_purchase(self, db: Session, transaction: Transaction) -> None:
+    def _process_purchase(self, db: Session, quantities: Dict[int, int], inventory: Dict[int, List[InventoryItem]]) -> None:
         """Increase inventory quantities for purchase transactions"""
-        for item in transaction.items:
-            # Check if inventory item exists for this product
-            inventory_items = self.inventory_service.get_inventory_items_by_product(db, item.product_id)
+        changes = []
+        for product_id, quantity in quantities.items():
+            inventory_items = inventory.get(product_id)
             
             if inventory_items:
                 # Add to existing inventory
-                inventory_items[0].quantity += item.quantity
+                changes.append((inventory_items[0], inventory_items[0].quantity + quantity))
             else:
                 # Create new inventory item
-                from app.schemas.inventory import InventoryItemCreate
-                inventory_item = InventoryItemCreate(
-                    product_id=item.product_id,
-                    quantity=item.quantity,
-                    location="Main Warehouse",
-                    status="available"
-                )
-                self.inventory_service.add_inventory(db, inventory_item)
-    
-    def _process_return(self, db: Session, transaction: Transaction) -> None:
+                inventory[product_id] = [self._add_inventory(db, product_id, quantity, "Main Warehouse", "available")]
+        self.inventory_service.set_inventory_quantities(db, changes)
+    
+    def _process_return(self, db: Session, quantities: Dict[int, int], inventory: Dict[int, List[InventoryItem]]) -> None:
         """Process return: increase inventory for returned items"""
-        for item in transaction.items:
-            inventory_items = self.inventory_service.get_inventory_items_by_product(db, item.product_id)
+        changes = []
+        for product_id, quantity in quantities.items():
+            inventory_items = inventory.get(product_id)
             
             if inventory_items:
                 # Add to existing inventory
-                inventory_items[0].quantity += item.quantity
+                changes.append((inventory_items[0], inventory_items[0].quantity + quantity))
             else:
                 # Create new inventory item
-                from app.schemas.inventory import InventoryItemCreate
-                inventory_item = InventoryItemCreate(
-                    product_id=item.product_id,
-                    quantity=item.quantity,
-                    location="Returns",
-                    status="returned"
-                )
-                self.inventory_service.add_inventory(db, inventory_item)
-    
-    def _process_adjustment(self, db: Session, transaction: Transaction) -> None:
+                inventory[product_id] = [self._add_inventory(db, product_id, quantity, "Returns", "returned")]
+        self.inventory_service.set_inventory_quantities(db, changes)
+    
+    def _process_adjustment(self, db: Session, quantities: Dict[int, int], inventory: Dict[int, List[InventoryItem]]) -> None:
         """Process inventory adjustment"""
-        for item in transaction.items:
-            inventory_items = self.inventory_service.get_inventory_items_by_product(db, item.product_id)
+        changes = []
+        for product_id, quantity in quantities.items():
+            inventory_items = inventory.get(product_id)
             
             if inventory_items:
-                # Update existing inventory
-                inventory_items[0].quantity = item.quantity  # Set to the adjusted quantity
-                inventory_items[0].last_count_date = datetime.utcnow()
+                # Update existing inventory to the adjusted quantity
+                changes.append((inventory_items[0], quantity))
             else:
                 # Create new inventory item with the adjusted quantity
-                from app.schemas.inventory import InventoryItemCreate
-                inventory_item = InventoryItemCreate(
-                    product_id=item.product_id,
-                    quantity=item.quantity,
-                    location="Main Warehouse",
-                    status="available"
-                )
-                self.inventory_service.add_inventory(db, inventory_item)
\ No newline at end of file
+                inventory[product_id] = [self._add_inventory(db, product_id, quantity, "Main Warehouse", "available")]
+        self.inventory_service.set_inventory_quantities(db, changes, counted=True)
+    
+    def _add_inventory(self, db: Session, product_id: int, quantity: int, location: str, status: str) -> InventoryItem:
+        inventory_item = InventoryItemCreate(
+            product_id=product_id,
+            quantity=quantity,
+            location=location,
+            status=status
+        )
+        return self.inventory_service.add_inventory(db, inventory_item, commit=False)
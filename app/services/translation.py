@@ -0,0 +1,196 @@
+import asyncio
+import hashlib
+import os
+import re
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Optional, Tuple, Type
+
+import openai
+
+from app.metrics import registry
+from app.repositories.report import AsyncQueryTranslationRepository
+from app.utils.sql_guard import UnsafeQuery, check_read_only_select
+
+# openai or local; the local stand-in answers a fixed set of questions without network access
+QUERY_TRANSLATOR = os.getenv("QUERY_TRANSLATOR") or ("openai" if os.getenv("OPENAI_API_KEY") else "local")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+TRANSLATION_TIMEOUT_SECONDS = float(os.getenv("TRANSLATION_TIMEOUT_SECONDS", "15"))
+# Cached translations are reused until they expire; schema changes are picked up after this long
+TRANSLATION_CACHE_TTL_SECONDS = int(os.getenv("TRANSLATION_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Simulated round trip of the local translator, to benchmark the uncached path offline
+LOCAL_TRANSLATOR_LATENCY_MS = float(os.getenv("LOCAL_TRANSLATOR_LATENCY_MS", "0"))
+
+# Tables generated report SQL may read
+NL_QUERY_TABLES = (
+    "products", "inventory_items", "product_stock", "transactions", "transaction_items",
+    "daily_product_sales", "customers", "vendors",
+)
+
+translation_lookups = registry.counter("query_translation_total", "Report questions translated, by cache outcome")
+translation_seconds = registry.histogram("query_translation_seconds", "Time spent in the translator on cache misses")
+
+class TranslationError(Exception):
+    """The translator failed or returned nothing usable"""
+
+class TranslationTimeout(TranslationError):
+    """The translator did not answer within TRANSLATION_TIMEOUT_SECONDS"""
+
+class UntranslatableQuery(TranslationError):
+    """The translator does not understand the question"""
+
+class UnsafeTranslation(TranslationError):
+    """The translator answered with SQL that is not a read-only SELECT over NL_QUERY_TABLES; never cached"""
+    
+    def __init__(self, message: str, sql: str):
+        super().__init__(message)
+        self.sql = sql
+
+def normalize_question(question: str) -> str:
+    """Case, spacing and trailing punctuation do not change the question"""
+    return re.sub(r"\s+", " ", question).strip().rstrip("?.!").strip().lower()
+
+def _extract_sql(content: str) -> str:
+    # Models often wrap the statement in a markdown fence despite being asked not to
+    fenced = re.search(r"```(?:sql)?\s*(.*?)```", content, re.DOTALL | re.IGNORECASE)
+    sql = (fenced.group(1) if fenced else content).strip().rstrip(";").strip()
+    if not sql:
+        raise TranslationError("The translator returned no SQL")
+    return sql
+
+class QueryTranslator(ABC):
+    """Turns a normalized report question into one SQL statement for the given dialect"""
+    name = "base"
+
+    @abstractmethod
+    async def translate(self, question: str, dialect: str) -> str:
+        """SQL for the question; raises TranslationError (or a subclass) when there is none"""
+
+class OpenAITranslator(QueryTranslator):
+    name = "openai"
+
+    SYSTEM_MESSAGE = """
+    You are an AI assistant for PolyBooks, an accounting and inventory management system.
+    You can access data about products, inventory, sales, purchases, and other transactions
+    (tables products, inventory_items, product_stock, transactions, transaction_items, daily_product_sales).
+    Reply with a single {dialect} SELECT statement and nothing else. Express relative dates with the
+    database's date functions rather than literal dates, so the statement stays valid when reused.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model: str = OPENAI_MODEL):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.model = model
+
+    async def translate(self, question: str, dialect: str) -> str:
+        try:
+            completion = await openai.ChatCompletion.acreate(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": self.SYSTEM_MESSAGE.format(dialect=dialect)},
+                    {"role": "user", "content": f"Generate a SQL query for: {question}"}
+                ],
+                api_key=self.api_key,
+                request_timeout=TRANSLATION_TIMEOUT_SECONDS,
+            )
+        except openai.error.Timeout as e:
+            raise TranslationTimeout(str(e))
+        except openai.error.OpenAIError as e:
+            raise TranslationError(str(e))
+        return _extract_sql(completion.choices[0].message.content)
+
+# Relative start dates per dialect, so translated SQL can be cached and reused on later days
+RECENT_DAYS = {
+    "postgresql": "CURRENT_DATE - {days}",
+    "sqlite": "date('now', '-{days} days')",
+}
+
+class LocalTranslator(QueryTranslator):
+    """Deterministic stand-in for tests and offline benchmarks: a few fixed question shapes, no network"""
+    name = "local"
+
+    def __init__(self, latency_ms: float = LOCAL_TRANSLATOR_LATENCY_MS):
+        self.latency_ms = latency_ms
+
+    async def translate(self, question: str, dialect: str) -> str:
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000.0)
+
+        if re.search(r"how many products|number of products|product count", question):
+            return "SELECT COUNT(*) AS product_count FROM products"
+        if re.search(r"inventory value|stock value|value of (the )?(inventory|stock)", question):
+            return ("SELECT SUM(s.on_hand * p.cost_price) AS inventory_value "
+                    "FROM product_stock s JOIN products p ON p.id = s.product_id")
+        match = re.search(r"low stock|running low|below (\d+)", question)
+        if match:
+            threshold = int(match.group(1) or 10)
+            return ("SELECT p.sku, p.name, s.on_hand FROM product_stock s JOIN products p ON p.id = s.product_id "
+                    f"WHERE s.on_hand < {threshold} ORDER BY s.on_hand, p.id")
+        match = re.search(r"(sales|revenue).*?(?:last|past) (\d+) days", question)
+        if match and dialect in RECENT_DAYS:
+            since = RECENT_DAYS[dialect].format(days=int(match.group(2)))
+            return ("SELECT SUM(quantity) AS units_sold, SUM(revenue) AS revenue FROM daily_product_sales "
+                    f"WHERE sales_date >= {since}")
+        raise UntranslatableQuery(f"The local translator cannot answer: {question}")
+
+TRANSLATORS: Dict[str, Type[QueryTranslator]] = {
+    OpenAITranslator.name: OpenAITranslator,
+    LocalTranslator.name: LocalTranslator,
+}
+
+def create_translator(name: str = QUERY_TRANSLATOR) -> QueryTranslator:
+    if name not in TRANSLATORS:
+        raise ValueError(f"Unknown query translator: {name}")
+    return TRANSLATORS[name]()
+
+class TranslationService:
+    """Question to SQL through the database-backed translation cache, calling the translator on misses"""
+
+    def __init__(self, translator: Optional[QueryTranslator] = None):
+        self.translator = translator or create_translator()
+        self.repository = AsyncQueryTranslationRepository()
+
+    async def translate(self, db: AsyncSession, question: str) -> Tuple[str, bool]:
+        """Return (sql, cached); raises TranslationError, TranslationTimeout, UntranslatableQuery or
+        UnsafeTranslation. Only SQL that passes the guard is cached"""
+        normalized = normalize_question(question)
+        dialect = db.get_bind().dialect.name
+        # The same question has a different answer per dialect and per translator
+        question_hash = hashlib.sha256(f"{dialect}\n{self.translator.name}\n{normalized}".encode()).hexdigest()
+        now = datetime.utcnow()
+
+        cached = await self.repository.get_current(db, question_hash, now)
+        if cached is not None:
+            await self.repository.record_hit(db, cached.id, now)
+            translation_lookups.inc(labels={"outcome": "hit"})
+            return cached.sql, True
+
+        started = asyncio.get_running_loop().time()
+        try:
+            sql = await asyncio.wait_for(self.translator.translate(normalized, dialect), TRANSLATION_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            translation_lookups.inc(labels={"outcome": "timeout"})
+            raise TranslationTimeout(f"No translation within {TRANSLATION_TIMEOUT_SECONDS:g}s")
+        except TranslationError:
+            translation_lookups.inc(labels={"outcome": "error"})
+            raise
+        finally:
+            translation_seconds.observe(asyncio.get_running_loop().time() - started, {"translator": self.translator.name})
+
+        try:
+            sql, _ = check_read_only_select(sql, NL_QUERY_TABLES)
+        except UnsafeQuery as e:
+            translation_lookups.inc(labels={"outcome": "rejected"})
+            raise UnsafeTranslation(str(e), sql)
+
+        translation_lookups.inc(labels={"outcome": "miss"})
+        await self.repository.save(db, {
+            "question_hash": question_hash,
+            "question": normalized,
+            "dialect": dialect,
+            "sql": sql,
+            "translator": self.translator.name,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=TRANSLATION_CACHE_TTL_SECONDS),
+        })
+        return sql, False
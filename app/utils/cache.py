@@ -0,0 +1,106 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from app.metrics import registry
+
+cache_hits = registry.counter("cache_hits_total", "Cache lookups answered from the cache")
+cache_misses = registry.counter("cache_misses_total", "Cache lookups that fell through to the source")
+cache_evictions = registry.counter("cache_evictions_total", "Entries dropped to stay within maxsize")
+
+class TTLCache:
+    """Thread-safe in-process LRU cache whose entries also expire after ttl seconds"""
+
+    def __init__(self, name: str, maxsize: Optional[int] = 1024, ttl: float = 60.0, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        labels = {"cache": self.name}
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                cache_hits.inc(labels=labels)
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+        cache_misses.inc(labels=labels)
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while self.maxsize is not None and len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                cache_evictions.inc(labels={"cache": self.name})
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+class RedisCache:
+    """Same interface backed by Redis, so every worker sees the same entries and invalidations.
+
+    Values must be JSON-serializable. `client` is anything with get/setex/delete (redis.Redis, fakeredis)."""
+
+    def __init__(self, name: str, client, ttl: float = 60.0):
+        self.name = name
+        self.client = client
+        self.ttl = ttl
+        self.prefix = f"polybooks:{name}:"
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        raw = self.client.get(self.prefix + str(key))
+        labels = {"cache": self.name}
+        if raw is None:
+            cache_misses.inc(labels=labels)
+            return default
+        cache_hits.inc(labels=labels)
+        return json.loads(raw)
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self.client.setex(self.prefix + str(key), max(1, int(self.ttl if ttl is None else ttl)), json.dumps(value, default=str))
+
+    def delete(self, key: Hashable) -> None:
+        self.client.delete(self.prefix + str(key))
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+def create_cache(name: str, url: Optional[str] = None, maxsize: Optional[int] = 1024, ttl: float = 60.0):
+    """In-process TTLCache by default (maxsize=None for unbounded); a RedisCache when url is a redis:// URL"""
+    if url:
+        try:
+            import redis
+        except ImportError as e:
+            # Fail at startup rather than on the first lookup
+            raise RuntimeError(
+                f"Cache {name} is configured for {url} but the redis package is not installed; pip install redis"
+            ) from e
+        return RedisCache(name, redis.Redis.from_url(url), ttl=ttl)
+    return TTLCache(name, maxsize=maxsize, ttl=ttl)
@@ -1,124 +1,229 @@
 import pandas as pd
+import csv
 import io
+import json
+import os
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Tuple
 
 from app.models.inventory import Product, InventoryItem
 from app.models.transaction import Transaction, TransactionItem
+from app.repositories.inventory import InventoryRepository, ProductRepository
+
+# Rows fetched per round trip during an export; with a server-side cursor only this many are held in memory
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+# Rows read, applied and committed together by the importers
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "5000"))
+
+# Columns each import kind requires
+IMPORT_COLUMNS = {
+    "products": ["sku", "name", "unit_price", "cost_price"],
+    "inventory_counts": ["id", "counted_quantity"],
+}
+
+# Supported export encodings and their media types
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+class ImportColumnsError(ValueError):
+    """Raised when an upload lacks a column its import kind requires"""
+
+def check_import_columns(source, kind: str) -> None:
+    """Read just the header of a CSV path or file object"""
+    columns = pd.read_csv(source, dtype=str, nrows=0).columns
+    missing_columns = [col for col in IMPORT_COLUMNS[kind] if col not in columns]
+    if missing_columns:
+        raise ImportColumnsError(f"Missing required columns: {', '.join(missing_columns)}")
+
+def read_import_chunks(source, kind: str, skip_rows: int = 0) -> Iterator[pd.DataFrame]:
+    """Read a CSV chunk by chunk as text, after the first skip_rows data rows.
+    Each chunk gets a `line` column holding its rows' line numbers in the file (the header is line 1)."""
+    reader = pd.read_csv(
+        source, dtype=str, keep_default_na=False, chunksize=IMPORT_CHUNK_SIZE,
+        skiprows=lambda index: 0 < index <= skip_rows
+    )
+    with reader:
+        for chunk in reader:
+            # The index counts data rows read by this reader, across chunks
+            chunk["line"] = chunk.index + skip_rows + 2
+            yield chunk
+
+def chunk_failure(chunk: pd.DataFrame, error: Exception) -> str:
+    reason = getattr(error, "orig", None) or error
+    return f"Rows {chunk['line'].iloc[0]}-{chunk['line'].iloc[-1]}: {reason}"
+
+def _reject_rows(frame: pd.DataFrame, labels: pd.Series, problems) -> Tuple[pd.DataFrame, List[str]]:
+    """Drop rows failing any (mask, reason) check; a row is reported once, for its first failing check"""
+    errors = []
+    rejected = pd.Series(False, index=frame.index)
+    for mask, reason in problems:
+        mask = mask & ~rejected
+        errors.extend(
+            f"Row {line} ({label}): {reason}"
+            for line, label in zip(frame.loc[mask, "line"], labels[mask])
+        )
+        rejected |= mask
+    return frame[~rejected], errors
+
+def _drain(buffer: io.StringIO) -> bytes:
+    chunk = buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return chunk
 
 class CSVUtil:
+    def __init__(self):
+        self.product_repository = ProductRepository(Product)
+        self.inventory_repository = InventoryRepository()
+    
     def import_products(self, db: Session, file_content: bytes) -> Dict[str, Any]:
-        """Import products from CSV file"""
+        """Import products from CSV file, upserting on sku in committed chunks"""
+        # Imported here: app.services imports app.utils
+        from app.services.inventory import invalidate_catalog
+        from app.services.report_cache import invalidate_reports
+        
+        source = io.BytesIO(file_content)
         try:
-            # Read CSV content
-            df = pd.read_csv(io.BytesIO(file_content))
-            
-            # Validate required columns
-            required_columns = ['sku', 'name', 'unit_price', 'cost_price']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                return {
-                    "success": False,
-                    "message": f"Missing required columns: {', '.join(missing_columns)}"
-                }
-            
-            # Process each row
-            products_added = 0
-            products_updated = 0
-            errors = []
-            
-            for _, row in df.iterrows():
-                try:
-                    # Check if product exists
-                    existing_product = db.query(Product).filter(
-                        Product.sku == row['sku']
-                    ).first()
-                    
-                    product_data = {
-                        "sku": row['sku'],
-                        "name": row['name'],
-                        "description": row.get('description', ''),
-                        "category": row.get('category', 'Uncategorized'),
-                        "unit_price": float(row['unit_price']),
-                        "cost_price": float(row['cost_price'])
-                    }
-                    
-                    if existing_product:
-                        # Update existing product
-                        for key, value in product_data.items():
-                            setattr(existing_product, key, value)
-                        products_updated += 1
-                    else:
-                        # Create new product
-                        new_product = Product(**product_data)
-                        db.add(new_product)
-                        products_added += 1
-                
-                except Exception as e:
-                    errors.append(f"Error processing row {row['sku']}: {str(e)}")
-            
-            db.commit()
-            
-            return {
-                "success": True,
-                "products_added": products_added,
-                "products_updated": products_updated,
-                "errors": errors
-            }
-            
+            check_import_columns(source, "products")
+        except ImportColumnsError as e:
+            return {"success": False, "message": str(e)}
         except Exception as e:
-            return {
-                "success": False,
-                "message": f"Failed to import CSV: {str(e)}"
-            }
-    
-    def export_products(self, db: Session) -> bytes:
-        """Export products to CSV file"""
-        products = db.query(Product).all()
+            return {"success": False, "message": f"Failed to import CSV: {str(e)}"}
+        source.seek(0)
         
-        data = []
-        for product in products:
-            data.append({
-                "id": product.id,
-                "sku": product.sku,
-                "name": product.name,
-                "description": product.description,
-                "category": product.category,
-                "unit_price": product.unit_price,
-                "cost_price": product.cost_price,
-                "created_at": product.created_at,
-                "updated_at": product.updated_at
-            })
+        products_added = 0
+        products_updated = 0
+        errors = []
+        for chunk in read_import_chunks(source, "products"):
+            try:
+                counts, chunk_errors = self.import_chunk(db, "products", chunk)
+                db.commit()
+            except SQLAlchemyError as e:
+                # A failed chunk is rolled back and reported; earlier chunks stay committed
+                db.rollback()
+                errors.append(chunk_failure(chunk, e))
+                continue
+            errors.extend(chunk_errors)
+            products_added += counts["added"]
+            products_updated += counts["updated"]
+            if counts["added"] or counts["updated"]:
+                invalidate_catalog()
+                invalidate_reports("products")
         
-        df = pd.DataFrame(data)
+        return {
+            "success": True,
+            "products_added": products_added,
+            "products_updated": products_updated,
+            "errors": errors
+        }
+    
+    def import_chunk(self, db: Session, kind: str, chunk: pd.DataFrame) -> Tuple[Dict[str, int], List[str]]:
+        """Validate and apply one chunk from read_import_chunks without committing; returns counts and row errors"""
+        if kind == "products":
+            return self._import_product_chunk(db, chunk)
+        if kind == "inventory_counts":
+            return self._import_count_chunk(db, chunk)
+        raise ValueError(f"Unknown import kind: {kind}")
+    
+    def _import_product_chunk(self, db: Session, chunk: pd.DataFrame) -> Tuple[Dict[str, int], List[str]]:
+        products = pd.DataFrame({
+            "line": chunk["line"],
+            "sku": chunk["sku"].str.strip(),
+            "name": chunk["name"].str.strip(),
+            "description": chunk["description"] if "description" in chunk.columns else "",
+            "category": chunk["category"].replace("", "Uncategorized") if "category" in chunk.columns else "Uncategorized",
+            "unit_price": pd.to_numeric(chunk["unit_price"], errors="coerce"),
+            "cost_price": pd.to_numeric(chunk["cost_price"], errors="coerce"),
+        })
+        products, errors = _reject_rows(products, products["sku"], [
+            (products["sku"] == "", "missing sku"),
+            (products["name"] == "", "missing name"),
+            (products["unit_price"].isna() | (products["unit_price"] < 0), "invalid unit_price"),
+            (products["cost_price"].isna() | (products["cost_price"] < 0), "invalid cost_price"),
+            (products.duplicated("sku", keep="last"), "duplicate sku, superseded by a later row"),
+        ])
         
-        # Convert to CSV
-        output = io.BytesIO()
-        df.to_csv(output, index=False)
-        return output.getvalue()
+        rows = products.drop(columns="line").to_dict("records")
+        existing = self.product_repository.get_existing_skus(db, products["sku"])
+        self.product_repository.upsert_by_sku(db, rows)
+        return {"added": len(rows) - len(existing), "updated": len(existing)}, errors
     
-    def export_inventory(self, db: Session) -> bytes:
-        """Export inventory to CSV file"""
-        # Join inventory with products
-        inventory_items = db.query(InventoryItem, Product).join(
-            Product, InventoryItem.product_id == Product.id
-        ).all()
+    def _import_count_chunk(self, db: Session, chunk: pd.DataFrame) -> Tuple[Dict[str, int], List[str]]:
+        """A count sheet sets counted quantities on inventory rows by id, as the count list endpoint returns them"""
+        counts = pd.DataFrame({
+            "line": chunk["line"],
+            "id": pd.to_numeric(chunk["id"], errors="coerce"),
+            "counted_quantity": pd.to_numeric(chunk["counted_quantity"], errors="coerce"),
+        })
+        quantity = counts["counted_quantity"]
+        counts, errors = _reject_rows(counts, chunk["id"].str.strip(), [
+            (counts["id"].isna() | (counts["id"] % 1 != 0), "invalid id"),
+            (quantity.isna() | (quantity % 1 != 0) | (quantity < 0), "invalid counted_quantity"),
+            (counts.duplicated("id", keep="last"), "duplicate id, superseded by a later row"),
+        ])
         
-        data = []
-        for item, product in inventory_items:
-            data.append({
-                "product_id": product.id,
-                "sku": product.sku,
-                "name": product.name,
-                "quantity": item.quantity,
-                "location": item.location,
-                "status": item.status,
-                "last_count_date": item.last_count_date
-            })
+        items = self.inventory_repository.get_by_ids(db, counts["id"].astype(int).tolist())
+        unknown = ~counts["id"].isin(list(items))
+        errors.extend(f"Row {line} ({int(item_id)}): unknown inventory item"
+                      for line, item_id in zip(counts.loc[unknown, "line"], counts.loc[unknown, "id"]))
+        counts = counts[~unknown]
         
-        df = pd.DataFrame(data)
+        changes = [
+            (items[item_id], quantity)
+            for item_id, quantity in zip(counts["id"].astype(int).tolist(), counts["counted_quantity"].astype(int).tolist())
+        ]
+        self.inventory_repository.set_quantities(db, changes, counted=True)
+        return {"counted": len(changes)}, errors
+    
+    def stream_rows(self, db: Session, stmt, format: str = "csv") -> Iterator[bytes]:
+        """Encode the rows of a select incrementally, one chunk per batch fetched from a server-side cursor"""
+        if format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {format}")
+        columns = list(stmt.selected_columns.keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        
+        # The header goes out before the query runs so the client sees the first byte immediately
+        if format == "csv":
+            writer.writerow(columns)
+            yield _drain(buffer)
         
-        # Convert to CSV
-        output = io.BytesIO()
-        df.to_csv(output, index=False)
-        return output.getvalue()
\ No newline at end of file
+        # yield_per implies stream_results: a named cursor on PostgreSQL, incremental fetches on SQLite
+        result = db.execute(stmt.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        try:
+            for partition in result.partitions():
+                if format == "csv":
+                    writer.writerows(partition)
+                else:
+                    for row in partition:
+                        buffer.write(json.dumps(dict(zip(columns, row)), default=str))
+                        buffer.write("\n")
+                yield _drain(buffer)
+        finally:
+            result.close()
+    
+    def stream_products(self, db: Session, format: str = "csv") -> Iterator[bytes]:
+        """Export products as a stream of CSV or NDJSON chunks"""
+        stmt = select(
+            Product.id, Product.sku, Product.name, Product.description, Product.category,
+            Product.unit_price, Product.cost_price, Product.created_at, Product.updated_at
+        ).order_by(Product.id)
+        return self.stream_rows(db, stmt, format)
+    
+    def stream_inventory(self, db: Session, format: str = "csv") -> Iterator[bytes]:
+        """Export inventory joined with products as a stream of CSV or NDJSON chunks"""
+        stmt = select(
+            Product.id.label("product_id"), Product.sku, Product.name, InventoryItem.quantity,
+            InventoryItem.location, InventoryItem.status, InventoryItem.last_count_date
+        ).join(Product, InventoryItem.product_id == Product.id).order_by(InventoryItem.id)
+        return self.stream_rows(db, stmt, format)
+    
+    def export_products(self, db: Session) -> bytes:
+        """Export products to CSV file"""
+        return b"".join(self.stream_products(db))
+    
+    def export_inventory(self, db: Session) -> bytes:
+        """Export inventory to CSV file"""
+        return b"".join(self.stream_inventory(db))
@@ -0,0 +1,102 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from app.metrics import registry
+
+# Password hashing: a thread per core; bcrypt releases the GIL while it works
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", "256"))
+
+# Report computation: separate processes so pandas/numpy work does not hold this process's GIL
+REPORT_EXECUTOR = os.getenv("REPORT_EXECUTOR", "process")  # process, thread or inline
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_QUEUE = int(os.getenv("REPORT_QUEUE", "8"))
+REPORT_POOL_START_METHOD = os.getenv("REPORT_POOL_START_METHOD", "spawn")
+
+executor_in_flight = registry.gauge("executor_in_flight", "Tasks running or queued in an executor")
+executor_rejected = registry.counter("executor_rejected_total", "Tasks refused because the executor queue was full")
+executor_latency = registry.histogram("executor_latency_seconds", "Time from submission to completion, queueing included")
+
+class ExecutorSaturated(Exception):
+    """Raised when an executor already holds max_workers + max_queue tasks"""
+
+class BoundedExecutor:
+    """Thread or process pool that refuses work beyond a fixed queue depth instead of growing without limit"""
+
+    def __init__(self, name: str, kind: str, max_workers: int, max_queue: int, start_method: Optional[str] = None):
+        if kind not in ("thread", "process", "inline"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.start_method = start_method
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created on first use so importing the module never forks or starts threads
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    context = multiprocessing.get_context(self.start_method) if self.start_method else None
+                    self._executor = ProcessPoolExecutor(self.max_workers, mp_context=context)
+                else:
+                    self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix=self.name)
+            return self._executor
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        labels = {"executor": self.name}
+        if not self._slots.acquire(blocking=False):
+            executor_rejected.inc(labels=labels)
+            raise ExecutorSaturated(f"The {self.name} executor is at capacity")
+
+        executor_in_flight.inc(labels=labels)
+        submitted = time.perf_counter()
+
+        def release(_):
+            self._slots.release()
+            executor_in_flight.dec(labels=labels)
+            executor_latency.observe(time.perf_counter() - submitted, labels)
+
+        if self.kind == "inline":
+            future = Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+        else:
+            try:
+                future = self._get_executor().submit(fn, *args, **kwargs)
+            except BaseException:
+                release(None)
+                raise
+        future.add_done_callback(release)
+        return future
+
+    def call(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn on the pool and wait for it, from synchronous code"""
+        return self.submit(fn, *args, **kwargs).result()
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn on the pool without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+password_executor = BoundedExecutor("password_hash", "thread", PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE)
+report_executor = BoundedExecutor("report", REPORT_EXECUTOR, REPORT_WORKERS, REPORT_QUEUE, REPORT_POOL_START_METHOD)
+
+def shutdown_executors() -> None:
+    password_executor.shutdown()
+    report_executor.shutdown()
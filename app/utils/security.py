@@ -1,9 +1,46 @@
 from passlib.context import CryptContext
+from collections import deque
+import os
 import re
-from typing import Dict, Any
+import threading
+import time
+from typing import Deque, Dict, Any, Optional, Tuple
 
-# Password context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.metrics import registry
+
+# Hashing parameters; the first scheme hashes new passwords, the others are only verified and then rehashed.
+# argon2 needs the argon2-cffi package, bcrypt the bcrypt package
+PASSWORD_SCHEMES = os.getenv("PASSWORD_SCHEMES", "bcrypt")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+# The one password context for the whole application
+pwd_context = CryptContext()
+
+def configure_password_hashing(schemes: str = PASSWORD_SCHEMES, bcrypt_rounds: int = BCRYPT_ROUNDS,
+                               argon2_time_cost: int = ARGON2_TIME_COST, argon2_memory_cost: int = ARGON2_MEMORY_COST,
+                               argon2_parallelism: int = ARGON2_PARALLELISM) -> None:
+    """(Re)load pwd_context in place; hashes made with other schemes or costs then report needs_rehash"""
+    names = [name.strip() for name in schemes.split(",") if name.strip()]
+    if "bcrypt" not in names:
+        names.append("bcrypt")  # existing hashes stay verifiable after switching to argon2
+    settings = {
+        "schemes": names,
+        "default": names[0],
+        "deprecated": names[1:],
+        "bcrypt__rounds": bcrypt_rounds,
+    }
+    if "argon2" in names:
+        settings.update(
+            argon2__time_cost=argon2_time_cost,
+            argon2__memory_cost=argon2_memory_cost,
+            argon2__parallelism=argon2_parallelism,
+        )
+    pwd_context.load(settings)
+
+configure_password_hashing()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
@@ -13,6 +50,64 @@ def get_password_hash(password: str) -> str:
     """Get password hash"""
     return pwd_context.hash(password)
 
+def needs_rehash(hashed_password: str) -> bool:
+    """True when the hash uses a deprecated scheme or different cost parameters"""
+    return pwd_context.needs_update(hashed_password)
+
+login_throttled = registry.counter("login_throttled_total", "Login attempts rejected before hashing")
+
+LOGIN_WINDOW_SECONDS = float(os.getenv("LOGIN_WINDOW_SECONDS", "300"))
+LOGIN_MAX_ATTEMPTS_PER_USER = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_USER", "5"))
+LOGIN_MAX_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_IP", "50"))
+
+class LoginThrottle:
+    """Sliding-window limit on login attempts per username and per client IP.
+
+    Attempts are counted when they start, so a concurrent flood is cut off before any hash runs;
+    a successful login clears the username's window."""
+
+    def __init__(self, max_per_user: int = LOGIN_MAX_ATTEMPTS_PER_USER, max_per_ip: int = LOGIN_MAX_ATTEMPTS_PER_IP,
+                 window: float = LOGIN_WINDOW_SECONDS, max_keys: int = 100000):
+        self.limits = {"user": max_per_user, "ip": max_per_ip}
+        self.window = window
+        self.max_keys = max_keys
+        self._attempts: Dict[Tuple[str, str], Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def _window(self, key: Tuple[str, str], now: float) -> Deque[float]:
+        attempts = self._attempts.get(key)
+        if attempts is None:
+            if len(self._attempts) >= self.max_keys:
+                self._prune(now)
+            attempts = self._attempts[key] = deque()
+        while attempts and attempts[0] <= now - self.window:
+            attempts.popleft()
+        return attempts
+
+    def _prune(self, now: float) -> None:
+        for key in [key for key, attempts in self._attempts.items() if not attempts or attempts[-1] <= now - self.window]:
+            del self._attempts[key]
+
+    def acquire(self, username: str, ip: Optional[str]) -> float:
+        """Record an attempt; returns 0 if allowed, otherwise seconds until the next one may be made"""
+        now = time.monotonic()
+        keys = [("user", username.lower())] + ([("ip", ip)] if ip else [])
+        with self._lock:
+            windows = [(key, self._window(key, now)) for key in keys]
+            for (scope, _), attempts in windows:
+                if len(attempts) >= self.limits[scope]:
+                    login_throttled.inc(labels={"scope": scope})
+                    return max(attempts[0] + self.window - now, 1.0)
+            for _, attempts in windows:
+                attempts.append(now)
+        return 0.0
+
+    def reset(self, username: str) -> None:
+        with self._lock:
+            self._attempts.pop(("user", username.lower()), None)
+
+login_throttle = LoginThrottle()
+
 def validate_password_strength(password: str) -> Dict[str, Any]:
     """Validate password strength"""
     errors = []
@@ -0,0 +1,127 @@
+import re
+from typing import Dict, Iterable, List, Tuple
+
+class UnsafeQuery(ValueError):
+    """Generated SQL that is not a single read-only SELECT over the allowed tables"""
+
+# Strings, quoted identifiers and comments are single tokens, so keywords inside them are never matched
+_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^']|'')*')
+  | (?P<quoted>"(?:[^"]|"")*")
+  | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)
+  | (?P<symbol>::|<=|>=|<>|!=|\|\||[(),.;*=<>+\-/%])
+""", re.VERBOSE | re.DOTALL)
+
+# Statements and clauses that write, lock or change settings; the leading keyword is already checked, so
+# these catch data-modifying CTEs, SELECT INTO and FOR UPDATE/SHARE
+FORBIDDEN_KEYWORDS = {
+    "insert", "update", "delete", "merge", "drop", "alter", "create", "truncate", "grant", "revoke",
+    "attach", "detach", "pragma", "vacuum", "reindex", "copy", "call", "execute", "prepare", "lock",
+    "set", "reset", "into", "share", "notify", "listen",
+}
+# Functions that read files, run SQL from strings, sleep or reach other servers
+FORBIDDEN_FUNCTION_PREFIXES = (
+    "pg_", "lo_", "dblink", "query_to_", "cursor_to_", "table_to_", "schema_to_", "database_to_",
+    "set_config", "current_setting", "load_extension", "readfile", "writefile", "fts3_tokenizer",
+)
+# Words after FROM/JOIN that are not table names
+_TABLE_MODIFIERS = {"lateral", "only"}
+# Functions whose arguments use FROM without naming a table, e.g. EXTRACT(YEAR FROM transaction_date)
+_FROM_ARGUMENT_FUNCTIONS = {"extract", "substring", "trim", "overlay", "position"}
+_CLAUSE_KEYWORDS = {
+    "where", "group", "order", "having", "limit", "offset", "union", "intersect", "except", "window",
+    "join", "inner", "left", "right", "full", "outer", "cross", "natural", "on", "using", "fetch", "for",
+}
+
+def _tokenize(sql: str) -> List[Tuple[str, str]]:
+    tokens = []
+    position = 0
+    while position < len(sql):
+        match = _TOKEN.match(sql, position)
+        if match is None:
+            raise UnsafeQuery(f"Unexpected character {sql[position]!r} in generated SQL")
+        kind = match.lastgroup
+        if kind not in ("space", "comment"):
+            tokens.append((kind, match.group()))
+        position = match.end()
+    return tokens
+
+def _name(token: Tuple[str, str]) -> str:
+    kind, value = token
+    return value[1:-1].replace('""', '"').lower() if kind == "quoted" else value.lower()
+
+def check_read_only_select(sql: str, allowed_tables: Iterable[str]) -> Tuple[str, Dict[str, str]]:
+    """Validate generated SQL as one read-only SELECT (or WITH ... SELECT) over allowed_tables.
+
+    Returns the statement without a trailing semicolon and the tables it reads, keyed by alias
+    (a table without an alias is keyed by its own name). Raises UnsafeQuery otherwise."""
+    allowed = {table.lower() for table in allowed_tables}
+    sql = sql.strip().rstrip(";").strip()
+    tokens = _tokenize(sql)
+    if not tokens:
+        raise UnsafeQuery("Empty query")
+    if tokens[0][0] != "word" or tokens[0][1].lower() not in ("select", "with"):
+        raise UnsafeQuery("Only SELECT statements are allowed")
+
+    # Names a WITH clause defines may be read like tables
+    ctes = {
+        _name(tokens[i]) for i in range(len(tokens) - 2)
+        if tokens[i][0] in ("word", "quoted") and tokens[i + 1][1].lower() == "as" and tokens[i + 2][1] == "("
+    }
+    tables: Dict[str, str] = {}
+    # The word before each open parenthesis, to tell EXTRACT(... FROM ...) from a FROM clause
+    parentheses: List[str] = []
+    for i, (kind, value) in enumerate(tokens):
+        word = value.lower()
+        if kind == "symbol" and value == ";":
+            raise UnsafeQuery("Only a single statement is allowed")
+        if value == "(":
+            parentheses.append(tokens[i - 1][1].lower() if i else "")
+        elif value == ")" and parentheses:
+            parentheses.pop()
+        if kind != "word":
+            continue
+        if word in FORBIDDEN_KEYWORDS:
+            raise UnsafeQuery(f"{value.upper()} is not allowed in report queries")
+        if i + 1 < len(tokens) and tokens[i + 1][1] == "(" and word.startswith(FORBIDDEN_FUNCTION_PREFIXES):
+            raise UnsafeQuery(f"Function {value} is not allowed in report queries")
+        if word == "from" and parentheses and parentheses[-1] in _FROM_ARGUMENT_FUNCTIONS:
+            continue
+        if word in ("from", "join"):
+            _check_table_list(tokens, i + 1, allowed | ctes, tables, many=word == "from")
+    return sql, tables
+
+def _check_table_list(tokens, i: int, allowed, tables: Dict[str, str], many: bool) -> None:
+    """Check the table references after FROM (comma-separated) or JOIN, recording their aliases"""
+    while i < len(tokens):
+        while i < len(tokens) and tokens[i][1].lower() in _TABLE_MODIFIERS:
+            i += 1
+        if i >= len(tokens) or tokens[i][1] == "(":
+            return  # a subquery; its own FROM is checked when the scan reaches it
+        if tokens[i][0] not in ("word", "quoted"):
+            raise UnsafeQuery("Unexpected table reference")
+        name = _name(tokens[i])
+        i += 1
+        if i + 1 < len(tokens) and tokens[i][1] == ".":
+            # Schema-qualified: only the default schema
+            if name != "public":
+                raise UnsafeQuery(f"Schema {name} is not allowed in report queries")
+            name = _name(tokens[i + 1])
+            i += 2
+        if i < len(tokens) and tokens[i][1] == "(":
+            raise UnsafeQuery(f"Table function {name} is not allowed in report queries")
+        if name not in allowed:
+            raise UnsafeQuery(f"Table {name} is not available to report queries")
+        alias = name
+        if i < len(tokens) and tokens[i][1].lower() == "as":
+            i += 1
+        if i < len(tokens) and tokens[i][0] in ("word", "quoted") and tokens[i][1].lower() not in _CLAUSE_KEYWORDS:
+            alias = _name(tokens[i])
+            i += 1
+        tables[alias] = name
+        if not (many and i < len(tokens) and tokens[i][1] == ","):
+            return
+        i += 1
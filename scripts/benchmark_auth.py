@@ -0,0 +1,63 @@
+import asyncio
+import sys
+import time
+
+from jose import jwt
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from benchmark_common import BENCHMARK_DATABASE_URL, create_benchmark_session
+
+from app.api.dependencies import get_admin_user, get_current_active_user, get_current_user
+from app.database import create_async_db_engine, to_async_url
+from app.models.user import Role, User
+from app.services import authentication
+from app.services.authentication import ALGORITHM, SECRET_KEY, AuthService
+
+auth_service = AuthService()
+
+async def legacy_chain(db, token: str) -> None:
+    """The pre-claims dependency chain: decode, load the user, then lazy-load roles"""
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    user = await auth_service.get_user_by_username_async(db, payload["sub"])
+    if not user.is_active or "admin" not in [role.name for role in user.roles]:
+        raise RuntimeError("unauthorized")
+
+async def current_chain(db, token: str) -> None:
+    get_admin_user(await get_current_active_user(await get_current_user(db, token)))
+
+async def measure(label: str, chain, session_factory, token: str, iterations: int, before=None) -> None:
+    async with session_factory() as db:
+        await chain(db, token)  # warm-up
+        started = time.perf_counter()
+        for _ in range(iterations):
+            if before:
+                before()
+            await chain(db, token)
+            await db.rollback()
+        elapsed = time.perf_counter() - started
+    print(f"{label:40s} {elapsed / iterations * 1e6:9.1f} us/request")
+
+async def main(iterations: int) -> None:
+    engine, db = create_benchmark_session()
+    admin = Role(name="admin")
+    user = User(username="benchadmin", email="bench@example.com", full_name="Bench Admin",
+                hashed_password="x", is_active=True, roles=[admin])
+    db.add(user)
+    db.commit()
+    claims_token = auth_service.create_user_token(user)
+    sub_token = auth_service.create_access_token(data={"sub": user.username})
+    db.close()
+    engine.dispose()
+
+    async_engine = create_async_db_engine(to_async_url(BENCHMARK_DATABASE_URL), name="benchmark-auth")
+    session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    print(f"Admin authorization, {iterations} requests with the same bearer")
+    await measure("legacy: decode + user query + roles", legacy_chain, session_factory, sub_token, iterations)
+    await measure("claims, signature verified every time", current_chain, session_factory, claims_token, iterations,
+                  before=authentication.verified_token_cache.clear)
+    await measure("claims + verified-token cache", current_chain, session_factory, claims_token, iterations)
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,59 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+# Add the parent directory to the path so we can import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app import models  # noqa: F401 - registers every table on Base.metadata
+
+# Benchmarks run against a throwaway SQLite file unless pointed at a real server
+BENCHMARK_DATABASE_URL = os.getenv("BENCHMARK_DATABASE_URL", "sqlite:///./benchmark.db")
+
+def create_benchmark_session(url: str = BENCHMARK_DATABASE_URL):
+    """Create a fresh schema and return (engine, session)"""
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    engine = create_engine(url, connect_args=connect_args)
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    return engine, session
+
+class QueryCounter:
+    """Count statements sent to the database while active"""
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+    
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+    
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._on_execute)
+        return self
+    
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._on_execute)
+
+@contextmanager
+def timed(label: str):
+    """Print wall time for the enclosed block"""
+    start = time.perf_counter()
+    yield
+    print(f"{label}: {time.perf_counter() - start:.3f}s")
+
+def percentile(samples, pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+def parse_sizes(argv, default):
+    """Read row counts from the command line, e.g. `10000 100000`"""
+    return [int(arg) for arg in argv[1:]] or default
@@ -0,0 +1,61 @@
+import io
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmark_common import create_benchmark_session, parse_sizes
+
+from app.models.inventory import Product
+from app.utils.csv import CSVUtil
+
+from benchmark_reports import seed_products
+
+csv_util = CSVUtil()
+
+def legacy_export_products(db) -> bytes:
+    """The pre-streaming export: every row as an ORM object, then a dict, then a DataFrame, then one buffer"""
+    data = [
+        {
+            "id": product.id, "sku": product.sku, "name": product.name, "description": product.description,
+            "category": product.category, "unit_price": product.unit_price, "cost_price": product.cost_price,
+            "created_at": product.created_at, "updated_at": product.updated_at,
+        }
+        for product in db.query(Product).all()
+    ]
+    output = io.BytesIO()
+    pd.DataFrame(data).to_csv(output, index=False)
+    return output.getvalue()
+
+def measure(label: str, export) -> None:
+    db.expunge_all()
+    tracemalloc.start()
+    started = time.perf_counter()
+    first_byte = None
+    size = 0
+    for chunk in export():
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        size += len(chunk)  # stands in for the socket; nothing is kept
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:10s} first byte {first_byte * 1000:9.1f}ms  total {elapsed:7.2f}s  "
+          f"peak {peak / 2**20:8.1f} MiB  ({size / 2**20:.0f} MiB sent)")
+
+if __name__ == "__main__":
+    # Usage: benchmark_export.py [--legacy] [sizes...]
+    include_legacy = "--legacy" in sys.argv
+    sizes = parse_sizes([arg for arg in sys.argv if arg != "--legacy"], [10000, 100000, 1000000])
+    for count in sizes:
+        engine, db = create_benchmark_session()
+        seed_products(db, count)
+        db.commit()
+        print(f"{count} products")
+        if include_legacy:
+            measure("legacy", lambda: [legacy_export_products(db)])
+        measure("csv", lambda: csv_util.stream_products(db, "csv"))
+        measure("ndjson", lambda: csv_util.stream_products(db, "ndjson"))
+        db.close()
+        engine.dispose()
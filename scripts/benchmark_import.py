@@ -0,0 +1,63 @@
+import io
+import sys
+import time
+
+import pandas as pd
+
+from benchmark_common import QueryCounter, create_benchmark_session, parse_sizes
+
+from app.models.inventory import Product
+from app.utils.csv import CSVUtil
+
+from benchmark_reports import seed_products
+
+csv_util = CSVUtil()
+
+def generate_catalog(count: int) -> bytes:
+    """A supplier file where half the SKUs already exist (BENCH prefix, as seeded) and half are new"""
+    lines = ["sku,name,description,category,unit_price,cost_price"]
+    for i in range(count):
+        sku = f"BENCH{i:08d}" if i % 2 == 0 else f"NEW{i:08d}"
+        lines.append(f"{sku},Supplier Product {i},,Category {i % 50},{10 + i % 7}.5,{5 + i % 3}.25")
+    return ("\n".join(lines) + "\n").encode()
+
+def legacy_import_products(db, file_content: bytes) -> None:
+    """The pre-upsert importer: one SELECT per row, then an ORM insert or update"""
+    df = pd.read_csv(io.BytesIO(file_content))
+    for _, row in df.iterrows():
+        existing_product = db.query(Product).filter(Product.sku == row['sku']).first()
+        product_data = {
+            "sku": row['sku'], "name": row['name'], "description": row.get('description', ''),
+            "category": row.get('category', 'Uncategorized'),
+            "unit_price": float(row['unit_price']), "cost_price": float(row['cost_price']),
+        }
+        if existing_product:
+            for key, value in product_data.items():
+                setattr(existing_product, key, value)
+        else:
+            db.add(Product(**product_data))
+    db.commit()
+
+def measure(label: str, count: int, importer) -> None:
+    engine, db = create_benchmark_session()
+    seed_products(db, count // 2)
+    db.commit()
+    content = generate_catalog(count)
+    with QueryCounter(engine) as counter:
+        started = time.perf_counter()
+        importer(db, content)
+        elapsed = time.perf_counter() - started
+    print(f"  {label:10s} {elapsed:8.2f}s  {count / elapsed:10.0f} rows/s  {counter.count:8d} statements")
+    db.close()
+    engine.dispose()
+
+if __name__ == "__main__":
+    # Usage: benchmark_import.py [--legacy] [sizes...]
+    # --legacy also times the row-at-a-time importer (slow beyond ~10k rows)
+    include_legacy = "--legacy" in sys.argv
+    sizes = parse_sizes([arg for arg in sys.argv if arg != "--legacy"], [10000, 100000, 1000000])
+    for count in sizes:
+        print(f"{count} catalog rows, half of them existing products")
+        if include_legacy:
+            measure("legacy", count, legacy_import_products)
+        measure("upsert", count, csv_util.import_products)
@@ -0,0 +1,88 @@
+import argparse
+import asyncio
+import random
+import time
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from benchmark_common import BENCHMARK_DATABASE_URL, create_benchmark_session, percentile
+
+from sqlalchemy import insert
+
+from app.database import create_async_db_engine, to_async_url
+from app.models.inventory import ProductStock
+from app.repositories.report import SalesRollupRepository
+from app.services.report import ReportGenerator
+from app.services.translation import LocalTranslator, TranslationService
+
+from benchmark_reports import SALES_PRODUCT_COUNT, insert_batched, seed_sales
+
+# Shapes the intent matcher answers directly; {sku} and {n} are filled per request
+INTENT_QUESTIONS = [
+    "Top {n} products last month",
+    "top {n} best sellers by units this week",
+    "Stock for SKU BENCH{sku:08d}",
+    "how many on hand for sku BENCH{sku:08d}?",
+    "Sales by category this week",
+    "revenue per category last 7 days",
+    "Which products are running low?",
+]
+# Only the translator knows these
+TRANSLATED_QUESTIONS = [
+    "How many products?",
+    "What is the inventory value?",
+    "Sales in the last 7 days",
+    "Revenue for the past 30 days",
+]
+
+async def main(args) -> None:
+    rng = random.Random(42)
+    engine, db = create_benchmark_session()
+    seed_sales(db, args.sale_lines)
+    insert_batched(db, ProductStock, (
+        {"product_id": i, "on_hand": rng.randint(0, 200), "reserved": 0, "damaged": 0}
+        for i in range(1, SALES_PRODUCT_COUNT + 1)
+    ))
+    SalesRollupRepository().rebuild(db)
+    db.close()
+    engine.dispose()
+    
+    async_engine = create_async_db_engine(to_async_url(BENCHMARK_DATABASE_URL), name="nl-query")
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    report_service = ReportGenerator()
+    # The local translator stands in for the LLM, sleeping for a typical completion round trip
+    report_service.translation_service = TranslationService(LocalTranslator(latency_ms=args.latency))
+    
+    latencies = {"intent": [], "translated (miss)": [], "cached (hit)": []}
+    for _ in range(args.requests):
+        if rng.random() < args.intent_share:
+            question = rng.choice(INTENT_QUESTIONS).format(n=rng.randint(3, 20), sku=rng.randint(0, SALES_PRODUCT_COUNT - 1))
+        else:
+            question = rng.choice(TRANSLATED_QUESTIONS)
+        # Users retype the same questions with different casing and punctuation
+        question = question.lower() if rng.random() < 0.5 and "sku" not in question.lower() else question.rstrip("?")
+        async with AsyncSession() as session:
+            started = time.perf_counter()
+            result = await report_service.process_natural_language_query(session, question)
+            elapsed = time.perf_counter() - started
+        assert result.get("error") is None, result
+        path = "intent" if result["intent"] else "cached (hit)" if result["cached"] else "translated (miss)"
+        latencies[path].append(elapsed)
+    
+    print(f"{args.requests} questions, {args.intent_share:.0%} of recognized shapes, translator latency {args.latency:g}ms, "
+          f"{args.sale_lines} sale lines")
+    for path, samples in latencies.items():
+        if samples:
+            print(f"  {path:18s} {len(samples):5d} ({len(samples) / args.requests:4.0%})  "
+                  f"p50 {percentile(samples, 50) * 1000:8.1f}ms  p95 {percentile(samples, 95) * 1000:8.1f}ms")
+    everything = [sample for samples in latencies.values() for sample in samples]
+    print(f"  {'all':18s} {len(everything):5d}         mean {sum(everything) / len(everything) * 1000:7.1f}ms")
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Natural-language report queries by path: intent matcher, translation cache, translator")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=1500.0, help="simulated translator round trip in ms")
+    parser.add_argument("--sale-lines", type=int, default=200000)
+    parser.add_argument("--intent-share", type=float, default=0.7, help="fraction of questions in a recognized shape")
+    asyncio.run(main(parser.parse_args()))
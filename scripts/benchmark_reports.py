@@ -0,0 +1,161 @@
+import sys
+import time
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from benchmark_common import QueryCounter, create_benchmark_session, parse_sizes
+
+from app.models.inventory import Product, InventoryItem
+from app.models.transaction import Transaction, TransactionItem
+from app.services.report import ReportGenerator
+
+LOCATIONS_PER_PRODUCT = 4
+LINES_PER_SALE = 5
+SALES_PRODUCT_COUNT = 1000
+INSERT_BATCH_SIZE = 50000
+
+def seed_products(db, product_count: int) -> None:
+    now = datetime.utcnow()
+    db.execute(insert(Product), [
+        {
+            "sku": f"BENCH{i:08d}",
+            "name": f"Benchmark Product {i}",
+            "description": "",
+            "category": f"Category {i % 50}",
+            "unit_price": 10.0,
+            "cost_price": 5.0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(product_count)
+    ])
+
+def insert_batched(db, model, rows) -> None:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == INSERT_BATCH_SIZE:
+            db.execute(insert(model), batch)
+            batch = []
+    if batch:
+        db.execute(insert(model), batch)
+
+def seed_inventory(db, inventory_rows: int) -> None:
+    product_count = max(1, inventory_rows // LOCATIONS_PER_PRODUCT)
+    now = datetime.utcnow()
+    seed_products(db, product_count)
+    insert_batched(db, InventoryItem, (
+        {
+            "product_id": i % product_count + 1,
+            "quantity": random.randint(0, 40),
+            "location": f"Location {i // product_count}",
+            "last_count_date": now,
+            "status": "available",
+        }
+        for i in range(inventory_rows)
+    ))
+    db.commit()
+
+def seed_sales(db, line_items: int) -> None:
+    seed_products(db, SALES_PRODUCT_COUNT)
+    sale_count = max(1, line_items // LINES_PER_SALE)
+    now = datetime.utcnow()
+    insert_batched(db, Transaction, (
+        {
+            "transaction_date": now - timedelta(minutes=random.randint(0, 60 * 24 * 28)),
+            "transaction_type": "sale",
+            "reference_number": f"BENCH-SALE-{i}",
+            "total_amount": 0,
+            "status": "completed",
+        }
+        for i in range(sale_count)
+    ))
+    insert_batched(db, TransactionItem, (
+        {
+            "transaction_id": i // LINES_PER_SALE + 1,
+            "product_id": random.randint(1, SALES_PRODUCT_COUNT),
+            "quantity": 2,
+            "unit_price": 10.0,
+            "total_price": 20.0,
+        }
+        for i in range(sale_count * LINES_PER_SALE)
+    ))
+    db.commit()
+
+def legacy_inventory_report(db) -> int:
+    """The previous per-product lazy-load implementation, kept for comparison"""
+    rows = 0
+    for product in db.query(Product).all():
+        sum(item.quantity for item in product.inventory_items)
+        rows += 1
+    return rows
+
+def legacy_sales_report(db, start_date, end_date) -> int:
+    """The previous ORM walk over sale.items and item.product, kept for comparison"""
+    rows = 0
+    sales = db.query(Transaction).filter(
+        Transaction.transaction_type == "sale",
+        Transaction.transaction_date >= start_date,
+        Transaction.transaction_date <= end_date
+    ).all()
+    for sale in sales:
+        for item in sale.items:
+            item.product.name
+            rows += 1
+    return rows
+
+def measure(engine, label: str, fn) -> None:
+    tracemalloc.start()
+    with QueryCounter(engine) as counter:
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<28} queries={counter.count:>7,} time={elapsed:8.3f}s peak_mem={peak / 2**20:8.1f}MiB")
+
+def run_inventory(sizes, include_legacy: bool) -> None:
+    report_service = ReportGenerator()
+    for size in sizes:
+        engine, db = create_benchmark_session()
+        seed_inventory(db, size)
+        db.expunge_all()
+        print(f"inventory report, {size:,} inventory rows")
+        measure(engine, "grouped aggregate", lambda: report_service.generate_inventory_report(db))
+        if include_legacy:
+            db.expunge_all()
+            measure(engine, "legacy N+1 path", lambda: legacy_inventory_report(db))
+        db.close()
+        engine.dispose()
+
+def run_sales(sizes, include_legacy: bool) -> None:
+    report_service = ReportGenerator()
+    end_date = datetime.utcnow()
+    start_date = end_date - timedelta(days=30)
+    for size in sizes:
+        engine, db = create_benchmark_session()
+        seed_sales(db, size)
+        db.expunge_all()
+        print(f"sales report, {size:,} line items")
+        measure(engine, "columnar with details", lambda: report_service.generate_sales_report(db, start_date, end_date))
+        measure(engine, "columnar summary only", lambda: report_service.generate_sales_report(db, start_date, end_date, include_details=False))
+        if include_legacy:
+            db.expunge_all()
+            measure(engine, "legacy ORM walk", lambda: legacy_sales_report(db, start_date, end_date))
+        db.close()
+        engine.dispose()
+
+if __name__ == "__main__":
+    # Usage: benchmark_reports.py [inventory|sales] [--legacy] [sizes...]
+    # --legacy also times the old ORM implementation (slow beyond ~10k rows)
+    include_legacy = "--legacy" in sys.argv
+    args = [arg for arg in sys.argv if arg != "--legacy"]
+    report = args.pop(1) if len(args) > 1 and not args[1].isdigit() else "inventory"
+    sizes = parse_sizes(args, [10000, 100000, 1000000])
+    if report == "sales":
+        run_sales(sizes, include_legacy)
+    else:
+        run_inventory(sizes, include_legacy)
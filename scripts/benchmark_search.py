@@ -0,0 +1,75 @@
+import random
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from benchmark_common import create_benchmark_session, parse_sizes, percentile
+
+from app.models.inventory import Product
+from app.repositories.inventory import ProductRepository
+
+# A catalog vocabulary of a few thousand words, as real product names have; a handful are very common
+_vocabulary_rng = random.Random(1)
+WORDS = ["".join(_vocabulary_rng.choice("abcdefghiklmnoprstuvwy") for _ in range(_vocabulary_rng.randrange(4, 10)))
+         for _ in range(5000)]
+COMMON_WORDS = ["black", "white", "large", "small", "pack"]
+SEARCHES = 200
+INSERT_BATCH_SIZE = 10000
+
+repository = ProductRepository(Product)
+
+def seed_catalog(db, count: int) -> None:
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    for start in range(0, count, INSERT_BATCH_SIZE):
+        db.execute(insert(Product), [
+            {
+                "sku": f"{rng.randrange(100, 999)}-{i:08d}",
+                "name": " ".join([rng.choice(COMMON_WORDS)] + [rng.choice(WORDS) for _ in range(3)]).title(),
+                "description": " ".join(rng.choice(WORDS) for _ in range(8)),
+                "category": f"Category {i % 50}",
+                "unit_price": 10.0,
+                "cost_price": 5.0,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for i in range(start, min(start + INSERT_BATCH_SIZE, count))
+        ])
+    db.commit()
+
+def measure(db, label: str, queries, categories=None) -> None:
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        repository.search(db, query, categories, limit=20)
+        latencies.append(time.perf_counter() - started)
+    print(f"  {label:28s} p50 {percentile(latencies, 50) * 1000:7.2f}ms  p95 {percentile(latencies, 95) * 1000:7.2f}ms")
+
+def naive_search(db, query: str):
+    """What clients did before: page through the whole catalog and filter in memory"""
+    return [product for product in db.query(Product).yield_per(1000) if query.lower() in product.name.lower()][:20]
+
+if __name__ == "__main__":
+    # Usage: benchmark_search.py [sizes...]; BENCHMARK_DATABASE_URL selects the database (FTS5 on SQLite, pg_trgm on PostgreSQL)
+    rng = random.Random(7)
+    for count in parse_sizes(sys.argv, [100000, 1000000]):
+        engine, db = create_benchmark_session()
+        started = time.perf_counter()
+        seed_catalog(db, count)
+        print(f"{count} products seeded and indexed in {time.perf_counter() - started:.1f}s")
+        
+        measure(db, "word fragment", [rng.choice(WORDS)[:5] for _ in range(SEARCHES)])
+        measure(db, "two words", [f"{rng.choice(WORDS)} {rng.choice(WORDS)[:4]}" for _ in range(SEARCHES)])
+        # Every match is ranked, so a term in a fifth of the catalog costs in proportion
+        measure(db, "very common word", [rng.choice(COMMON_WORDS) for _ in range(20)])
+        measure(db, "sku prefix (2 chars)", [str(rng.randrange(10, 99)) for _ in range(SEARCHES)])
+        measure(db, "exact sku", [f"{rng.randrange(100, 999)}-{rng.randrange(count):08d}" for _ in range(SEARCHES)])
+        measure(db, "fragment + category", [rng.choice(WORDS) for _ in range(SEARCHES)], ["Category 7"])
+        
+        started = time.perf_counter()
+        naive_search(db, WORDS[0])
+        print(f"  {'full catalog scan (before)':28s} {(time.perf_counter() - started) * 1000:7.0f}ms")
+        db.close()
+        engine.dispose()
@@ -0,0 +1,174 @@
+import sys
+import time
+import uuid
+import threading
+from datetime import datetime
+
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from benchmark_common import QueryCounter, create_benchmark_session, percentile
+
+from app.models.inventory import Product, InventoryItem
+from app.models.transaction import Transaction, TransactionItem
+from app.schemas.transaction import TransactionCreate, TransactionItemCreate
+from app.services.transaction import TransactionService
+
+ORDER_LINES = 50
+
+def seed_catalog(db, product_count: int) -> None:
+    now = datetime.utcnow()
+    db.execute(insert(Product), [
+        {
+            "sku": f"BENCH{i:08d}",
+            "name": f"Benchmark Product {i}",
+            "category": "Benchmark",
+            "unit_price": 10.0,
+            "cost_price": 5.0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(product_count)
+    ])
+    db.execute(insert(InventoryItem), [
+        {
+            "product_id": i + 1,
+            "quantity": 10 ** 9,
+            "location": "Main Warehouse",
+            "last_count_date": now,
+            "status": "available",
+        }
+        for i in range(product_count)
+    ])
+    db.commit()
+
+def make_order(lines: int = ORDER_LINES) -> TransactionCreate:
+    return TransactionCreate(
+        transaction_type="sale",
+        reference_number=f"BENCH-{uuid.uuid4().hex}",
+        total_amount=10.0 * lines,
+        status="completed",
+        items=[TransactionItemCreate(product_id=i + 1, quantity=1, unit_price=10.0) for i in range(lines)]
+    )
+
+def legacy_create_transaction(db, transaction: TransactionCreate) -> None:
+    """The previous commit-per-step creation path, kept for comparison"""
+    db_transaction = Transaction(
+        transaction_type=transaction.transaction_type,
+        reference_number=transaction.reference_number,
+        total_amount=transaction.total_amount,
+        status=transaction.status,
+    )
+    db.add(db_transaction)
+    db.commit()
+    db.refresh(db_transaction)
+    for item in transaction.items:
+        db.add(TransactionItem(
+            transaction_id=db_transaction.id,
+            product_id=item.product_id,
+            quantity=item.quantity,
+            unit_price=item.unit_price,
+            total_price=item.quantity * item.unit_price
+        ))
+    db.commit()
+    db.refresh(db_transaction)
+    for item in db_transaction.items:
+        remaining_quantity = item.quantity
+        for inv_item in db.query(InventoryItem).filter(InventoryItem.product_id == item.product_id).all():
+            if inv_item.quantity >= remaining_quantity:
+                inv_item.quantity -= remaining_quantity
+                break
+            remaining_quantity -= inv_item.quantity
+            inv_item.quantity = 0
+        db.commit()
+
+def measure(engine, db, label: str, create, iterations: int) -> None:
+    latencies = []
+    with QueryCounter(engine) as counter:
+        for _ in range(iterations):
+            order = make_order()
+            start = time.perf_counter()
+            create(db, order)
+            latencies.append((time.perf_counter() - start) * 1000)
+            db.expunge_all()
+    print(f"  {label:<22} round_trips/order={counter.count / iterations:6.1f} "
+          f"p50={percentile(latencies, 50):7.2f}ms p99={percentile(latencies, 99):7.2f}ms")
+
+def run_bulk(total: int, batch_size: int = 1000, lines: int = 3) -> None:
+    engine, db = create_benchmark_session()
+    seed_catalog(db, ORDER_LINES)
+    service = TransactionService()
+    print(f"bulk ingestion of {total:,} {lines}-line sales in batches of {batch_size:,}")
+    
+    with QueryCounter(engine) as counter:
+        start = time.perf_counter()
+        for offset in range(0, total, batch_size):
+            batch = [
+                TransactionCreate(
+                    transaction_type="sale",
+                    reference_number=f"BULK-{offset + i}",
+                    total_amount=10.0 * lines,
+                    status="completed",
+                    items=[
+                        TransactionItemCreate(product_id=(offset + i + j) % ORDER_LINES + 1, quantity=1, unit_price=10.0)
+                        for j in range(lines)
+                    ]
+                )
+                for i in range(min(batch_size, total - offset))
+            ]
+            service.create_transactions_bulk(db, batch)
+            db.expunge_all()
+        elapsed = time.perf_counter() - start
+    print(f"  {total / elapsed:,.0f} transactions/sec, {counter.count / max(1, total // batch_size):.1f} statements/batch")
+    db.close()
+    engine.dispose()
+
+def run_concurrent(threads: int, sales_per_thread: int) -> None:
+    """Many threads selling the same SKU; verifies no stock is lost and reports throughput"""
+    engine, db = create_benchmark_session()
+    seed_catalog(db, 1)
+    initial = db.query(InventoryItem).one().quantity
+    db.close()
+    
+    service = TransactionService()
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    def sell():
+        session = session_factory()
+        for _ in range(sales_per_thread):
+            service.create_transaction(session, make_order(lines=1))
+        session.close()
+    
+    workers = [threading.Thread(target=sell) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    
+    db = session_factory()
+    remaining = db.query(InventoryItem).one().quantity
+    db.close()
+    sold = threads * sales_per_thread
+    print(f"{threads} threads x {sales_per_thread} sales of one SKU: {sold / elapsed:,.0f} sales/sec, "
+          f"lost updates={initial - sold - remaining}")
+    engine.dispose()
+
+def run(iterations: int) -> None:
+    engine, db = create_benchmark_session()
+    seed_catalog(db, ORDER_LINES)
+    print(f"{ORDER_LINES}-line sale order, {iterations} iterations")
+    measure(engine, db, "single unit of work", TransactionService().create_transaction, iterations)
+    measure(engine, db, "legacy commit-per-step", legacy_create_transaction, iterations)
+    db.close()
+    engine.dispose()
+
+if __name__ == "__main__":
+    # Usage: benchmark_transactions.py [iterations] | bulk [total] | concurrent [threads] [sales_per_thread]
+    if len(sys.argv) > 1 and sys.argv[1] == "bulk":
+        run_bulk(int(sys.argv[2]) if len(sys.argv) > 2 else 50000)
+    elif len(sys.argv) > 1 and sys.argv[1] == "concurrent":
+        run_concurrent(int(sys.argv[2]) if len(sys.argv) > 2 else 16, int(sys.argv[3]) if len(sys.argv) > 3 else 100)
+    else:
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -5,7 +5,7 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app.database import Base, engine
-from app.models import inventory, transaction, user
+from app.models import inventory, transaction, user, report
 
 def init_db():
     print("Creating database tables...")
@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+import httpx
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import event, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+
+from benchmark_common import BENCHMARK_DATABASE_URL, create_benchmark_session, percentile
+
+from app.api.dependencies import get_current_active_user
+from app.database import create_async_db_engine, create_db_engine, get_async_db, get_db, to_async_url
+from app.main import app
+from app.models.inventory import Product
+from app.models.user import User
+from app.services.authentication import AuthService
+from app.utils.security import pwd_context
+from app.services.inventory import InventoryService
+
+# The pre-AsyncSession handler: an async route running a blocking query on the event loop
+legacy_router = APIRouter()
+inventory_service = InventoryService()
+auth_service = AuthService()
+
+@legacy_router.get("/legacy/products/")
+async def legacy_read_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    return [{"id": product.id, "sku": product.sku} for product in inventory_service.get_products(db, skip=skip, limit=limit)]
+
+# The pre-executor login: bcrypt verified inline on the event loop
+@legacy_router.post("/legacy/token")
+async def legacy_login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = db.query(User).filter(User.username == form_data.username).first()
+    if not user or not pwd_context.verify(form_data.password, user.hashed_password):
+        raise HTTPException(status_code=401)
+    return {"access_token": "legacy", "token_type": "bearer"}
+
+LOGIN_PASSWORD = "LoadTest123!"
+
+def seed_products(count: int) -> None:
+    engine, db = create_benchmark_session()
+    now = datetime.utcnow()
+    db.execute(insert(Product), [
+        {"sku": f"LOAD{i:06d}", "name": f"Load Product {i}", "unit_price": 1.0, "cost_price": 0.5,
+         "created_at": now, "updated_at": now}
+        for i in range(count)
+    ])
+    db.add(User(username="loaduser", email="load@example.com", full_name="Load User",
+                hashed_password=pwd_context.hash(LOGIN_PASSWORD), is_active=True))
+    db.commit()
+    db.close()
+    engine.dispose()
+
+def add_latency(engine, seconds: float) -> None:
+    """Sleep on every SQLite statement to stand in for the network round trip to a real server"""
+    if not seconds or engine.dialect.name != "sqlite":
+        return
+
+    def trace(statement):
+        time.sleep(seconds)
+
+    @event.listens_for(engine, "connect")
+    def install_trace(dbapi_connection, connection_record):
+        # The callback runs on the thread executing the statement: the caller for pysqlite,
+        # aiosqlite's own worker thread for the async driver
+        if hasattr(dbapi_connection, "await_"):
+            dbapi_connection.await_(dbapi_connection._connection.set_trace_callback(trace))
+        else:
+            dbapi_connection.set_trace_callback(trace)
+
+async def run(client: httpx.AsyncClient, path: str, requests: int, concurrency: int):
+    latencies = []
+    queue = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait(path)
+
+    async def worker():
+        while not queue.empty():
+            url = queue.get_nowait()
+            started = time.perf_counter()
+            response = await client.get(url)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return requests / elapsed, latencies
+
+async def login_burst(client: httpx.AsyncClient, args) -> None:
+    """Fire a burst of logins and measure /inventory/products/ latency while it runs"""
+    print(f"\n{args.login_burst} concurrent logins alongside {args.requests} product reads")
+    form = {"username": "loaduser", "password": LOGIN_PASSWORD}
+    for label, login_path in (("before (bcrypt on loop)", "/legacy/token"), ("after (password pool)", "/token")):
+        async def login():
+            response = await client.post(login_path, data=form)
+            return response.status_code
+
+        started = time.perf_counter()
+        logins = asyncio.gather(*(login() for _ in range(args.login_burst)))
+        await asyncio.sleep(0)  # let the burst start before the reads
+        throughput, latencies = await run(client, "/inventory/products/?limit=20", args.requests, args.concurrency)
+        statuses = await logins
+        print(f"{label:32s} products p95 {percentile(latencies, 95) * 1000:8.1f}ms  max {max(latencies) * 1000:8.1f}ms  "
+              f"logins {statuses.count(200)} ok / {statuses.count(503)} shed in {time.perf_counter() - started:.1f}s")
+
+async def main(args) -> None:
+    seed_products(args.products)
+
+    # Sized so the legacy handlers, which hold their connection until teardown, cannot exhaust the pool
+    sync_engine = create_db_engine(BENCHMARK_DATABASE_URL, name="load-sync", pool_size=args.concurrency + args.login_burst)
+    async_engine = create_async_db_engine(to_async_url(BENCHMARK_DATABASE_URL), name="load-async", pool_size=args.concurrency)
+    add_latency(sync_engine, args.latency / 1000.0)
+    add_latency(async_engine.sync_engine, args.latency / 1000.0)
+    SyncSession = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
+    AsyncSession = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    def override_get_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def override_get_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    app.include_router(legacy_router)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    # Authentication is the same for both paths; leave it out of the measurement
+    app.dependency_overrides[get_current_active_user] = lambda: None
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.latency}ms per statement, one worker")
+    async with httpx.AsyncClient(app=app, base_url="http://loadtest") as client:
+        for label, path in (("before (sync Session on loop)", "/legacy/products/?limit=20"),
+                            ("after (AsyncSession)", "/inventory/products/?limit=20")):
+            await run(client, path, args.concurrency, args.concurrency)  # warm the pools
+            throughput, latencies = await run(client, path, args.requests, args.concurrency)
+            print(f"{label:32s} {throughput:8.1f} req/s  "
+                  f"p50 {percentile(latencies, 50) * 1000:7.1f}ms  p95 {percentile(latencies, 95) * 1000:7.1f}ms")
+
+        if args.login_burst:
+            await login_burst(client, args)
+
+    app.dependency_overrides = {}
+    await async_engine.dispose()
+    sync_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent read throughput of one worker, blocking vs async session")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=5.0, help="simulated round trip per statement in ms (SQLite only)")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--login-burst", type=int, default=0, help="also measure reads during N concurrent logins, e.g. 500")
+    asyncio.run(main(parser.parse_args()))
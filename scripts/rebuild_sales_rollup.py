@@ -0,0 +1,35 @@
+import sys
+import os
+import argparse
+from datetime import date
+
+# Add the parent directory to the path so we can import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import SessionLocal
+from app.repositories.report import SalesRollupRepository
+
+def rebuild_sales_rollup(first_day=None, last_day=None):
+    scope = f"{first_day or 'beginning'} to {last_day or 'today'}"
+    print(f"Rebuilding daily sales rollup from {scope}...")
+    
+    # Create database session
+    db = SessionLocal()
+    
+    try:
+        rows = SalesRollupRepository().rebuild(db, first_day, last_day)
+        print(f"Daily sales rollup rebuilt: {rows} rows written.")
+    
+    except Exception as e:
+        db.rollback()
+        print(f"Error rebuilding rollup: {str(e)}")
+    
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill or rebuild the daily_product_sales rollup")
+    parser.add_argument("--start", type=date.fromisoformat, help="first day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args()
+    rebuild_sales_rollup(args.start, args.end)
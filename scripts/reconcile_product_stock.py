@@ -0,0 +1,40 @@
+import sys
+import os
+import argparse
+
+# Add the parent directory to the path so we can import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import SessionLocal
+from app.repositories.inventory import ProductStockRepository
+
+def reconcile_product_stock(repair=False):
+    print("Comparing product_stock with inventory_items...")
+    
+    # Create database session
+    db = SessionLocal()
+    
+    try:
+        drift = ProductStockRepository().reconcile(db, repair=repair)
+        for entry in drift:
+            print(f"Product {entry['product_id']}: recorded {entry['recorded']}, expected {entry['expected']}")
+        
+        if not drift:
+            print("product_stock is consistent.")
+        elif repair:
+            print(f"Repaired {len(drift)} products.")
+        else:
+            print(f"{len(drift)} products drifted; rerun with --repair to fix them.")
+    
+    except Exception as e:
+        db.rollback()
+        print(f"Error reconciling product stock: {str(e)}")
+    
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check (and optionally repair) the product_stock totals")
+    parser.add_argument("--repair", action="store_true", help="overwrite drifted rows with the recomputed totals")
+    args = parser.parse_args()
+    reconcile_product_stock(args.repair)
@@ -0,0 +1,34 @@
+import sys
+import os
+import argparse
+import signal
+import threading
+
+# Add the parent directory to the path so we can import app
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import services  # noqa: F401 - registers every job handler
+from app.database import SessionLocal
+from app.services.jobs import JOB_WORKERS, JobWorker
+
+def run_job_worker(workers: int, once: bool) -> None:
+    """A dedicated worker process; run several, and set JOB_WORKERS=0 on the API processes, to keep heavy jobs off them"""
+    worker = JobWorker(SessionLocal, workers=workers)
+    if once:
+        worker.run_pending()
+        return
+    
+    stopped = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopped.set())
+    print(f"Job worker {worker.name} running {workers} threads")
+    worker.start()
+    stopped.wait()
+    worker.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run queued report and import jobs")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS or 2, help="concurrent jobs in this process")
+    parser.add_argument("--once", action="store_true", help="drain the queue and exit")
+    args = parser.parse_args()
+    run_job_worker(args.workers, args.once)
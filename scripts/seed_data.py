@@ -10,6 +10,8 @@ from app.database import SessionLocal
 from app.models.user import User, Role
 from app.models.inventory import Product, InventoryItem
 from app.models.transaction import Transaction, TransactionItem, Customer, Vendor
+from app.repositories.inventory import ProductStockRepository
+from app.repositories.report import SalesRollupRepository
 from app.services.authentication import AuthService
 
 def seed_data():
@@ -153,6 +155,9 @@ def seed_data():
         
         db.commit()
         
+        # Products and inventory above bypass the repositories, so derive their product_stock rows
+        ProductStockRepository().reconcile(db, repair=True)
+        
         # Seed customers
         customers = [
             {
@@ -298,6 +303,9 @@ def seed_data():
         
         db.commit()
         
+        # The sales above bypass the services, so bring them into the daily rollup reports read
+        SalesRollupRepository().rebuild(db)
+        
         print("Database seeded successfully!")
     
     except Exception as e:
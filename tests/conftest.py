@@ -1,11 +1,22 @@
+import os
 import pytest
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from fastapi.testclient import TestClient
 
-from app.database import Base
+# Tests drain the job queue explicitly with JobWorker.run_pending instead of background threads
+os.environ.setdefault("JOB_WORKERS", "0")
+# and answer report questions with the offline translator
+os.environ.setdefault("QUERY_TRANSLATOR", "local")
+
+from app.database import Base, get_async_db
 from app.main import app
 from app.api.dependencies import get_db
+from app.services.authentication import principal_cache
+from app.services.inventory import catalog_cache
+from app.services.report_cache import report_cache
 
 # Create a test database
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -21,6 +32,8 @@ def db():
     connection = engine.connect()
     transaction = connection.begin()
     session = TestingSessionLocal(bind=connection)
+    # Rolled-back ids are reused by the next test; cached products must not outlive them
+    catalog_cache.clear()
     
     yield session
     
@@ -39,9 +52,82 @@ def client(db):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    # Cached reports would outlive the rolled-back data they were computed from
+    report_cache.clear()
     
     with TestClient(app) as test_client:
         yield test_client
     
     # Reset the override
-    app.dependency_overrides = {}
\ No newline at end of file
+    app.dependency_overrides = {}
+
+@pytest.fixture
+def file_app(tmp_path):
+    """The app wired to a committed SQLite file, for routes that use the async session"""
+    
+    # The async session needs committed rows in a real file, not the rolled-back test connection
+    sync_engine = create_engine(f"sqlite:///{tmp_path}/async.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=sync_engine)
+    SessionLocal = sessionmaker(bind=sync_engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/async.db")
+    AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+    
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    async def override_get_async_db():
+        async with AsyncSessionLocal() as db:
+            yield db
+    
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    principal_cache.clear()
+    report_cache.clear()
+    catalog_cache.clear()
+    with TestClient(app) as client:
+        yield client, SessionLocal, async_engine
+    app.dependency_overrides = {}
+    principal_cache.clear()
+    sync_engine.dispose()
+
+@pytest.fixture
+def auth_headers(file_app):
+    """`auth_headers("name")` creates a user in the file_app database and returns bearer headers for it"""
+    from app.schemas.user import UserCreate
+    from app.services.authentication import AuthService
+    
+    _, SessionLocal, _ = file_app
+    service = AuthService()
+    
+    def create(username: str = "tester"):
+        setup = SessionLocal()
+        try:
+            user = service.create_user(setup, UserCreate(
+                username=username, email=f"{username}@example.com", full_name=username.title(), password="Password123!"
+            ))
+            return {"Authorization": f"Bearer {service.create_user_token(user)}"}
+        finally:
+            setup.close()
+    return create
+
+@pytest.fixture
+def count_queries():
+    """`with count_queries(engine) as statements:` records every SQL statement the engine runs in the block.
+    Pass `async_engine.sync_engine` for AsyncSession routes."""
+    @contextmanager
+    def counter(engine):
+        statements = []
+        
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+        
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+    return counter
@@ -56,4 +56,203 @@ def test_authenticate_user(db):
     
     # Test authentication with non-existent user
     authenticated_user = service.authenticate_user(db, "nonexistentuser", "Password123!")
-    assert authenticated_user is None
\ No newline at end of file
+    assert authenticated_user is None
+
+def _login_headers(service, username):
+    return {"Authorization": f"Bearer {service.create_access_token(data={'sub': username})}"}
+
+def test_async_read_path(file_app, auth_headers):
+    from app.models.inventory import Product
+    
+    client, SessionLocal, _ = file_app
+    headers = auth_headers("asyncuser")
+    setup = SessionLocal()
+    setup.add(Product(sku="ASYNC001", name="Async Product", unit_price=1.0, cost_price=0.5))
+    setup.commit()
+    setup.close()
+    
+    me = client.get("/users/me/", headers=headers)
+    products = client.get("/inventory/products/", headers=headers)
+    missing = client.get("/inventory/products/", headers={"Authorization": "Bearer invalid"})
+    
+    assert me.status_code == 200
+    assert me.json()["username"] == "asyncuser"
+    assert [product["sku"] for product in products.json()] == ["ASYNC001"]
+    assert missing.status_code == 401
+
+def test_principal_cache_and_invalidation(file_app):
+    from sqlalchemy import event
+    from app.schemas.user import UserUpdate
+    
+    client, SessionLocal, async_engine = file_app
+    setup = SessionLocal()
+    service = AuthService()
+    db_user = service.create_user(setup, UserCreate(
+        username="cacheuser", email="cache@example.com", full_name="Cache User", password="Password123!"
+    ))
+    
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(async_engine.sync_engine, "before_cursor_execute", listener)
+    headers = _login_headers(service, "cacheuser")
+    
+    # First request loads the principal; later ones reuse it without touching the users table
+    assert client.get("/inventory/products/", headers=headers).status_code == 200
+    loaded = len(statements)
+    assert client.get("/inventory/products/", headers=headers).status_code == 200
+    assert not any("FROM users" in statement for statement in statements[loaded:])
+    
+    # Deactivating the user takes effect immediately, not after the TTL
+    service.update_user(setup, db_user.id, UserUpdate(is_active=False))
+    assert client.get("/inventory/products/", headers=headers).status_code == 401
+    event.remove(async_engine.sync_engine, "before_cursor_execute", listener)
+    setup.close()
+
+def test_claims_token_authorizes_without_database(file_app, count_queries, monkeypatch):
+    from app.schemas.user import UserUpdate
+    from app.services import authentication
+    
+    # Opt-in, with revocations shared through Redis in production
+    monkeypatch.setattr(authentication, "TRUST_TOKEN_CLAIMS", True)
+    client, SessionLocal, async_engine = file_app
+    setup = SessionLocal()
+    service = AuthService()
+    db_user = service.create_user(setup, UserCreate(
+        username="claimsuser", email="claims@example.com", full_name="Claims User", password="Password123!",
+        roles=["admin"]
+    ))
+    token = service.create_user_token(db_user)
+    headers = {"Authorization": f"Bearer {token}"}
+    
+    with count_queries(async_engine.sync_engine) as statements:
+        assert client.get("/inventory/stock/low", headers=headers).status_code == 200
+    assert not any("FROM users" in statement for statement in statements)
+    
+    # The profile and its roles: one query each, roles batched rather than lazily loaded
+    with count_queries(async_engine.sync_engine) as statements:
+        me = client.get("/users/me/", headers=headers)
+    assert [role["name"] for role in me.json()["roles"]] == ["admin"]
+    assert len(statements) == 2
+    
+    # Removing the admin role bumps the token version, which revokes the old token everywhere
+    db_user = service.update_user(setup, db_user.id, UserUpdate(roles=["user"]))
+    assert client.get("/inventory/stock/low", headers=headers).status_code == 401
+    
+    fresh = {"Authorization": f"Bearer {service.create_user_token(db_user)}"}
+    assert client.get("/inventory/stock/low", headers=fresh).status_code == 200
+    assert client.post("/users/", headers=fresh, json={}).status_code == 403
+    
+    # Logging out revokes just that token
+    assert client.post("/token/revoke", headers=fresh).status_code == 204
+    assert client.get("/inventory/stock/low", headers=fresh).status_code == 401
+    setup.close()
+
+def test_token_version_checked_without_shared_revocations(file_app):
+    from app.schemas.user import UserUpdate
+    from app.services.authentication import principal_cache, token_revocations
+    
+    client, SessionLocal, _ = file_app
+    setup = SessionLocal()
+    service = AuthService()
+    db_user = service.create_user(setup, UserCreate(
+        username="versionuser", email="version@example.com", full_name="Version User", password="Password123!",
+        roles=["admin"]
+    ))
+    token = service.create_user_token(db_user)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post("/users/", headers=headers, json={}).status_code == 422
+    
+    # Another worker, or this one after a restart, never saw the in-memory revocation
+    db_user = service.update_user(setup, db_user.id, UserUpdate(roles=["user"]))
+    token_revocations.clear()
+    principal_cache.clear()
+    assert client.get("/inventory/stock/low", headers=headers).status_code == 401
+    
+    # A token issued after the change has the new version; its roles come from the user, not the claims
+    headers = {"Authorization": f"Bearer {service.create_user_token(db_user)}"}
+    assert client.get("/inventory/stock/low", headers=headers).status_code == 200
+    setup.close()
+
+def test_full_executor_rejects_with_503():
+    import threading
+    from app.main import app
+    from app.utils.executors import BoundedExecutor, ExecutorSaturated
+    
+    executor = BoundedExecutor("test", "thread", max_workers=1, max_queue=1)
+    release = threading.Event()
+    running = [executor.submit(release.wait), executor.submit(release.wait)]
+    with pytest.raises(ExecutorSaturated):
+        executor.submit(release.wait)
+    release.set()
+    for future in running:
+        future.result()
+    executor.submit(lambda: None).result()  # capacity is returned once tasks finish
+    executor.shutdown()
+    
+    @app.get("/_saturated")
+    async def saturated():
+        raise ExecutorSaturated("The test executor is at capacity")
+    try:
+        with TestClient(app) as client:
+            response = client.get("/_saturated")
+    finally:
+        app.router.routes.pop()
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def test_ttl_cache_expiry_and_lru():
+    from app.utils.cache import TTLCache
+    
+    now = [0.0]
+    cache = TTLCache("test", maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    now[0] = 11
+    assert cache.get("a") is None
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 2, "evictions": 1}
+
+def test_redis_cache_without_redis_package_fails_fast(monkeypatch):
+    import sys
+    from app.utils.cache import create_cache
+    
+    monkeypatch.setitem(sys.modules, "redis", None)
+    with pytest.raises(RuntimeError, match="redis package is not installed"):
+        create_cache("test", "redis://localhost:6379/0")
+
+def test_login_throttle_and_background_rehash(file_app, monkeypatch):
+    from app.services import authentication
+    from app.utils.security import configure_password_hashing
+    
+    client, SessionLocal, _ = file_app
+    setup = SessionLocal()
+    service = AuthService()
+    try:
+        # Store a cheap hash, then raise the cost so the next login has to upgrade it
+        configure_password_hashing(bcrypt_rounds=4)
+        db_user = service.create_user(setup, UserCreate(
+            username="rehashuser", email="rehash@example.com", full_name="Rehash User", password="Password123!"
+        ))
+        assert db_user.hashed_password.startswith("$2b$04$")
+        configure_password_hashing(bcrypt_rounds=5)
+        
+        response = client.post("/token", data={"username": "rehashuser", "password": "Password123!"})
+        assert response.status_code == 200
+        setup.expire_all()
+        assert setup.get(type(db_user), db_user.id).hashed_password.startswith("$2b$05$")
+        
+        # After five attempts the username is refused without computing a hash
+        verified = []
+        real_verify = authentication.verify_password
+        monkeypatch.setattr(authentication, "verify_password", lambda *args: verified.append(args) or real_verify(*args))
+        statuses = [
+            client.post("/token", data={"username": "rehashuser", "password": "wrong"}).status_code
+            for _ in range(6)
+        ]
+        assert statuses == [401] * 5 + [429]
+        assert len(verified) == 5
+    finally:
+        configure_password_hashing()
+        setup.close()
@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy import exc, text
+
+from app.database import create_db_engine
+from app.metrics import registry
+
+def test_instrumented_pool_publishes_metrics(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/pool.db", name="pooltest", pool_size=1, max_overflow=0, pool_timeout=0.1)
+    labels = {"pool": "pooltest"}
+    
+    connection = engine.connect()
+    connection.execute(text("SELECT 1"))
+    assert registry.get("db_pool_checked_out").value(labels) == 1
+    assert registry.get("db_pool_checkout_seconds").count(labels) == 1
+    
+    # The only connection is out, so a second checkout times out and is counted
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    assert registry.get("db_pool_timeouts_total").value(labels) == 1
+    
+    connection.close()
+    assert registry.get("db_pool_checked_out").value(labels) == 0
+    engine.dispose()
+
+def test_metrics_endpoint(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "# TYPE db_pool_wait_seconds histogram" in response.text
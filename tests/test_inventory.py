@@ -54,6 +54,33 @@ def test_get_product(db):
     assert retrieved_product.id == db_product.id
     assert retrieved_product.sku == "TEST002"
 
+def test_catalog_cache_serves_hot_products(db, count_queries):
+    from app.metrics import registry
+    from app.schemas.inventory import ProductUpdate
+    from app.utils.csv import CSVUtil
+    
+    service = InventoryService()
+    product = service.create_product(db, ProductCreate(sku="HOT001", name="Hot Product", unit_price=5.0, cost_price=2.0))
+    assert service.get_product(db, product.id).name == "Hot Product"
+    
+    # Repeated lookups by id, SKU and existence are answered without the database
+    with count_queries(db.get_bind()) as statements:
+        assert service.get_product(db, product.id).sku == "HOT001"
+        assert service.get_product_by_sku(db, "HOT001").id == product.id
+        assert service.get_existing_product_ids(db, [product.id]) == {product.id}
+    assert statements == []
+    assert registry.get("catalog_cache_entries").value() == 2
+    assert registry.get("catalog_cache_hit_ratio").value() > 0
+    
+    # Writes invalidate the catalog, so the next read sees them
+    service.update_product(db, product.id, ProductUpdate(name="Renamed Product"))
+    assert service.get_product_by_sku(db, "HOT001").name == "Renamed Product"
+    CSVUtil().import_products(db, b"sku,name,unit_price,cost_price\nHOT001,Imported Product,5,2\n")
+    assert service.get_product(db, product.id).name == "Imported Product"
+    service.delete_product(db, product.id)
+    assert service.get_product(db, product.id) is None
+    assert service.get_existing_product_ids(db, [product.id]) == set()
+
 def test_add_inventory(db):
     # Create service
     service = InventoryService()
@@ -86,4 +113,293 @@ def test_add_inventory(db):
     assert db_inventory.product_id == db_product.id
     assert db_inventory.quantity == 10
     assert db_inventory.location == "Warehouse A"
-    assert db_inventory.status == "available"
\ No newline at end of file
+    assert db_inventory.status == "available"
+
+def test_product_stock_follows_inventory_changes(db):
+    from app.schemas.transaction import TransactionCreate, TransactionItemCreate
+    from app.services.transaction import TransactionService
+    
+    service = InventoryService()
+    db_product = service.create_product(db, ProductCreate(
+        sku="TEST004", name="Test Product 4", unit_price=10.0, cost_price=5.0
+    ))
+    
+    shelf = service.add_inventory(db, InventoryItemCreate(product_id=db_product.id, quantity=10))
+    service.add_inventory(db, InventoryItemCreate(product_id=db_product.id, quantity=2, status="damaged"))
+    
+    transaction_service = TransactionService()
+    for transaction_type, quantity in (("purchase", 5), ("sale", 4)):
+        transaction_service.create_transaction(db, TransactionCreate(
+            transaction_type=transaction_type,
+            total_amount=10.0 * quantity,
+            items=[TransactionItemCreate(product_id=db_product.id, quantity=quantity, unit_price=10.0)]
+        ))
+    service.update_inventory(db, shelf.id, 8)
+    
+    stock = service.get_stock(db, db_product.id)
+    db.refresh(stock)
+    assert (stock.on_hand, stock.reserved, stock.damaged) == (8, 0, 2)
+    assert [s.product_id for s in service.get_low_stock_products(db, threshold=9)] == [db_product.id]
+    assert service.reconcile_stock(db) == []
+    
+    # Drift introduced behind the repository's back is reported and repaired
+    stock.on_hand = 100
+    db.commit()
+    drift = service.reconcile_stock(db, repair=True)
+    assert [entry["product_id"] for entry in drift] == [db_product.id]
+    db.refresh(stock)
+    assert stock.on_hand == 8
+
+def test_never_stocked_products_have_zero_stock(db):
+    from app.models.inventory import ProductStock
+    from app.utils.csv import CSVUtil
+    
+    service = InventoryService()
+    created = service.create_product(db, ProductCreate(sku="EMPTY001", name="Never Stocked", unit_price=1.0, cost_price=0.5))
+    CSVUtil().import_products(db, b"sku,name,unit_price,cost_price\nEMPTY002,Imported,1,0.5\nEMPTY001,Renamed,1,0.5\n")
+    imported = service.get_product_by_sku(db, "EMPTY002")
+    
+    # Listed as the most out-of-stock products rather than missing
+    stock = service.get_stock(db, created.id)
+    assert (stock.on_hand, stock.reserved, stock.damaged) == (0, 0, 0)
+    assert [s.product_id for s in service.get_low_stock_products(db, threshold=1)] == [created.id, imported.id]
+    assert db.query(ProductStock).filter(ProductStock.product_id == created.id).count() == 1
+    
+    # Products added behind the repositories' back get their row on repair, without counting as drift
+    legacy = Product(sku="EMPTY003", name="Legacy", unit_price=1.0, cost_price=0.5)
+    db.add(legacy)
+    db.commit()
+    assert service.reconcile_stock(db, repair=True) == []
+    assert service.get_stock(db, legacy.id).on_hand == 0
+    
+    assert service.delete_product(db, created.id)
+    assert service.get_stock(db, created.id) is None
+
+def test_inventory_list_query_counts(file_app, auth_headers, count_queries):
+    from app.models.inventory import ProductStock
+    
+    client, SessionLocal, async_engine = file_app
+    setup = SessionLocal()
+    headers = auth_headers("countuser")
+    for i in range(20):
+        product = Product(sku=f"COUNT{i:03d}", name=f"Count Product {i}", unit_price=1.0, cost_price=0.5)
+        setup.add(product)
+        setup.flush()
+        setup.add(ProductStock(product_id=product.id, on_hand=i, reserved=0, damaged=0))
+    setup.commit()
+    setup.close()
+    
+    # The first request loads the principal into its cache; count only the routes' own queries
+    assert client.get("/users/me/", headers=headers).status_code == 200
+    for path in ("/inventory/products/?limit=20", "/inventory/stock/low?threshold=50&limit=20"):
+        with count_queries(async_engine.sync_engine) as statements:
+            response = client.get(path, headers=headers)
+        assert response.status_code == 200
+        assert len(response.json()) == 20
+        assert len(statements) == 1, (path, statements)
+
+def test_product_search(file_app, auth_headers):
+    
+    client, SessionLocal, _ = file_app
+    setup = SessionLocal()
+    headers = auth_headers("searchuser")
+    setup.add_all([
+        Product(sku="TEE-1001", name="Red Cotton Shirt", category="apparel", unit_price=20.0, cost_price=8.0),
+        Product(sku="MUG-2001", name="Coffee Mug", description="Red ceramic", category="kitchen", unit_price=9.0, cost_price=3.0),
+        Product(sku="TEE-1002", name="Blue Linen Shirt", category="apparel", unit_price=25.0, cost_price=9.0),
+        Product(sku="TEE", name="Sample Tee", category="apparel", unit_price=1.0, cost_price=1.0),
+    ])
+    setup.commit()
+    
+    def search(query):
+        response = client.get(f"/inventory/products/search?{query}", headers=headers)
+        assert response.status_code == 200, response.text
+        return [product["sku"] for product in response.json()]
+    
+    # Fragments of any word, all terms required, ranked by where they match
+    assert search("q=shir") == ["TEE-1001", "TEE-1002"]
+    assert search("q=red") == ["TEE-1001", "MUG-2001"]
+    assert search("q=cotton shirt") == ["TEE-1001"]
+    assert search("q=red&category=kitchen") == ["MUG-2001"]
+    # Exact SKU, then SKU prefixes, then other matches; short fragments match SKU prefixes only
+    assert search("q=TEE") == ["TEE", "TEE-1001", "TEE-1002"]
+    assert search("q=MU") == ["MUG-2001"]
+    assert search("q=TEE&limit=1") == ["TEE"]
+    
+    # The index follows renames and deletes
+    product = setup.query(Product).filter(Product.sku == "TEE-1002").one()
+    product.name = "Blue Linen Blouse"
+    setup.commit()
+    assert search("q=shirt") == ["TEE-1001"]
+    setup.delete(product)
+    setup.commit()
+    assert search("q=blouse") == []
+    setup.close()
+    
+    assert client.get("/inventory/products/search?q=%20", headers=headers).status_code == 400
+    assert client.get("/inventory/products/search", headers=headers).status_code == 422
+
+def test_streaming_exports(file_app, auth_headers, monkeypatch):
+    import csv
+    import io
+    import json
+    from app.utils import csv as csv_module
+    
+    client, SessionLocal, _ = file_app
+    setup = SessionLocal()
+    headers = auth_headers("exportuser")
+    for i in range(25):
+        product = Product(sku=f"EXP{i:03d}", name=f"Export, \"Product\" {i}", unit_price=1.0, cost_price=0.5)
+        setup.add(product)
+        setup.flush()
+        setup.add(InventoryItem(product_id=product.id, quantity=i, location="Main", status="available"))
+    setup.commit()
+    setup.close()
+    
+    # A small batch size makes every export span several chunks
+    monkeypatch.setattr(csv_module, "EXPORT_BATCH_SIZE", 10)
+    export_db = SessionLocal()
+    chunks = list(csv_module.CSVUtil().stream_products(export_db))
+    export_db.close()
+    assert len(chunks) == 4  # header, then 10 + 10 + 5 rows
+    
+    response = client.get("/inventory/export/products", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["sku"] for row in rows] == [f"EXP{i:03d}" for i in range(25)]
+    assert rows[3]["name"] == 'Export, "Product" 3'
+    
+    response = client.get("/inventory/export/inventory?format=ndjson", headers=headers)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 25 and lines[7]["quantity"] == 7 and lines[7]["sku"] == "EXP007"
+    
+    assert client.get("/inventory/export/products?format=xml", headers=headers).status_code == 422
+
+def test_import_products_upserts_in_chunks(db, monkeypatch):
+    from app.utils import csv as csv_module
+    
+    service = InventoryService()
+    service.create_product(db, ProductCreate(sku="IMP001", name="Old Name", category="Old", unit_price=1.0, cost_price=0.5))
+    
+    monkeypatch.setattr(csv_module, "IMPORT_CHUNK_SIZE", 2)
+    content = (
+        "sku,name,category,unit_price,cost_price\n"
+        "IMP001,New Name,New,2.5,1.25\n"
+        "IMP002,Second,,3,1\n"
+        ",No Sku,,1,1\n"
+        "IMP003,Bad Price,,abc,1\n"
+        "IMP004,First Copy,,1,1\n"
+        "IMP004,Second Copy,,4,2\n"
+    ).encode()
+    result = csv_module.CSVUtil().import_products(db, content)
+    
+    assert result["success"] is True
+    assert result["products_added"] == 2
+    assert result["products_updated"] == 1
+    assert result["errors"] == [
+        "Row 4 (): missing sku",
+        "Row 5 (IMP003): invalid unit_price",
+        "Row 6 (IMP004): duplicate sku, superseded by a later row",
+    ]
+    db.expire_all()
+    updated = db.query(Product).filter(Product.sku == "IMP001").one()
+    assert (updated.name, updated.category, updated.unit_price) == ("New Name", "New", 2.5)
+    assert db.query(Product).filter(Product.sku == "IMP002").one().category == "Uncategorized"
+    assert db.query(Product).filter(Product.sku == "IMP004").one().name == "Second Copy"
+    
+    missing = csv_module.CSVUtil().import_products(db, b"sku,name\nX,Y\n")
+    assert missing == {"success": False, "message": "Missing required columns: unit_price, cost_price"}
+
+def test_import_jobs_checkpoint_and_resume(file_app, auth_headers, monkeypatch, tmp_path):
+    from app.models.import_job import ImportJob
+    from app.models.inventory import ProductStock
+    from app.services import imports as imports_module
+    from app.services import jobs as jobs_module
+    from app.services.jobs import JobWorker
+    from app.utils import csv as csv_module
+    
+    client, SessionLocal, _ = file_app
+    worker = JobWorker(SessionLocal)
+    setup = SessionLocal()
+    headers = auth_headers("importuser")
+    setup.close()
+    monkeypatch.setattr(csv_module, "IMPORT_CHUNK_SIZE", 2)
+    monkeypatch.setattr(imports_module, "IMPORT_UPLOAD_DIR", str(tmp_path / "uploads"))
+    
+    # The second chunk dies mid-run, as if the worker were killed
+    original_import_chunk = csv_module.CSVUtil.import_chunk
+    calls = []
+    def flaky_import_chunk(self, db, kind, chunk):
+        calls.append(kind)
+        if len(calls) == 2:
+            raise RuntimeError("worker lost")
+        return original_import_chunk(self, db, kind, chunk)
+    monkeypatch.setattr(csv_module.CSVUtil, "import_chunk", flaky_import_chunk)
+    
+    content = "sku,name,unit_price,cost_price\nJOB1,One,1,1\nJOB2,Two,2,1\nJOB3,Three,x,1\nJOB4,Four,4,1\nJOB5,Five,5,1\n"
+    response = client.post("/imports/products", files={"file": ("catalog.csv", content)}, headers=headers)
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    worker.run_pending()
+    job = client.get(f"/imports/{job_id}", headers=headers).json()
+    assert (job["status"], job["rows_processed"], job["message"]) == ("failed", 2, "worker lost")
+    
+    # Resuming continues after the checkpoint; the committed first chunk is not replayed
+    assert client.post(f"/imports/{job_id}/resume", headers=headers).status_code == 202
+    worker.run_pending()
+    job = client.get(f"/imports/{job_id}", headers=headers).json()
+    assert job["status"] == "completed"
+    assert (job["rows_processed"], job["rows_imported"], job["rows_failed"]) == (5, 4, 1)
+    assert job["errors"] == ["Row 4 (JOB3): invalid unit_price"]
+    assert calls == ["products"] * 4
+    assert client.post(f"/imports/{job_id}/resume", headers=headers).status_code == 409
+    assert not list((tmp_path / "uploads").iterdir())
+    
+    # Other users cannot see or resume the import
+    setup = SessionLocal()
+    other_headers = auth_headers("otherimporter")
+    setup.close()
+    assert client.get(f"/imports/{job_id}", headers=other_headers).status_code == 404
+    assert client.post(f"/imports/{job_id}/resume", headers=other_headers).status_code == 404
+    
+    # An import cannot be resumed while its run is waiting on the queue
+    response = client.post("/imports/products", files={"file": ("again.csv", "sku,name,unit_price,cost_price\nJOB6,Six,6,1\n")},
+                           headers=headers)
+    queued_id = response.json()["id"]
+    resumed = client.post(f"/imports/{queued_id}/resume", headers=headers)
+    assert (resumed.status_code, resumed.json()["detail"]) == (409, "Import job is already queued")
+    worker.run_pending()
+    assert client.get(f"/imports/{queued_id}", headers=headers).json()["status"] == "completed"
+    
+    # Count sheets run through the same engine and keep product_stock in step
+    check = SessionLocal()
+    product = check.query(Product).filter(Product.sku == "JOB1").one()
+    items = [InventoryItem(product_id=product.id, quantity=5, location=f"Bin {i}", status="available") for i in range(2)]
+    check.add_all(items)
+    # The import created the product's zero stock row
+    check.get(ProductStock, product.id).on_hand = 10
+    check.commit()
+    sheet = f"id,counted_quantity\n{items[0].id},7\n{items[1].id},-1\n999,3\n"
+    response = client.post("/imports/inventory_counts", files={"file": ("count.csv", sheet)}, headers=headers)
+    worker.run_pending()
+    job = client.get(f"/imports/{response.json()['id']}", headers=headers).json()
+    assert (job["status"], job["rows_imported"], job["rows_failed"]) == ("completed", 1, 2)
+    assert job["errors"] == [f"Row 3 ({items[1].id}): invalid counted_quantity", "Row 4 (999): unknown inventory item"]
+    check.expire_all()
+    assert check.get(InventoryItem, items[0].id).quantity == 7
+    assert check.get(ProductStock, product.id).on_hand == 12
+    check.close()
+    
+    missing = client.post("/imports/inventory_counts", files={"file": ("bad.csv", "sku\nX\n")}, headers=headers)
+    assert missing.status_code == 400
+    
+    # A full queue refuses the upload without leaving an import behind
+    monkeypatch.setattr(jobs_module, "JOB_MAX_QUEUED", 0)
+    refused = client.post("/imports/products", files={"file": ("full.csv", content)}, headers=headers)
+    assert refused.status_code == 503
+    check = SessionLocal()
+    assert check.query(ImportJob).count() == 3
+    assert not list((tmp_path / "uploads").iterdir())
+    check.close()
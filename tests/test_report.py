@@ -4,7 +4,8 @@ import pandas as pd
 
 from app.models.inventory import Product, InventoryItem
 from app.models.transaction import Transaction, TransactionItem
-from app.schemas.inventory import ProductCreate
+from app.repositories.report import SalesRollupRepository
+from app.schemas.inventory import InventoryItemCreate, ProductCreate
 from app.services.inventory import InventoryService
 from app.services.report import ReportGenerator
 
@@ -29,14 +30,12 @@ def setup_test_data(db):
         products.append(db_product)
         
         # Add inventory
-        inventory_item = InventoryItem(
+        inventory_service.add_inventory(db, InventoryItemCreate(
             product_id=db_product.id,
             quantity=50 * i,
             location="Main Warehouse",
-            last_count_date=datetime.utcnow(),
             status="available"
-        )
-        db.add(inventory_item)
+        ), commit=False)
     
     # Create some sale transactions
     for i in range(1, 4):
@@ -67,6 +66,8 @@ def setup_test_data(db):
         transaction.total_amount = total
     
     db.commit()
+    # Sales added behind the services' back are brought into the daily rollup reports read
+    SalesRollupRepository().rebuild(db)
     return products
 
 def test_generate_inventory_report(db, setup_test_data):
@@ -118,4 +119,387 @@ def test_generate_sales_report(db, setup_test_data):
         assert "reference" in sale_data
         assert "product_name" in sale_data
         assert "quantity" in sale_data
-        assert "total_price" in sale_data
\ No newline at end of file
+        assert "total_price" in sale_data
+
+def test_inventory_report_aggregates_in_one_query(db, setup_test_data):
+    from sqlalchemy import event
+    
+    service = ReportGenerator()
+    
+    # Split product 1's stock across a second location; damaged units there are not stock
+    inventory_service = InventoryService()
+    for status in ("available", "damaged"):
+        inventory_service.add_inventory(db, InventoryItemCreate(
+            product_id=setup_test_data[0].id,
+            quantity=5,
+            location="Back Room",
+            status=status
+        ), commit=False)
+    db.commit()
+    db.expire_all()
+    
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        report = service.generate_inventory_report(db)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+    
+    assert len(statements) == 1
+    
+    quantities = {row["sku"]: row["quantity"] for row in report["details"]}
+    assert quantities == {"PROD001": 55, "PROD002": 100, "PROD003": 150}
+    assert report["summary"]["total_inventory_value"] == 55 * 5.0 + 100 * 10.0 + 150 * 15.0
+    assert report["summary"]["low_stock_items"] == 0
+    
+    # Counts agree with /inventory/stock/low, which reads product_stock.on_hand
+    report = service.generate_inventory_report(db, low_stock_threshold=56)
+    low_stock = inventory_service.get_low_stock_products(db, threshold=56)
+    assert report["summary"]["low_stock_items"] == len(low_stock) == 1
+
+def test_sales_report_totals_and_top_products(db, setup_test_data):
+    service = ReportGenerator()
+    
+    end_date = datetime.utcnow()
+    start_date = end_date - timedelta(days=7)
+    report = service.generate_sales_report(db, start_date, end_date)
+    
+    # Quantities cycle through 1..3 for every product, so each sells 6 units
+    summary = report["summary"]
+    assert summary["total_items_sold"] == 18
+    assert summary["total_sales"] == 6 * (10.0 + 20.0 + 30.0)
+    assert [p["product_name"] for p in summary["top_products"]] == ["Product 3", "Product 2", "Product 1"]
+    assert summary["top_products"][0] == {"product_name": "Product 3", "quantity": 6, "total_price": 180.0}
+    assert len(report["details"]) == 9
+    
+    summary_only = service.generate_sales_report(db, start_date, end_date, include_details=False)
+    assert summary_only["details"] is None
+
+def test_sales_summary_from_rollup_matches_raw_rows(db, setup_test_data):
+    from app.services.report import summarize_sales
+    
+    service = ReportGenerator()
+    
+    # A window with partial edge days exercises the raw-row path on both ends
+    end_date = datetime.utcnow()
+    for start_date in (end_date - timedelta(days=7), end_date - timedelta(days=2, hours=12)):
+        columns = service.fetch_sales_columns(db, start_date, end_date)
+        raw = summarize_sales(columns["product_name"], pd.to_numeric(columns["quantity"]).astype(float),
+                              pd.to_numeric(columns["total_price"]).astype(float))
+        for include_details in (True, False):
+            summary = service.generate_sales_report(db, start_date, end_date, include_details)["summary"]
+            assert {key: summary[key] for key in raw} == raw
+
+def test_sales_summary_offloaded_to_report_pool(db, setup_test_data, monkeypatch):
+    from app.services import report as report_module
+    
+    service = ReportGenerator()
+    end_date = datetime.utcnow()
+    start_date = end_date - timedelta(days=7)
+    inline = service.generate_sales_report(db, start_date, end_date)["summary"]
+    
+    # Force the process pool even for this small report; the result must not change
+    monkeypatch.setattr(report_module, "REPORT_OFFLOAD_MIN_ROWS", 0)
+    offloaded = service.generate_sales_report(db, start_date, end_date)["summary"]
+    assert offloaded == inline
+
+def test_report_jobs_queue(file_app, auth_headers):
+    from app.models.job import Job
+    from app.services.jobs import JobWorker
+    
+    client, SessionLocal, _ = file_app
+    worker = JobWorker(SessionLocal)
+    setup = SessionLocal()
+    headers = auth_headers("jobowner")
+    other_headers = auth_headers("jobother")
+    setup.add(Product(sku="JOBREP1", name="Job Report Product", unit_price=10.0, cost_price=4.0))
+    setup.commit()
+    
+    response = client.post("/reports/inventory", headers=headers)
+    assert response.status_code == 202
+    location = response.headers["Location"]
+    assert response.json()["status"] == "queued"
+    assert client.get(f"{location}/result", headers=headers).status_code == 409
+    assert client.get(location, headers=other_headers).status_code == 404
+    
+    # A second job is cancelled while still queued and never runs
+    cancelled = client.post("/reports/sales?include_details=false", headers=headers).headers["Location"]
+    assert client.post(f"{cancelled}/cancel", headers=headers).json()["status"] == "cancelled"
+    
+    worker.run_pending()
+    job = client.get(f"{location}?wait=1", headers=headers).json()
+    assert (job["status"], job["attempts"]) == ("succeeded", 1)
+    result = client.get(f"{location}/result", headers=headers).json()
+    assert result["summary"]["total_products"] == 1
+    assert client.get(cancelled, headers=headers).json()["status"] == "cancelled"
+    
+    # A job whose worker stopped heartbeating is claimed again by the next worker
+    stale = client.post("/reports/sales", headers=headers).json()["id"]
+    setup.query(Job).filter(Job.id == stale).update(
+        {"status": "running", "attempts": 1, "heartbeat_at": datetime.utcnow() - timedelta(hours=1)}
+    )
+    setup.commit()
+    worker.run_pending()
+    job = client.get(f"/jobs/{stale}", headers=headers).json()
+    assert (job["status"], job["attempts"]) == ("succeeded", 2)
+    
+    # Expired results are purged by the maintenance pass
+    setup.query(Job).filter(Job.id == stale).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    setup.commit()
+    worker.maintain()
+    assert client.get(f"/jobs/{stale}", headers=headers).status_code == 404
+    setup.close()
+
+def test_report_cache_etag_and_invalidation(file_app, auth_headers, count_queries):
+    from app.services.transaction import TransactionService
+    from app.schemas.transaction import TransactionCreate, TransactionItemCreate
+    
+    client, SessionLocal, _ = file_app
+    setup = SessionLocal()
+    headers = auth_headers("reportcache")
+    product = InventoryService().create_product(setup, ProductCreate(
+        sku="CACHE1", name="Cached Product", unit_price=10.0, cost_price=4.0
+    ))
+    
+    first = client.get("/reports/inventory", headers=headers)
+    etag = first.headers["ETag"]
+    assert first.json()["summary"]["total_products"] == 1
+    
+    # An unchanged report is revalidated without a single statement
+    with count_queries(setup.get_bind()) as statements:
+        response = client.get("/reports/inventory", headers={**headers, "If-None-Match": f'W/{etag}'})
+    assert (response.status_code, response.headers["ETag"], statements) == (304, etag, [])
+    
+    # The default window ends on a day boundary, so polling it shares one entry
+    sales = client.get("/reports/sales", headers=headers)
+    polled = client.get("/reports/sales", headers={**headers, "If-None-Match": sales.headers["ETag"]})
+    assert polled.status_code == 304
+    
+    # Committed writes change the ETag of every report over the data they touched
+    TransactionService().create_transaction(setup, TransactionCreate(
+        transaction_type="sale", total_amount=10.0,
+        items=[TransactionItemCreate(product_id=product.id, quantity=1, unit_price=10.0)]
+    ))
+    changed = client.get("/reports/sales", headers={**headers, "If-None-Match": sales.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != sales.headers["ETag"]
+    assert changed.json()["summary"]["total_sales"] == 10.0
+    
+    # Explicit bounds are reported exactly, not widened to the whole day around them
+    sold_at = setup.query(Transaction.transaction_date).scalar()
+    before = client.get("/reports/sales", headers=headers, params={
+        "start_date": (sold_at - timedelta(hours=2)).isoformat(), "end_date": (sold_at - timedelta(hours=1)).isoformat()
+    })
+    around = client.get("/reports/sales", headers=headers, params={
+        "start_date": (sold_at - timedelta(minutes=1)).isoformat(), "end_date": (sold_at + timedelta(minutes=1)).isoformat()
+    })
+    assert before.json()["summary"]["total_sales"] == 0
+    assert around.json()["summary"]["total_sales"] == 10.0
+    assert client.get("/reports/inventory", headers={**headers, "If-None-Match": etag}).status_code == 200
+    setup.close()
+
+def test_natural_language_query_translation_cache(file_app, auth_headers, monkeypatch):
+    import asyncio
+    from app.api.report import report_service
+    from app.models.report import QueryTranslation
+    from app.services import translation
+    
+    client, SessionLocal, _ = file_app
+    setup = SessionLocal()
+    headers = auth_headers("nlquery")
+    setup.add_all([Product(sku=f"NL{i}", name=f"NL Product {i}", unit_price=1.0, cost_price=0.5) for i in range(3)])
+    setup.commit()
+    
+    first = client.post("/reports/query", json={"query": "How many products?"}, headers=headers).json()
+    assert (first["cached"], first["results"]) == (False, [{"product_count": 3}])
+    # Case, spacing and punctuation do not change the question
+    again = client.post("/reports/query", json={"query": "how many   PRODUCTS"}, headers=headers).json()
+    assert (again["cached"], again["sql"], again["results"]) == (True, first["sql"], first["results"])
+    stored = setup.query(QueryTranslation).one()
+    assert (stored.question, stored.dialect, stored.translator, stored.hit_count) == ("how many products", "sqlite", "local", 1)
+    
+    # Expired translations are fetched again
+    setup.query(QueryTranslation).update({"expires_at": datetime.utcnow() - timedelta(seconds=1)})
+    setup.commit()
+    assert client.post("/reports/query", json={"query": "how many products"}, headers=headers).json()["cached"] is False
+    
+    response = client.post("/reports/query", json={"query": "what is the meaning of life"}, headers=headers)
+    assert response.status_code == 422
+    
+    # Another translator's answers are not reused
+    class OtherTranslator(translation.QueryTranslator):
+        name = "other"
+        
+        async def translate(self, question, dialect):
+            return "SELECT COUNT(id) AS product_count FROM products"
+    
+    monkeypatch.setattr(report_service.translation_service, "translator", OtherTranslator())
+    other = client.post("/reports/query", json={"query": "how many products"}, headers=headers).json()
+    assert (other["cached"], other["results"]) == (False, [{"product_count": 3}])
+    
+    class SlowTranslator(translation.QueryTranslator):
+        name = "slow"
+        
+        async def translate(self, question, dialect):
+            await asyncio.sleep(5)
+    
+    monkeypatch.setattr(report_service.translation_service, "translator", SlowTranslator())
+    monkeypatch.setattr(translation, "TRANSLATION_TIMEOUT_SECONDS", 0.05)
+    response = client.post("/reports/query", json={"query": "a question nobody asked before"}, headers=headers)
+    assert response.status_code == 504
+    setup.close()
+
+def test_natural_language_query_guards_and_pages(file_app, auth_headers, monkeypatch):
+    import json
+    from app.api.report import report_service
+    from app.services import report, translation
+    from app.models.report import QueryTranslation
+    from app.utils.sql_guard import UnsafeQuery, check_read_only_select
+    
+    client, SessionLocal, _ = file_app
+    setup = SessionLocal()
+    headers = auth_headers("nlguard")
+    setup.add_all([Product(sku=f"G{i}", name=f"Guard Product {i}", unit_price=1.0, cost_price=0.5) for i in range(5)])
+    setup.commit()
+    
+    class FixedTranslator(translation.QueryTranslator):
+        name = "fixed"
+        answers = {
+            "list skus": "SELECT sku FROM products ORDER BY id",
+            "drop it": "DROP TABLE products",
+            "two statements": "SELECT 1; DELETE FROM products",
+            "users": "SELECT hashed_password FROM users",
+            "cross join": "SELECT COUNT(*) FROM products a, products b, products c",
+            "forever": "WITH r AS (SELECT 1 AS n UNION ALL SELECT n + 1 FROM r) SELECT COUNT(*) FROM r",
+        }
+        
+        async def translate(self, question, dialect):
+            return self.answers[question]
+    
+    monkeypatch.setattr(report_service.translation_service, "translator", FixedTranslator())
+    for question in ("drop it", "two statements", "users"):
+        result = client.post("/reports/query", json={"query": question}, headers=headers).json()
+        assert result["error"] and result["results"] is None
+    assert setup.query(Product).count() == 5
+    # Rejected translations are not cached; the same question asks the translator again
+    assert setup.query(QueryTranslation).count() == 0
+    
+    assert check_read_only_select("SELECT EXTRACT(YEAR FROM transaction_date) FROM transactions t;", ["transactions"]) == (
+        "SELECT EXTRACT(YEAR FROM transaction_date) FROM transactions t", {"t": "transactions"}
+    )
+    for sql in ("WITH x AS (DELETE FROM products RETURNING *) SELECT * FROM x",
+                "SELECT * FROM products FOR UPDATE", "SELECT pg_sleep(10)", "SELECT * FROM public.users",
+                "SELECT * FROM information_schema.tables"):
+        with pytest.raises(UnsafeQuery):
+            check_read_only_select(sql, ["products"])
+    
+    # Rows beyond the limit are fetched page by page with the returned cursor
+    monkeypatch.setattr(report, "NL_QUERY_ROW_LIMIT", 2)
+    skus, cursor = [], None
+    while True:
+        response = client.post("/reports/query", json={"query": "list skus", "cursor": cursor}, headers=headers)
+        body = response.json()
+        skus += [row["sku"] for row in body["results"]]
+        cursor = body["next_cursor"]
+        assert response.headers.get("X-Next-Cursor") == cursor
+        if cursor is None:
+            break
+    assert skus == [f"G{i}" for i in range(5)]
+    
+    # The same pages as NDJSON, the continuation in the last line
+    response = client.post("/reports/query?format=ndjson", json={"query": "list skus"}, headers=headers)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[:2] == [{"sku": "G0"}, {"sku": "G1"}] and set(lines[2]) == {"next_cursor"}
+    response = client.post("/reports/query", json={"query": "cross join", "cursor": lines[2]["next_cursor"]}, headers=headers)
+    assert response.status_code == 400
+    
+    # A plan over the cost ceiling is refused before it runs
+    monkeypatch.setattr(report, "NL_QUERY_MAX_COST", 100)
+    result = client.post("/reports/query", json={"query": "cross join"}, headers=headers).json()
+    assert "exceeds the limit" in result["error"] and result["results"] is None
+    assert client.post("/reports/query", json={"query": "list skus"}, headers=headers).json()["results"]
+    
+    # Statements running past the timeout are interrupted
+    monkeypatch.setattr(report, "NL_QUERY_TIMEOUT_MS", 200)
+    result = client.post("/reports/query", json={"query": "forever"}, headers=headers).json()
+    assert "interrupted" in result["error"]
+    assert client.post("/reports/query", json={"query": "list skus"}, headers=headers).json()["results"]
+    setup.close()
+
+def test_report_intents_answer_without_translator(file_app, auth_headers, monkeypatch):
+    from datetime import date
+    from app.api.report import report_service
+    from app.models.inventory import ProductStock
+    from app.models.report import DailyProductSales
+    from app.services import report, translation
+    from app.services.report_intents import match_intent, question_period
+    
+    client, SessionLocal, _ = file_app
+    setup = SessionLocal()
+    headers = auth_headers("intents")
+    products = [
+        Product(sku=f"Int-{i}", name=f"Intent Product {i}", category="Tools" if i % 2 else "Paint", unit_price=1.0, cost_price=0.5)
+        for i in range(4)
+    ]
+    setup.add_all(products)
+    setup.flush()
+    today = datetime.utcnow().date()
+    setup.add_all([ProductStock(product_id=product.id, on_hand=i * 5) for i, product in enumerate(products)])
+    setup.add_all([
+        DailyProductSales(sales_date=today, product_id=product.id, quantity=i + 1, revenue=10.0 * (i + 1), transaction_count=1)
+        for i, product in enumerate(products)
+    ] + [DailyProductSales(sales_date=today - timedelta(days=90), product_id=products[0].id, quantity=100, revenue=1000.0, transaction_count=1)])
+    setup.commit()
+    
+    class NoTranslator(translation.QueryTranslator):
+        name = "none"
+        
+        async def translate(self, question, dialect):
+            raise AssertionError(f"translator called for {question}")
+    
+    monkeypatch.setattr(report_service.translation_service, "translator", NoTranslator())
+    
+    def ask(question, **body):
+        result = client.post("/reports/query", json={"query": question, **body}, headers=headers).json()
+        assert result["error"] is None and result["intent"], result
+        return result
+    
+    top = ask("Top 2 products this week?")
+    assert (top["intent"], [row["sku"] for row in top["results"]]) == ("top_products", ["Int-3", "Int-2"])
+    assert [row["sku"] for row in ask("top 1 products by units last 120 days")["results"]] == ["Int-0"]
+    # SKUs keep their case; the keywords do not
+    assert ask("STOCK for sku Int-2")["results"] == [
+        {"sku": "Int-2", "name": "Intent Product 2", "on_hand": 10, "reserved": 0, "damaged": 0}
+    ]
+    assert ask("stock for sku int-2")["results"] == []
+    assert ask("sales by category this week")["results"] == [
+        {"category": "Tools", "units_sold": 6, "revenue": 60.0}, {"category": "Paint", "units_sold": 4, "revenue": 40.0}
+    ]
+    assert [row["sku"] for row in ask("products below 10")["results"]] == ["Int-0", "Int-1"]
+    
+    # Intent answers page like translated ones
+    monkeypatch.setattr(report, "NL_QUERY_ROW_LIMIT", 1)
+    first = ask("low stock")
+    second = ask("low stock", cursor=first["next_cursor"])
+    assert [row["sku"] for row in first["results"] + second["results"]] == ["Int-0", "Int-1"]
+    # Words the patterns do not know leave the question to the translator rather than being ignored
+    for question in (
+        "what is the meaning of life",
+        "top 5 customers by revenue",
+        "who are our top suppliers",
+        "best sellers in Electronics last month",
+        "how many items of sku ABC-1 were sold last week",
+        "products below 5 dollars price",
+        "top products in 2023",
+    ):
+        assert match_intent(question) is None, question
+    
+    wednesday = date(2024, 3, 13)
+    assert question_period("sales this week", wednesday) == (date(2024, 3, 11), date(2024, 3, 14))
+    assert question_period("top products last month", wednesday) == (date(2024, 2, 1), date(2024, 3, 1))
+    assert question_period("sales last 7 days", wednesday) == (date(2024, 3, 7), date(2024, 3, 14))
+    assert question_period("sales yesterday", wednesday) == (date(2024, 3, 12), date(2024, 3, 13))
+    assert question_period("best sellers", wednesday) == (date(2024, 2, 13), date(2024, 3, 14))
+    setup.close()
@@ -73,4 +73,277 @@ def test_create_sale_transaction(db, test_product):
     
     # Check inventory was updated
     inventory = db.query(InventoryItem).filter(InventoryItem.product_id == test_product.id).first()
-    assert inventory.quantity == 95  # 100 - 5
\ No newline at end of file
+    assert inventory.quantity == 95  # 100 - 5
+
+def test_sale_maintains_daily_rollup(db, test_product):
+    from app.models.report import DailyProductSales
+    
+    service = TransactionService()
+    transaction = TransactionCreate(
+        transaction_type="sale",
+        reference_number="SALE002",
+        total_amount=3 * test_product.unit_price,
+        status="completed",
+        items=[TransactionItemCreate(product_id=test_product.id, quantity=3, unit_price=test_product.unit_price)]
+    )
+    db_transaction = service.create_transaction(db, transaction)
+    
+    rollup = db.query(DailyProductSales).filter(DailyProductSales.product_id == test_product.id).one()
+    assert (rollup.quantity, rollup.revenue, rollup.transaction_count) == (3, 30.0, 1)
+    
+    # Cancelling the sale takes it back out of the rollup
+    service.update_transaction_status(db, db_transaction.id, "cancelled")
+    db.refresh(rollup)
+    assert (rollup.quantity, rollup.revenue, rollup.transaction_count) == (0, 0.0, 0)
+
+def test_create_transaction_writes_header_and_items_together(file_app, count_queries):
+    from sqlalchemy import event, text
+    from sqlalchemy.exc import IntegrityError
+    
+    _, SessionLocal, _ = file_app
+    db = SessionLocal()
+    service = TransactionService()
+    product = InventoryService().create_product(db, ProductCreate(sku="ATOM001", name="Atomic", unit_price=2.0, cost_price=1.0))
+    db.add(InventoryItem(product_id=product.id, quantity=50, location="A", status="available"))
+    db.commit()
+    
+    def sale(reference, *quantities):
+        return TransactionCreate(
+            transaction_type="sale", reference_number=reference, total_amount=0.0, status="completed",
+            items=[TransactionItemCreate(product_id=product.id, quantity=quantity, unit_price=2.0) for quantity in quantities]
+        )
+    
+    # One INSERT for the header, one executemany for every line, one commit for the whole unit
+    engine = db.get_bind()
+    commits = []
+    record_commit = lambda conn: commits.append(conn)
+    event.listen(engine, "commit", record_commit)
+    try:
+        with count_queries(engine) as statements:
+            service.create_transaction(db, sale("ATOM-1", 1, 2, 3))
+    finally:
+        event.remove(engine, "commit", record_commit)
+    inserts = [statement.split("(")[0].strip() for statement in statements if statement.startswith("INSERT INTO transaction")]
+    assert inserts == ["INSERT INTO transactions", "INSERT INTO transaction_items"]
+    assert len(commits) == 1
+    
+    # A line the database rejects takes the header and the stock change down with it
+    db.execute(text(
+        "CREATE TRIGGER reject_line BEFORE INSERT ON transaction_items WHEN NEW.quantity = 13 "
+        "BEGIN SELECT RAISE(ABORT, 'rejected line'); END"
+    ))
+    db.commit()
+    with pytest.raises(IntegrityError):
+        service.create_transaction(db, sale("ATOM-2", 1, 13))
+    assert db.query(Transaction).filter(Transaction.reference_number == "ATOM-2").count() == 0
+    assert db.query(TransactionItem).count() == 3
+    assert db.query(InventoryItem).filter(InventoryItem.product_id == product.id).one().quantity == 44
+    db.close()
+
+def test_bulk_create_aggregates_inventory_and_reports_per_item(db, test_product):
+    service = TransactionService()
+    
+    def sale(reference, quantity, product_id=test_product.id):
+        return TransactionCreate(
+            transaction_type="sale",
+            reference_number=reference,
+            total_amount=quantity * test_product.unit_price,
+            status="completed",
+            items=[TransactionItemCreate(product_id=product_id, quantity=quantity, unit_price=test_product.unit_price)]
+        )
+    
+    results = service.create_transactions_bulk(db, [
+        sale("BULK001", 2),
+        sale("BULK002", 3),
+        sale("BULK001", 1),
+        sale("BULK003", 1, product_id=999999),
+    ])
+    
+    assert [result["id"] is not None for result in results] == [True, True, False, False]
+    assert "Duplicate reference" in results[2]["error"]
+    assert "Unknown product" in results[3]["error"]
+    
+    inventory = db.query(InventoryItem).filter(InventoryItem.product_id == test_product.id).first()
+    assert inventory.quantity == 95  # 100 - 2 - 3
+    assert db.query(Transaction).filter(Transaction.reference_number.like("BULK%")).count() == 2
+
+def test_bulk_create_isolates_database_errors(file_app, monkeypatch):
+    from app.repositories.inventory import StockAllocationConflict
+    from app.services import transaction as transaction_module
+    
+    _, SessionLocal, _ = file_app
+    db = SessionLocal()
+    service = TransactionService()
+    product = InventoryService().create_product(db, ProductCreate(sku="ISO001", name="Isolated", unit_price=1.0, cost_price=0.5))
+    db.add(InventoryItem(product_id=product.id, quantity=10, location="A", status="available"))
+    db.add(Transaction(transaction_type="sale", reference_number="TX-TAKEN", total_amount=1.0, status="completed"))
+    db.commit()
+    
+    def sale(reference=None):
+        return TransactionCreate(
+            transaction_type="sale", reference_number=reference, total_amount=1.0, status="completed",
+            items=[TransactionItemCreate(product_id=product.id, quantity=1, unit_price=1.0)]
+        )
+    
+    # A generated reference that is already taken is drawn again, not reported as a duplicate
+    drawn = iter(["TX-TAKEN", "TX-FRESH1", "TX-FRESH2"])
+    monkeypatch.setattr(transaction_module, "generate_reference_number", lambda: next(drawn))
+    results = service.create_transactions_bulk(db, [sale(), sale()])
+    assert [result["error"] for result in results] == [None, None]
+    assert sorted(result["reference_number"] for result in results) == ["TX-FRESH1", "TX-FRESH2"]
+    
+    # A constraint violation the upfront checks missed fails only its own entry
+    monkeypatch.setattr(service.repository, "get_existing_references", lambda db, references: set())
+    results = service.create_transactions_bulk(db, [sale("ISO-A"), sale("TX-TAKEN"), sale("ISO-B")])
+    assert [result["id"] is not None for result in results] == [True, False, True]
+    assert "Rejected by the database" in results[1]["error"]
+    assert db.query(Transaction).filter(Transaction.reference_number.like("ISO-%")).count() == 2
+    
+    # An allocation race is retried, and reported per entry once the attempts run out
+    real_allocate = service.inventory_service.allocate_stock
+    conflicts = iter([True])
+    
+    def allocate(db, quantities):
+        if next(conflicts, False):
+            raise StockAllocationConflict("Inventory changed during allocation")
+        return real_allocate(db, quantities)
+    
+    monkeypatch.setattr(service.inventory_service, "allocate_stock", allocate)
+    assert service.create_transactions_bulk(db, [sale("ISO-C")])[0]["error"] is None
+    conflicts = iter([True] * transaction_module.BULK_ALLOCATION_ATTEMPTS)
+    results = service.create_transactions_bulk(db, [sale("ISO-D")])
+    assert (results[0]["id"], results[0]["error"]) == (None, "Inventory changed concurrently; retry the transaction")
+    db.expire_all()
+    assert db.query(InventoryItem).filter(InventoryItem.product_id == product.id).one().quantity == 5
+    db.close()
+
+def test_bulk_endpoint_accepts_ndjson(client, db, test_product):
+    import json
+    from app.main import app
+    from app.api.dependencies import get_current_active_user
+    
+    app.dependency_overrides[get_current_active_user] = lambda: None
+    lines = [
+        {"transaction_type": "sale", "reference_number": f"NDJSON00{i}", "total_amount": 10.0, "status": "completed",
+         "items": [{"product_id": test_product.id, "quantity": 1, "unit_price": 10.0}]}
+        for i in range(3)
+    ]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n{\"transaction_type\": \"sale\"}\n"
+    
+    response = client.post("/transactions/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    
+    assert response.status_code == 200
+    assert response.json()["created"] == 3
+    assert response.json()["failed"] == 1
+    assert response.json()["results"][3]["index"] == 3
+
+def test_concurrent_sales_do_not_lose_updates(tmp_path):
+    import threading
+    from sqlalchemy import create_engine, func
+    from sqlalchemy.orm import sessionmaker
+    from app.database import Base
+    
+    # Concurrent writers need their own committed database, not the rolled-back test session
+    engine = create_engine(f"sqlite:///{tmp_path}/stress.db", connect_args={"check_same_thread": False, "timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    setup = Session()
+    product = InventoryService().create_product(setup, ProductCreate(
+        sku="STRESS001", name="Stress Product", unit_price=1.0, cost_price=0.5
+    ))
+    product_id = product.id
+    for location in ("A", "B", "C"):
+        setup.add(InventoryItem(product_id=product_id, quantity=50, location=location,
+                                last_count_date=datetime.utcnow(), status="available"))
+    setup.commit()
+    setup.close()
+    
+    threads, sales_per_thread = 8, 25  # 200 units requested against 150 in stock
+    shortfalls = []
+    errors = []
+    service = TransactionService()
+    
+    def sell():
+        db = Session()
+        try:
+            for _ in range(sales_per_thread):
+                db_transaction = service.create_transaction(db, TransactionCreate(
+                    transaction_type="sale",
+                    total_amount=1.0,
+                    status="completed",
+                    items=[TransactionItemCreate(product_id=product_id, quantity=1, unit_price=1.0)]
+                ))
+                shortfalls.append(db_transaction.stock_shortfalls.get(product_id, 0))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            db.close()
+    
+    workers = [threading.Thread(target=sell) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    
+    assert errors == []
+    check = Session()
+    quantities = [row.quantity for row in check.query(InventoryItem).filter(InventoryItem.product_id == product_id)]
+    check.close()
+    engine.dispose()
+    
+    assert quantities == [0, 0, 0]
+    assert sum(shortfalls) == threads * sales_per_thread - 150
+
+def test_transactions_keyset_pagination(file_app, auth_headers):
+    from datetime import timedelta
+    
+    client, SessionLocal, _ = file_app
+    headers = auth_headers("pageuser")
+    setup = SessionLocal()
+    # Two transactions share a timestamp so the id tiebreaker is exercised
+    now = datetime.utcnow()
+    for i in range(7):
+        setup.add(Transaction(transaction_type="sale", reference_number=f"PAGE{i:03d}",
+                              transaction_date=now - timedelta(minutes=i // 2), total_amount=1.0, status="completed"))
+    setup.commit()
+    setup.close()
+    
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/transactions/", params=params, headers=headers)
+        assert response.status_code == 200
+        seen.extend(t["reference_number"] for t in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    
+    assert sorted(seen) == [f"PAGE{i:03d}" for i in range(7)]
+    assert len(seen) == len(set(seen))
+    assert client.get("/transactions/", params={"cursor": "garbage"}, headers=headers).status_code == 400
+
+def test_transaction_reads_do_not_load_items_per_row(file_app, auth_headers, count_queries):
+    
+    client, SessionLocal, async_engine = file_app
+    setup = SessionLocal()
+    headers = auth_headers("n1user")
+    product = Product(sku="N1PROD", name="N+1 Product", unit_price=1.0, cost_price=0.5)
+    setup.add(product)
+    setup.flush()
+    for i in range(20):
+        transaction = Transaction(transaction_type="sale", reference_number=f"N1{i:03d}", total_amount=2.0, status="completed")
+        transaction.items = [TransactionItem(product_id=product.id, quantity=1, unit_price=1.0, total_price=1.0) for _ in range(2)]
+        setup.add(transaction)
+    setup.commit()
+    transaction_id = transaction.id
+    setup.close()
+    
+    # The first request loads the principal into its cache; count only the routes' own queries
+    assert client.get("/users/me/", headers=headers).status_code == 200
+    # One query for the page and one IN query for all of its items, however many rows the page holds
+    for path in ("/transactions/?limit=20", "/transactions/?skip=1&limit=20", f"/transactions/{transaction_id}"):
+        with count_queries(async_engine.sync_engine) as statements:
+            response = client.get(path, headers=headers)
+        assert response.status_code == 200
+        assert len(statements) == 2, (path, statements)